@@ -0,0 +1,306 @@
+"""对话热路径（不含 LLM 调用）的微基准测试
+
+覆盖每轮对话中围绕 LLM 调用的 CPU 工作：
+    - detect_state_by_rules        _detect_state 的规则匹配
+    - build_analysis_prompt        构建分析 prompt
+    - config_to_dict               ConfigManager.to_dict
+    - extract_json                 LLMUtils.extract_json_from_response
+    - parse_analysis               AnalysisResult.from_dict
+    - update_config_from_analysis  用分析结果更新配置
+    - add_to_history               StateManager.add_to_history（历史已满）
+    - get_recent_context           StateManager.get_recent_context
+
+数据集固定：用户输入来自 benchmarks.dialogue_generator（固定种子），分析结果与 LLM
+响应为内置样本，每次运行完全相同。每项先用 timeit 的 autorange 确定每轮调用次数，
+重复多轮取最好的一轮计算 ops/sec，再在 tracemalloc 下逐次调用统计每次调用的分配
+峰值与残留字节。应用的调试输出在测试期间重定向到 /dev/null（格式化的开销仍计入）。
+
+结果可以写入 JSON 文件，compare 对比两个结果文件，吞吐量下降或分配增加超过阈值时
+标记为回退并以非零状态退出：
+
+    python -m benchmarks.bench_hot_paths run --output base.json
+    python -m benchmarks.bench_hot_paths run --output new.json --filter prompt,json
+    python -m benchmarks.bench_hot_paths compare base.json new.json --threshold 0.1
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dialogue_generator import generate
+from src.config.config_manager import ConfigManager
+from src.managers.state_manager import StateManager, ConversationState
+from src.managers.conversation_manager import ConversationManager
+from src.utils.llm_utils import LLMUtils
+from src.utils.analysis_models import AnalysisResult
+
+RESULT_VERSION = 1
+DATASET_SEED = 20240601
+
+# 分配增加的绝对值低于该字节数时不视为回退（避免小数值的相对波动）
+_MIN_ALLOC_DELTA = 256
+
+SAMPLE_ANALYSES: List[Dict] = [
+    {
+        "intent": "provide_info",
+        "emotion": "neutral",
+        "patience_level": "high",
+        "extracted_info": {
+            "core_investment": {"target_value": 3000000, "years": 10, "initial_investment": 1000000},
+            "personal_info": {"family_status": None, "employment": None, "wealth_source": None, "investment_goal": None},
+            "financial_info": {
+                "cash_deposits": None, "investments": None, "employee_benefits": None, "private_ownership": None,
+                "life_insurance": None, "consumer_debt": None, "mortgage": None, "other_debt": None, "account_debt": None
+            },
+            "portfolio": {"assets": [], "weights": []}
+        },
+        "question_info": {"type": "none", "requires_immediate_response": False, "can_collect_info": True},
+        "reasoning": {
+            "amount_calculation": "300万 -> 3000000，100万 -> 1000000",
+            "time_interpretation": "10年",
+            "goal_understanding": "10年内资产增长到300万",
+            "portfolio_parsing": ""
+        }
+    },
+    {
+        "intent": "provide_info",
+        "emotion": "positive",
+        "patience_level": "medium",
+        "extracted_info": {
+            "core_investment": {"target_value": 3000000, "years": 10, "initial_investment": 1000000},
+            "personal_info": {"family_status": None, "employment": None, "wealth_source": None, "investment_goal": None},
+            "financial_info": {"cash_deposits": None, "investments": None, "mortgage": None},
+            "portfolio": {"assets": ["股票", "债券", "存款"], "weights": [0.5, 0.3, 0.2]}
+        },
+        "question_info": {"type": "none", "requires_immediate_response": False, "can_collect_info": True},
+        "reasoning": {"portfolio_parsing": "股票50%，债券30%，存款20%"}
+    },
+    {
+        "intent": "provide_info",
+        "emotion": "neutral",
+        "patience_level": "high",
+        "extracted_info": {
+            "core_investment": {"target_value": 3000000, "years": 10, "initial_investment": 1000000},
+            "personal_info": {"family_status": "已婚，有一个孩子", "employment": "企业职员", "wealth_source": None, "investment_goal": "子女教育"},
+            "financial_info": {"cash_deposits": 300000, "investments": None, "mortgage": 1200000},
+            "portfolio": {"assets": ["股票", "基金", "存款"], "weights": [60, 25, 15]}
+        },
+        "question_info": {"type": "none", "requires_immediate_response": False, "can_collect_info": True},
+        "reasoning": {"portfolio_parsing": "权重为百分数，需要归一化"}
+    },
+    {
+        "intent": "ask_question",
+        "emotion": "neutral",
+        "patience_level": "medium",
+        "extracted_info": {},
+        "question_info": {"type": "knowledge", "requires_immediate_response": True, "can_collect_info": False},
+        "reasoning": {}
+    }
+]
+
+# LLM 响应的常见形态：纯 JSON、前后带说明文字、代码块、紧凑格式
+_RESPONSE_WRAPPERS = [
+    "{json}",
+    "根据用户的输入，分析结果如下：\n{json}\n以上是分析结果。",
+    "```json\n{json}\n```",
+    "好的。\n\n{json}"
+]
+
+
+def build_dataset() -> Dict:
+    """固定的测试数据"""
+    dialogues = list(generate(200, DATASET_SEED))
+    inputs = [turn for dialogue in dialogues for turn in dialogue["turns"]][:1000]
+    responses = [
+        wrapper.replace("{json}", json.dumps(analysis, ensure_ascii=False, indent=indent))
+        for analysis in SAMPLE_ANALYSES
+        for wrapper in _RESPONSE_WRAPPERS
+        for indent in (2, None)
+    ]
+    messages = [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": text,
+            "state": ConversationState.COLLECTING_INFO.value
+        }
+        for i, text in enumerate(inputs[:200])
+    ]
+    return {"inputs": inputs, "responses": responses, "messages": messages}
+
+
+def build_manager(messages: List[Dict]) -> ConversationManager:
+    """已提供核心信息与资产配置、历史已满的会话"""
+    config = ConfigManager()
+    config.update_core_investment(target_value=3000000, years=10, initial_investment=1000000.0)
+    config.update_portfolio(assets=["stock", "bond", "cash"], weights=[0.5, 0.3, 0.2])
+    config.update_user_info("personal", family_status="已婚，有一个孩子", employment="企业职员")
+    state = StateManager()
+    state.transition_to(ConversationState.COLLECTING_INFO)
+    for message in messages[:state.context.max_history]:
+        state.add_to_history(dict(message))
+    return ConversationManager(config, state)
+
+
+@dataclass(slots=True)
+class Benchmark:
+    name: str
+    description: str
+    fn: Callable[[], object]
+
+
+def build_benchmarks(dataset: Dict) -> List[Benchmark]:
+    manager = build_manager(dataset["messages"])
+    state = manager.state_manager
+    inputs = itertools.cycle(dataset["inputs"])
+    responses = itertools.cycle(dataset["responses"])
+    analyses = itertools.cycle(SAMPLE_ANALYSES)
+    messages = itertools.cycle(dataset["messages"])
+    return [
+        Benchmark("detect_state_by_rules", "规则状态检测（每次一条用户输入）",
+                  lambda: manager._detect_state_by_rules(next(inputs))),
+        Benchmark("build_analysis_prompt", "构建分析 prompt",
+                  lambda: manager._build_analysis_prompt(next(inputs))),
+        Benchmark("config_to_dict", "ConfigManager.to_dict",
+                  manager.config_manager.to_dict),
+        Benchmark("extract_json", "从 LLM 响应中提取 JSON",
+                  lambda: LLMUtils.extract_json_from_response(next(responses))),
+        Benchmark("parse_analysis", "校验并转换分析结果",
+                  lambda: AnalysisResult.from_dict(next(analyses))),
+        Benchmark("update_config_from_analysis", "用分析结果更新配置（含校验转换）",
+                  lambda: manager._update_config_from_analysis(AnalysisResult.from_dict(next(analyses)))),
+        Benchmark("add_to_history", "追加对话历史（历史已满）",
+                  lambda: state.add_to_history(next(messages))),
+        Benchmark("get_recent_context", "获取最近对话",
+                  state.get_recent_context),
+    ]
+
+
+def measure(benchmark: Benchmark, repeat: int, alloc_samples: int) -> Dict:
+    """测量吞吐量与每次调用的内存分配"""
+    timer = timeit.Timer(benchmark.fn)
+    number, _ = timer.autorange()
+    rounds = timer.repeat(repeat=repeat, number=number)
+    per_op = [elapsed / number for elapsed in rounds]
+
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_samples):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            result = benchmark.fn()
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+            del result
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "description": benchmark.description,
+        "ops_per_sec": round(1 / min(per_op), 1),
+        "median_us": round(statistics.median(per_op) * 1e6, 3),
+        "best_us": round(min(per_op) * 1e6, 3),
+        "stdev_pct": round(statistics.pstdev(per_op) / statistics.mean(per_op) * 100, 2),
+        "number": number,
+        "peak_bytes": int(statistics.median(peaks)),
+        "retained_bytes": int(statistics.median(retained))
+    }
+
+
+def run(names: Optional[List[str]], repeat: int, alloc_samples: int) -> Dict:
+    dataset = build_dataset()
+    results = {}
+    with open(os.devnull, "w") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            benchmarks = build_benchmarks(dataset)
+        for benchmark in benchmarks:
+            if names and not any(name in benchmark.name for name in names):
+                continue
+            with contextlib.redirect_stdout(devnull):
+                results[benchmark.name] = measure(benchmark, repeat, alloc_samples)
+            row = results[benchmark.name]
+            print(f"  {benchmark.name:<30}{row['ops_per_sec']:>14,.0f} ops/s{row['median_us']:>11.2f} µs"
+                  f"  ±{row['stdev_pct']:>5.1f}%{row['peak_bytes']:>10,d} B 峰值{row['retained_bytes']:>8,d} B 残留")
+    return {
+        "version": RESULT_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "dataset_seed": DATASET_SEED,
+        "repeat": repeat,
+        "results": results
+    }
+
+
+def compare(base: Dict, new: Dict, threshold: float) -> List[str]:
+    """对比两个结果，返回回退的测试项"""
+    regressions = []
+    print(f"{'测试项':<30}{'基准 ops/s':>14}{'新 ops/s':>14}{'变化':>9}{'峰值分配变化':>16}")
+    for name, row in new["results"].items():
+        if name not in base["results"]:
+            print(f"{name:<30}{'-':>14}{row['ops_per_sec']:>14,.0f}{'新增':>9}")
+            continue
+        old = base["results"][name]
+        speed = row["ops_per_sec"] / old["ops_per_sec"] - 1
+        alloc_delta = row["peak_bytes"] - old["peak_bytes"]
+        alloc = alloc_delta / old["peak_bytes"] if old["peak_bytes"] else 0.0
+        flags = []
+        if speed < -threshold:
+            flags.append("吞吐量")
+        if alloc > threshold and alloc_delta > _MIN_ALLOC_DELTA:
+            flags.append("分配")
+        if flags:
+            regressions.append(name)
+        print(f"{name:<30}{old['ops_per_sec']:>14,.0f}{row['ops_per_sec']:>14,.0f}{speed:>+9.1%}"
+              f"{alloc_delta:>+14,d} B" + (f"  ❌ 回退（{'、'.join(flags)}）" if flags else ""))
+    if base.get("python") != new.get("python") or base.get("platform") != new.get("platform"):
+        print("\n注意：两次结果的运行环境不同，对比结果仅供参考")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对话热路径微基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="运行基准测试")
+    run_parser.add_argument("--filter", help="只运行名称包含这些关键字（逗号分隔）的测试项")
+    run_parser.add_argument("--repeat", type=int, default=7, help="计时轮数，取最好的一轮")
+    run_parser.add_argument("--alloc-samples", type=int, default=200, help="统计内存分配的调用次数")
+    run_parser.add_argument("--output", help="结果 JSON 文件")
+    compare_parser = subparsers.add_parser("compare", help="对比两个结果文件")
+    compare_parser.add_argument("base", help="基准结果")
+    compare_parser.add_argument("new", help="新结果")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="吞吐量下降或分配增加超过该比例视为回退")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        names = args.filter.split(",") if args.filter else None
+        result = run(names, args.repeat, args.alloc_samples)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            print(f"结果已写入 {args.output}")
+        return
+
+    with open(args.base, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    regressions = compare(base, new, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} 项回退: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n没有回退")
+
+
+if __name__ == "__main__":
+    main()
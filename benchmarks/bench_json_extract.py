@@ -0,0 +1,126 @@
+"""LLM 回复 JSON 提取的基准测试
+
+在杂乱回复语料上对比原来的提取方式（第一个 "{" 到最后一个 "}" 之间整体 json.loads）
+与 src.utils.json_extract 的提取结果和耗时。语料 benchmarks/data/llm_responses.jsonl
+每行一条：{"kind": 调用类型, "note": 说明, "text": 回复文本, "expected": 期望对象或 null}。
+指定 --cassette 时同时统计录制的真实回复（见 src.utils.llm_cassette）的解析成功率，
+调用类型按 prompt 内容判断，自由问答等非 JSON 回复不计入。
+
+用法：
+    python -m benchmarks.bench_json_extract [--cassette .cassettes/llm.jsonl] [--verbose]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.json_extract import (
+    ANALYSIS_SCHEMA, STATE_DETECTION_SCHEMA, MODIFICATION_SCHEMA, extract_json
+)
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "llm_responses.jsonl")
+
+SCHEMAS = {
+    "analysis": ANALYSIS_SCHEMA,
+    "state_detection": STATE_DETECTION_SCHEMA,
+    "modification": MODIFICATION_SCHEMA
+}
+
+# 按 prompt 开头判断录制回复的调用类型
+_PROMPT_KINDS = [
+    ("分析用户输入并判断对话状态", "state_detection"),
+    ("分析用户输入是否表达了修改之前信息的意图", "modification"),
+    ("作为投资顾问，分析用户输入并提取关键信息", "analysis")
+]
+
+
+def legacy_extract(response: str) -> Optional[Dict]:
+    """原来的提取方式"""
+    try:
+        start = response.find("{")
+        end = response.rfind("}") + 1
+        if start >= 0 and end > start:
+            return json.loads(response[start:end])
+        return None
+    except json.JSONDecodeError:
+        return None
+
+
+def load_corpus(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def load_cassette(path: str) -> List[Dict]:
+    """录制的回复中需要解析 JSON 的部分"""
+    samples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            prompt = entry["request"]["messages"][-1]["content"]
+            kind = next((kind for prefix, kind in _PROMPT_KINDS if prompt.startswith(prefix)), None)
+            if kind:
+                samples.append({"kind": kind, "note": "录制", "text": entry["response"]["text"]})
+    return samples
+
+
+def run_extractors(samples: List[Dict], number: int) -> Dict[str, Dict]:
+    extractors = {
+        "legacy": lambda sample: legacy_extract(sample["text"]),
+        "json_extract": lambda sample: extract_json(sample["text"], SCHEMAS[sample["kind"]])
+    }
+    results = {}
+    for name, extract in extractors.items():
+        outcomes = [extract(sample) for sample in samples]
+        elapsed = timeit.timeit(lambda: [extract(sample) for sample in samples], number=number)
+        results[name] = {"outcomes": outcomes, "us_per_response": elapsed / number / len(samples) * 1e6}
+    return results
+
+
+def report(title: str, samples: List[Dict], results: Dict[str, Dict], verbose: bool) -> None:
+    labelled = "expected" in samples[0]
+    print(f"\n{title}（{len(samples)} 条）:")
+    for name, result in results.items():
+        if labelled:
+            hits = [outcome == sample["expected"] for outcome, sample in zip(result["outcomes"], samples)]
+        else:
+            hits = [outcome is not None and SCHEMAS[sample["kind"]].validate(outcome)
+                    for outcome, sample in zip(result["outcomes"], samples)]
+        print(f"  {name:<14} {'正确' if labelled else '解析成功'} {sum(hits):>4}/{len(hits)}"
+              f"  {result['us_per_response']:>8.2f} µs/条")
+        if verbose:
+            failures = defaultdict(int)
+            for hit, sample in zip(hits, samples):
+                if not hit:
+                    failures[f"{sample['kind']}: {sample['note']}"] += 1
+            for note, count in sorted(failures.items()):
+                print(f"      ✗ {note} ×{count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM 回复 JSON 提取基准测试")
+    parser.add_argument("--corpus", default=CORPUS_PATH, help="杂乱回复语料")
+    parser.add_argument("--cassette", help="同时统计录制的 LLM 磁带中的回复")
+    parser.add_argument("--number", type=int, default=200, help="计时重复次数")
+    parser.add_argument("--verbose", action="store_true", help="列出失败的样本类型")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    report("杂乱回复语料", corpus, run_extractors(corpus, args.number), args.verbose)
+    if args.cassette:
+        recorded = load_cassette(args.cassette)
+        if recorded:
+            report("录制的回复", recorded, run_extractors(recorded, max(1, args.number // 10)), args.verbose)
+        else:
+            print("\n磁带中没有需要解析 JSON 的回复")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""会话二进制编码基准测试
+
+对比 ConfigManager/StateManager/Session 的 to_bytes/from_bytes 与 json.dumps
+（紧凑格式与 indent=2 的美化格式）的编码、解码耗时和体积，并校验往返一致。
+JSON 的耗时包含 to_dict/from_dict，与 to_bytes/from_bytes 的工作量对等。
+安装了 msgpack 时额外给出内置 struct 编码（不使用 msgpack）的结果。
+
+用法：
+    python -m benchmarks.bench_session_codec [--history 10] [--transcript 200]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.managers.session_manager import Session
+from src.utils import binary_codec
+from src.managers.state_manager import ConversationState
+
+def build_session(history: int, transcript: int) -> Session:
+    """构造一个具有代表性的会话"""
+    session = Session.create("bench-session")
+    config = session.config_manager
+    config.update_core_investment(target_value=5000000, years=5, initial_investment=1000000.0)
+    config.update_risk_profile(score=28, tolerance="稳健型")
+    config.update_portfolio(assets=["stock", "bond", "cash"], weights=[0.5, 0.3, 0.2])
+    config.update_user_info("personal", family_status="已婚，有一个孩子", employment="企业职员", investment_goal="子女教育")
+    config.update_user_info("financial", cash_deposits=300000.0, mortgage=1200000.0)
+
+    state = session.state_manager
+    state.transition_to(ConversationState.COLLECTING_INFO)
+    state.context.max_history = history
+    for i in range(history // 2):
+        state.add_to_history({
+            "role": "user",
+            "content": f"我准备{i + 3}年后攒够500万，现在有100万本金，股票50%债券30%现金20%",
+            "state": ConversationState.COLLECTING_INFO.value,
+            "extracted_info": {
+                "core_investment": {"target_value": 5000000, "years": i + 3, "initial_investment": 1000000},
+                "portfolio": {"assets": ["stock", "bond", "cash"], "weights": [0.5, 0.3, 0.2]}
+            }
+        })
+        state.add_to_history({
+            "role": "assistant",
+            "content": "好的，已经记录您的投资目标。请问您目前的资产配置情况是怎样的？比如存款、股票、基金等的占比。",
+            "state": ConversationState.COLLECTING_INFO.value
+        })
+    for i in range(transcript):
+        session.add_to_transcript({
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": "请问指数基金和主动基金有什么区别？" if i % 2 == 0 else "指数基金跟踪特定指数，费率较低；主动基金依赖基金经理选股，费率较高，业绩分化明显。投资有风险，请谨慎决策。"
+        })
+    return session
+
+def bench(label: str, encode, decode, number: int) -> None:
+    data = encode()
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    encode_us = timeit.timeit(encode, number=number) / number * 1e6
+    decode_us = timeit.timeit(lambda: decode(data), number=number) / number * 1e6
+    print(f"  {label:<22} {len(data):>9,d} 字节  编码 {encode_us:>9.1f} µs  解码 {decode_us:>9.1f} µs")
+
+def main():
+    parser = argparse.ArgumentParser(description="会话二进制编码基准测试")
+    parser.add_argument("--history", type=int, default=10, help="对话历史条数")
+    parser.add_argument("--transcript", type=int, default=200, help="界面展示消息条数")
+    parser.add_argument("--number", type=int, default=2000, help="每项重复次数")
+    args = parser.parse_args()
+
+    session = build_session(args.history, args.transcript)
+    config, state = session.config_manager, session.state_manager
+
+    # 校验往返一致
+    assert type(config).from_bytes(config.to_bytes()).to_dict() == config.to_dict()
+    assert type(state).from_bytes(state.to_bytes()).to_dict() == state.to_dict()
+    assert Session.from_bytes(session.to_bytes()).to_dict() == session.to_dict()
+
+    targets = [
+        ("ConfigManager", config, type(config)),
+        ("StateManager", state, type(state)),
+        ("Session", session, Session),
+    ]
+    for name, target, cls in targets:
+        print(f"\n{name}:")
+        bench("to_bytes", target.to_bytes, cls.from_bytes, args.number)
+        if binary_codec.msgpack is not None:
+            msgpack_module, binary_codec.msgpack = binary_codec.msgpack, None
+            try:
+                bench("to_bytes(struct)", target.to_bytes, cls.from_bytes, args.number)
+            finally:
+                binary_codec.msgpack = msgpack_module
+        from_json = lambda data: cls.from_dict(json.loads(data))
+        bench("json.dumps", lambda: json.dumps(target.to_dict(), ensure_ascii=False), from_json, args.number)
+        bench("json.dumps(indent=2)", lambda: json.dumps(target.to_dict(), ensure_ascii=False, indent=2), from_json, args.number)
+
+if __name__ == "__main__":
+    main()
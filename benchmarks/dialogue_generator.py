@@ -0,0 +1,272 @@
+"""合成的中文投资者对话语料
+
+按固定种子生成多轮对话（JSON lines），每条对话附带期望的最终 CoreInvestment 与
+Portfolio，用于压测（benchmarks.load_test --scenarios）以及评估本地信息提取的准确率。
+生成的输入覆盖：
+    - 金额：阿拉伯数字 + 万/亿/元、中文数字（三百万、一千五百万、两亿）
+    - 年限：数字、中文数字、"X年半"、"X年左右"、按月份表述
+    - 资产配置：百分比、"六成/四成"、"一半"、按金额描述、"全部存银行" 等写法
+    - 中途的知识咨询、市场分析问题（会触发 _detect_state 的规则）
+    - 修改目标金额、年限、本金、资产配置的说法
+期望的资产配置使用 asset_config.ASSET_CLASSES 中的资产类别，权重之和为 1。
+
+用法：
+    python -m benchmarks.dialogue_generator -n 10000 -o dialogues.jsonl --seed 7
+    python -m benchmarks.dialogue_generator evaluate dialogues.jsonl mymodule:extract
+"""
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+from typing import Callable, Dict, Iterator, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config.asset_config import ASSET_CLASSES
+from src.planning.assets import resolve_asset_class
+
+_DIGITS = "零一二三四五六七八九"
+
+OPENINGS = ["你好", "在吗", "想咨询一下理财", "您好，我想了解一下投资规划", "hi"]
+INTENT_PREFIXES = ["我想投资，", "我打算理财，", "我准备做个投资规划，", "我想为退休做个投资，", "我计划给孩子存教育金，"]
+QUESTIONS = [
+    "ETF是什么", "指数基金和主动基金有什么区别", "债券基金有哪些风险", "美股现在怎么样",
+    "帮我分析下港股走势", "基金定投怎么样", "有哪些适合新手的理财产品推荐", "黄金ETF是什么意思",
+    "国债和存款的区别", "比特币是什么"
+]
+EXTRA_INFO = [
+    "已婚，有一个孩子，在企业上班", "单身，公务员", "已婚，有两个孩子，自由职业",
+    "离异，有一个孩子，医生", "未婚，工程师，没有房贷"
+]
+
+
+def chinese_number(n: int, counting: bool = False) -> str:
+    """0-9999 的整数写成中文数字（两千、一千五百、三十）
+
+    counting 为真时表示后面跟着量词或单位（万、年），单独的 2 写作 "两"。
+    """
+    if n == 0:
+        return "零"
+    if n == 2 and counting:
+        return "两"
+    parts = []
+    for value, unit in ((1000, "千"), (100, "百"), (10, "十"), (1, "")):
+        digit, n = divmod(n, value)
+        if digit:
+            word = "两" if digit == 2 and unit in ("千", "百") else _DIGITS[digit]
+            parts.append(word + unit)
+        elif parts and n and parts[-1] != "零":
+            parts.append("零")
+    text = "".join(parts)
+    return text[1:] if text.startswith("一十") else text
+
+
+def format_amount(amount: float, rng: random.Random) -> str:
+    """金额的多种写法"""
+    if amount >= 1e8 and amount % 1e7 == 0:
+        yi = amount / 1e8
+        options = [f"{yi:g}亿"]
+        if yi == int(yi):
+            options.append(chinese_number(int(yi), counting=True) + "亿")
+        return rng.choice(options)
+    wan = amount / 1e4
+    options = [f"{wan:g}万"]
+    if wan == int(wan) and wan < 10000:
+        options.append(chinese_number(int(wan), counting=True) + "万")
+    if wan >= 1000 and wan % 1000 == 0:
+        options.append(f"{wan / 1000:g}千万")
+    if amount < 1e7:
+        options.append(f"{int(amount)}元")
+    return rng.choice(options)
+
+
+def format_years(years: float, rng: random.Random) -> str:
+    """年限的多种写法"""
+    whole = int(years)
+    if years != whole:
+        return rng.choice([f"{whole}年半", f"{chinese_number(whole, counting=True)}年半", f"{int(years * 12)}个月"])
+    return rng.choice([
+        f"{whole}年", f"{chinese_number(whole, counting=True)}年", f"{whole}年左右",
+        f"大概{chinese_number(whole, counting=True)}年",
+        f"{whole * 12}个月" if whole <= 3 else f"{whole}年时间"
+    ])
+
+
+def _alias_for(key: str, rng: random.Random) -> str:
+    """选一个能解析回该资产类别的别名"""
+    spec = ASSET_CLASSES[key]
+    candidates = [alias for alias in spec["aliases"] + [spec["name"]] if resolve_asset_class(alias) == key]
+    return rng.choice(candidates)
+
+
+def _random_weights(count: int, rng: random.Random) -> List[float]:
+    """和为 1、以 5% 为单位的权重"""
+    cuts = sorted(rng.sample(range(1, 20), count - 1))
+    steps = [b - a for a, b in zip([0] + cuts, cuts + [20])]
+    return [step / 20 for step in steps]
+
+
+def format_portfolio(keys: List[str], weights: List[float], initial: float, rng: random.Random) -> str:
+    """资产配置的多种写法"""
+    names = [_alias_for(key, rng) for key in keys]
+    if len(keys) == 1:
+        return rng.choice([f"全部是{names[0]}", f"{names[0]}100%", f"都放在{names[0]}里"])
+    style = rng.randrange(5)
+    if style == 0:
+        return "，".join(f"{name}{weight:.0%}" for name, weight in zip(names, weights))
+    if style == 1:
+        return "、".join(f"{name}占比{weight * 100:g}%" for name, weight in zip(names, weights))
+    if style == 2 and all(weight * 10 == int(weight * 10) for weight in weights):
+        return "".join(f"{chinese_number(int(weight * 10))}成{name}" for name, weight in zip(names, weights))
+    if style == 3 and len(keys) == 2 and weights[0] == 0.5:
+        return f"一半{names[0]}一半{names[1]}"
+    amounts = [format_amount(initial * weight, rng) for weight in weights]
+    return "我的钱" + "，".join(f"{name}{amount}" for name, amount in zip(names, amounts))
+
+
+def generate_dialogue(index: int, rng: random.Random) -> Dict:
+    """生成一条对话及其期望结果"""
+    tags = []
+    initial = rng.choice([10, 20, 30, 50, 80, 100, 150, 200, 300, 500, 1000, 2000]) * 1e4
+    target = initial * rng.choice([1.2, 1.5, 2, 2.5, 3, 4, 5])
+    target = round(target / 1e4) * 1e4
+    years = rng.choice([1, 2, 3, 5, 8, 10, 15, 20, 25, 30, 2.5, 3.5])
+    if rng.random() < 0.1:
+        keys, weights = ["cash"], [1.0]
+    else:
+        keys = rng.sample(list(ASSET_CLASSES), rng.randint(2, 4))
+        weights = _random_weights(len(keys), rng)
+
+    turns = []
+    if rng.random() < 0.6:
+        turns.append(rng.choice(OPENINGS))
+    prefix = rng.choice(INTENT_PREFIXES)
+    if rng.random() < 0.5:
+        tags.append("core_one_turn")
+        turns.append(
+            f"{prefix}现在有{format_amount(initial, rng)}，希望{format_years(years, rng)}后达到{format_amount(target, rng)}"
+        )
+    else:
+        tags.append("core_multi_turn")
+        turns.append(f"{prefix}目标是{format_amount(target, rng)}")
+        turns.append(f"投资{format_years(years, rng)}")
+        turns.append(f"本金{format_amount(initial, rng)}")
+    if rng.random() < 0.4:
+        tags.append("mid_flow_question")
+        turns.append(rng.choice(QUESTIONS))
+    if keys == ["cash"] and rng.random() < 0.5:
+        turns.append(rng.choice(["我没有任何投资", "全部存银行", "钱都在活期里"]))
+    else:
+        turns.append(format_portfolio(keys, weights, initial, rng))
+    if rng.random() < 0.7:
+        turns.append(rng.choice(EXTRA_INFO))
+
+    for _ in range(rng.choice([0, 0, 1, 1, 2])):
+        tags.append("modification")
+        field = rng.choice(["target_value", "years", "initial_investment", "portfolio"])
+        if field == "target_value":
+            target = round(target * rng.choice([0.8, 1.25, 1.5]) / 1e4) * 1e4
+            turns.append(rng.choice(["目标改成", "把目标金额修改为", "目标重新设置为"]) + format_amount(target, rng))
+        elif field == "years":
+            years = rng.choice([y for y in (3, 5, 7, 10, 12, 15, 20) if y != years])
+            turns.append(rng.choice(["年限改成", "投资期限改为", "修改一下，年限改成"]) + format_years(years, rng))
+        elif field == "initial_investment":
+            initial = rng.choice([v for v in (20, 50, 100, 200, 400) if v * 1e4 != initial]) * 1e4
+            turns.append(rng.choice(["本金改成", "初始资金修改为", "本金更正为"]) + format_amount(initial, rng))
+        else:
+            keys = rng.sample(list(ASSET_CLASSES), rng.randint(2, 3))
+            weights = _random_weights(len(keys), rng)
+            turns.append("资产配置改一下：" + format_portfolio(keys, weights, initial, rng))
+    turns.append("确认")
+
+    merged: Dict[str, float] = {}
+    for key, weight in zip(keys, weights):
+        merged[key] = merged.get(key, 0.0) + weight
+    return {
+        "id": f"dlg-{index:06d}",
+        "turns": turns,
+        "expected": {
+            "core_investment": {"target_value": target, "years": float(years), "initial_investment": initial},
+            "portfolio": {"assets": list(merged), "weights": [round(w, 4) for w in merged.values()]}
+        },
+        "tags": tags
+    }
+
+
+def generate(count: int, seed: int = 0) -> Iterator[Dict]:
+    rng = random.Random(seed)
+    for index in range(count):
+        yield generate_dialogue(index, rng)
+
+
+def score(expected: Dict, actual: Dict, tolerance: float = 0.01) -> Dict[str, bool]:
+    """逐字段比较提取结果与期望值，actual 的格式与 expected 相同（资产可以是别名）"""
+    result = {}
+    actual_core = actual.get("core_investment") or {}
+    for field, value in expected["core_investment"].items():
+        got = actual_core.get(field)
+        result[field] = got is not None and abs(float(got) - value) <= tolerance * max(abs(value), 1.0)
+    portfolio = actual.get("portfolio") or {}
+    got: Dict[str, float] = {}
+    for asset, weight in zip(portfolio.get("assets") or [], portfolio.get("weights") or []):
+        key = resolve_asset_class(asset)
+        got[key] = got.get(key, 0.0) + float(weight)
+    total = sum(got.values())
+    want = dict(zip(expected["portfolio"]["assets"], expected["portfolio"]["weights"]))
+    result["portfolio"] = bool(total) and set(got) == set(want) and all(
+        abs(got[key] / total - weight) <= tolerance for key, weight in want.items()
+    )
+    return result
+
+
+def evaluate(path: str, extract: Callable[[List[str]], Dict]) -> Dict[str, float]:
+    """用提取函数（输入为整条对话的用户消息，输出为提取结果）跑语料，返回各字段准确率"""
+    totals: Dict[str, int] = {}
+    count = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            count += 1
+            for field, ok in score(record["expected"], extract(record["turns"])).items():
+                totals[field] = totals.get(field, 0) + int(ok)
+    return {field: hits / count for field, hits in totals.items()} if count else {}
+
+
+def _load_function(spec: str) -> Callable:
+    module_name, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合成的中文投资者对话语料")
+    subparsers = parser.add_subparsers(dest="command")
+    evaluate_parser = subparsers.add_parser("evaluate", help="评估提取函数的准确率")
+    evaluate_parser.add_argument("corpus", help="对话语料 JSON lines 文件")
+    evaluate_parser.add_argument("extractor", help="提取函数，格式为 module:function")
+    parser.add_argument("-n", "--count", type=int, default=1000, help="对话条数")
+    parser.add_argument("-o", "--output", help="输出文件，默认输出到标准输出")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    if args.command == "evaluate":
+        for field, accuracy in evaluate(args.corpus, _load_function(args.extractor)).items():
+            print(f"{field:<20}{accuracy:.2%}")
+        return
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for record in generate(args.count, args.seed):
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if args.output:
+        print(f"已生成 {args.count} 条对话: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""多用户并发压测
+
+模拟 N 个用户同时进行脚本化的多轮对话（开场、提供金额与年限、资产配置、修改信息、
+确认并完成风险问卷、投资规划、自由问答），每轮对话走与 pages/chat.py 相同的路径：
+SessionStore 取会话 -> TurnRunner 执行 -> ConversationManager.chat -> 写回会话存储。
+应用目前只有 Streamlit 界面、没有 HTTP API，因此压测在进程内进行。
+
+LLM 默认指向进程内启动的替身服务（tools.llm_server），也可以用 --llm-base 指向外部
+服务，或用 --cassette 回放录制的磁带（不发送请求）。--batch-load 在对话之外持续发送
+批量优先级的 LLM 请求占满 --llm-limit 的额度，用于检查交互请求的延迟是否受影响。
+
+输出吞吐量、按对话状态（本轮开始时的状态）统计的 p50/p95/p99 延迟、每轮 LLM 调用
+次数、错误率和峰值内存，并可以写入 JSON 结果文件用于对比不同版本：
+
+    python -m benchmarks.load_test --users 50 --ttft lognormal:0.3,0.4 --output results.json
+    python -m benchmarks.load_test --scenarios dialogues.jsonl --users 200
+"""
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import src.utils.llm_utils as llm_utils
+from src.utils.llm_utils import LLMUtils
+from src.utils.llm_cassette import Cassette, set_cassette
+from src.utils.llm_dispatcher import LLMDispatcher, PRIORITY_BATCH, set_dispatcher
+from src.utils.event_log import EventLog
+from src.managers.session_manager import SessionStore
+from src.managers.turn_runner import TurnRunner, TURN_COMPLETED
+from src.managers.admission import AdmissionController, AdmissionRejected
+from tools.llm_server import MockLLMServer, add_server_arguments, config_from_args
+
+# 风险问卷每题都回答第一个选项
+_QUESTIONNAIRE = ["A"] * 13
+
+DEFAULT_SCRIPTS: List[List[str]] = [
+    [
+        "你好",
+        "我想投资，计划10年从100万到300万",
+        "股票60%，存款40%",
+        "已婚，有一个孩子，在企业上班",
+        "把目标改成400万",
+        "确认",
+        *_QUESTIONNAIRE,
+        "如果改成15年呢",
+        "什么是ETF"
+    ],
+    [
+        "基金和股票有什么区别",
+        "美股最近走势怎么样",
+        "我想投资，准备5年后有200万，现在有80万",
+        "基金50%，债券30%，存款20%",
+        "5年从80万到200万现实吗",
+        "单身，公务员",
+        "修改一下，年限改成8年",
+        "确认",
+        *_QUESTIONNAIRE,
+        "如果改成10年呢"
+    ],
+    [
+        "指数基金是什么",
+        "我想理财，目标是20年后有1000万",
+        "现在手上有200万",
+        "我没有任何投资",
+        "债券有哪些风险",
+        "已婚，有两个孩子，自由职业",
+        "确认"
+    ]
+]
+
+# 应用在出错或超时降级时的回复前缀
+_ERROR_PREFIX = "抱歉"
+
+_llm_counter: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar("llm_counter", default=None)
+
+
+def _install_llm_counter() -> None:
+    """统计每轮对话的 LLM 调用次数与失败次数"""
+    original = LLMUtils.call_llm
+
+    async def counted_call_llm(*args, **kwargs):
+        counter = _llm_counter.get()
+        if counter is not None:
+            counter[0] += 1
+        try:
+            return await original(*args, **kwargs)
+        except Exception:
+            if counter is not None:
+                counter[1] += 1
+            raise
+
+    LLMUtils.call_llm = staticmethod(counted_call_llm)
+
+
+def load_scenarios(path: Optional[str]) -> List[List[str]]:
+    """读取对话脚本：JSON lines，每行含 "turns" 字段（见 benchmarks.dialogue_generator）"""
+    if not path:
+        return DEFAULT_SCRIPTS
+    scenarios = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                scenarios.append(json.loads(line)["turns"])
+    return scenarios
+
+
+class LoadTest:
+    def __init__(
+        self,
+        scenarios: List[List[str]],
+        think_time: float = 0.0,
+        work_dir: Optional[str] = None,
+        admission: Optional[AdmissionController] = None
+    ):
+        self.scenarios = scenarios
+        self.think_time = think_time
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="load_test_")
+        self.store = SessionStore(
+            spill_dir=os.path.join(self.work_dir, "spill"),
+            event_log=EventLog(os.path.join(self.work_dir, "events"))
+        )
+        self.runner = TurnRunner()
+        self.admission = admission
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.llm_calls: List[int] = []
+        self.llm_failures = 0
+        self.error_replies = 0
+        self.exceptions = 0
+        self.superseded = 0
+        self.rejected = 0
+        self.batch_calls = 0
+        self.batch_failures = 0
+        self.final_states: Dict[str, int] = defaultdict(int)
+
+    async def _turn(self, session_id: str, text: str) -> None:
+        session = self.store.get(session_id)
+        try:
+            state = session.state_manager.current_state.value
+            counter = [0, 0]
+            token = _llm_counter.set(counter)
+            started = time.perf_counter()
+            try:
+                async def turn_fn():
+                    session.add_to_transcript({"role": "user", "content": text})
+                    reply = await session.conversation_manager.chat(text)
+                    session.add_to_transcript({"role": "assistant", "content": reply})
+                    self.store.commit(session_id)
+                    return reply
+
+                async def admitted_turn_fn():
+                    if self.admission is None:
+                        return await turn_fn()
+                    async with self.admission.slot(session_id):
+                        return await turn_fn()
+
+                try:
+                    status, reply = await self.runner.run(session_id, text, admitted_turn_fn)
+                except AdmissionRejected:
+                    status, reply = None, None
+            finally:
+                _llm_counter.reset(token)
+            self.latencies[state].append(time.perf_counter() - started)
+            self.llm_calls.append(counter[0])
+            self.llm_failures += counter[1]
+            if status is None:
+                self.rejected += 1
+            elif status != TURN_COMPLETED:
+                self.superseded += 1
+            elif not reply or reply.startswith(_ERROR_PREFIX):
+                self.error_replies += 1
+        except Exception as e:
+            self.exceptions += 1
+            print(f"❌ 压测对话出错: {str(e)}", file=sys.stderr)
+        finally:
+            self.store.release(session_id)
+
+    async def _user(self, index: int) -> None:
+        session_id = f"load-{index}"
+        for text in self.scenarios[index % len(self.scenarios)]:
+            await self._turn(session_id, text)
+            if self.think_time:
+                await asyncio.sleep(self.think_time)
+        session = self.store.get(session_id)
+        self.final_states[session.state_manager.current_state.value] += 1
+        self.store.release(session_id)
+
+    async def _batch_worker(self, index: int) -> None:
+        """对话之外的批量任务，持续发送批量优先级的请求"""
+        while True:
+            try:
+                await LLMUtils.call_llm(f"请总结第 {index} 位用户的历史对话", priority=PRIORITY_BATCH)
+                self.batch_calls += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.batch_failures += 1
+
+    async def run(self, users: int, concurrency: int, batch_load: int = 0) -> float:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(index: int):
+            async with semaphore:
+                await self._user(index)
+
+        batch_tasks = [asyncio.create_task(self._batch_worker(i)) for i in range(batch_load)]
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(limited(i) for i in range(users)))
+        finally:
+            for task in batch_tasks:
+                task.cancel()
+            await asyncio.gather(*batch_tasks, return_exceptions=True)
+        return time.perf_counter() - started
+
+    def summary(self, elapsed: float) -> Dict:
+        all_latencies = np.array([v for values in self.latencies.values() for v in values])
+        turns = len(all_latencies)
+
+        def stats(values) -> Dict:
+            values = np.asarray(values) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            return {
+                "turns": int(len(values)),
+                "mean_ms": round(float(values.mean()), 2),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "max_ms": round(float(values.max()), 2)
+            }
+
+        return {
+            "turns": turns,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_tps": round(turns / elapsed, 2) if elapsed else 0.0,
+            "latency": stats(all_latencies) if turns else {},
+            "latency_by_state": {state: stats(values) for state, values in sorted(self.latencies.items())},
+            "llm_calls_per_turn": round(float(np.mean(self.llm_calls)), 3) if self.llm_calls else 0.0,
+            "llm_failures": self.llm_failures,
+            "error_reply_rate": round(self.error_replies / turns, 4) if turns else 0.0,
+            "exceptions": self.exceptions,
+            "superseded": self.superseded,
+            "rejected_busy": self.rejected,
+            "batch_calls": self.batch_calls,
+            "batch_failures": self.batch_failures,
+            "final_states": dict(self.final_states),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        }
+
+
+def print_summary(summary: Dict) -> None:
+    print(f"\n共 {summary['turns']} 轮对话，耗时 {summary['elapsed_s']} 秒，吞吐量 {summary['throughput_tps']} 轮/秒")
+    print(f"每轮 LLM 调用 {summary['llm_calls_per_turn']} 次，LLM 失败 {summary['llm_failures']} 次，"
+          f"错误回复率 {summary['error_reply_rate']:.2%}，异常 {summary['exceptions']} 次，"
+          f"繁忙拒绝 {summary['rejected_busy']} 次")
+    print(f"\n{'状态':<20}{'轮数':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}")
+    rows = list(summary["latency_by_state"].items()) + [("ALL", summary["latency"])]
+    for state, row in rows:
+        if row:
+            print(f"{state:<20}{row['turns']:>8}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+                  f"{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}")
+    if "llm_dispatcher" in summary:
+        print(f"\n{'优先级':<14}{'请求数':>8}{'排队':>8}{'老化提升':>10}{'平均等待(ms)':>14}{'最长等待(ms)':>14}")
+        for priority, row in summary["llm_dispatcher"].items():
+            mean_wait = row['wait_total_ms'] / row['granted'] if row['granted'] else 0.0
+            print(f"{priority:<14}{row['granted']:>8}{row['queued']:>8}{row['aged']:>10}"
+                  f"{mean_wait:>14.1f}{row['wait_max_ms']:>14.1f}")
+        print(f"批量请求 {summary['batch_calls']} 次，失败 {summary['batch_failures']} 次")
+    print(f"\n结束时的状态分布: {summary['final_states']}")
+    print(f"峰值内存: RSS {summary['peak_rss_mb']} MB" + (
+        f"，tracemalloc {summary['tracemalloc_peak_mb']} MB" if "tracemalloc_peak_mb" in summary else ""
+    ))
+
+
+async def run_load_test(args: argparse.Namespace) -> Dict:
+    server = None
+    if args.cassette:
+        set_cassette(Cassette(args.cassette, "replay", replay_timing=args.replay_timing))
+    elif args.llm_base:
+        llm_utils.OPENAI_API_BASE = args.llm_base
+    else:
+        server = MockLLMServer(config_from_args(args))
+        llm_utils.OPENAI_API_BASE = await server.start(port=0)
+    _install_llm_counter()
+
+    dispatcher = None
+    if args.llm_limit:
+        dispatcher = LLMDispatcher(max_concurrent=args.llm_limit)
+        set_dispatcher(dispatcher)
+
+    admission = None
+    if args.admission:
+        admission = AdmissionController(max_concurrent=args.admission, queue_timeout=args.queue_timeout)
+    test = LoadTest(load_scenarios(args.scenarios), think_time=args.think_time, admission=admission)
+    if args.tracemalloc:
+        tracemalloc.start()
+    output = sys.stdout if args.verbose else open(os.devnull, "w")
+    try:
+        with contextlib.redirect_stdout(output):
+            elapsed = await test.run(args.users, args.concurrency or args.users, args.batch_load)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if server is not None:
+            await server.stop()
+    summary = test.summary(elapsed)
+    if args.tracemalloc:
+        summary["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+        tracemalloc.stop()
+    if server is not None:
+        summary["llm_server_stats"] = server.stats
+    if dispatcher is not None:
+        summary["llm_dispatcher"] = {
+            priority: {**row, "wait_total_ms": round(row["wait_total_ms"], 1), "wait_max_ms": round(row["wait_max_ms"], 1)}
+            for priority, row in dispatcher.stats.items()
+        }
+    if admission is not None:
+        summary["admission"] = {**admission.stats, **admission.status()}
+    summary["config"] = {
+        "users": args.users,
+        "concurrency": args.concurrency or args.users,
+        "scenarios": args.scenarios or "default",
+        "llm": "cassette" if args.cassette else (args.llm_base or "mock"),
+        "admission": args.admission,
+        "llm_limit": args.llm_limit,
+        "batch_load": args.batch_load,
+        "ttft": args.ttft,
+        "tps": args.tps
+    }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多用户并发压测")
+    parser.add_argument("--users", type=int, default=20, help="模拟用户数")
+    parser.add_argument("--concurrency", type=int, default=0, help="同时进行对话的用户数，默认等于用户数")
+    parser.add_argument("--scenarios", help="对话脚本 JSON lines 文件，默认使用内置脚本")
+    parser.add_argument("--think-time", type=float, default=0.0, help="用户两轮之间的等待时间（秒）")
+    parser.add_argument("--llm-base", help="外部 LLM 服务地址，默认在进程内启动替身服务")
+    parser.add_argument("--cassette", help="回放 LLM 磁带，不发送请求")
+    parser.add_argument("--replay-timing", action="store_true", help="回放时按录制的耗时等待")
+    parser.add_argument("--admission", type=int, default=0, help="启用准入控制并设置同时执行的轮次上限，0 表示不启用")
+    parser.add_argument("--queue-timeout", type=float, default=5.0, help="准入控制的排队时间上限（秒）")
+    parser.add_argument("--llm-limit", type=int, default=0, help="同时进行的 LLM 请求上限，0 表示使用默认配置")
+    parser.add_argument("--batch-load", type=int, default=0, help="对话之外持续发送批量请求的任务数")
+    parser.add_argument("--tracemalloc", action="store_true", help="用 tracemalloc 统计 Python 分配的峰值内存（较慢）")
+    parser.add_argument("--output", help="结果 JSON 文件")
+    parser.add_argument("--verbose", action="store_true", help="保留应用的调试输出")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    summary = asyncio.run(run_load_test(args))
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,50 @@
 import streamlit as st
-from src.managers.conversation_manager import ConversationManager
-from src.managers.state_manager import StateManager
-from src.config.config_manager import ConfigManager
+from src.managers.session_manager import SessionStore
+from src.managers.turn_runner import TurnRunner, TURN_SUPERSEDED, TURN_DUPLICATE, current_turn_superseded
+from src.managers.admission import AdmissionController, AdmissionRejected, LOAD_NORMAL
 import asyncio
+import uuid
+
+@st.cache_resource
+def get_session_store() -> SessionStore:
+    """获取进程内共享的会话存储"""
+    return SessionStore()
+
+@st.cache_resource
+def get_turn_runner() -> TurnRunner:
+    """获取进程内共享的对话轮次跟踪器"""
+    return TurnRunner()
+
+@st.cache_resource
+def get_admission_controller() -> AdmissionController:
+    """获取进程内共享的准入控制器"""
+    return AdmissionController()
 
 class ChatUI:
     def __init__(self):
         self.init_session_state()
         
-        # 从session_state获取或初始化managers
-        if 'managers' not in st.session_state:
-            print("初始化管理器...")
-            st.session_state.managers = {
-                'config_manager': ConfigManager(),
-                'state_manager': StateManager(),
-            }
-            st.session_state.managers['conversation_manager'] = ConversationManager(
-                config_manager=st.session_state.managers['config_manager'],
-                state_manager=st.session_state.managers['state_manager']
-            )
-        
-        # 使用session_state中的managers
-        self.config_manager = st.session_state.managers['config_manager']
-        self.state_manager = st.session_state.managers['state_manager']
-        self.conversation_manager = st.session_state.managers['conversation_manager']
+        # 从进程级会话存储获取或恢复当前用户的managers（本次运行结束前保持固定）
+        self.session_store = get_session_store()
+        self.turn_runner = get_turn_runner()
+        self.admission = get_admission_controller()
+        self._bind_session(self.session_store.get(st.session_state.session_id))
+    
+    def _bind_session(self, session):
+        """绑定会话中的managers"""
+        self.session = session
+        self.config_manager = session.config_manager
+        self.state_manager = session.state_manager
+        self.conversation_manager = session.conversation_manager
+    
+    def release_session(self):
+        """解除对会话的固定，允许存储在需要时淘汰它"""
+        self.session_store.release(st.session_state.session_id)
     
     def init_session_state(self):
         """初始化session state"""
-        if 'messages' not in st.session_state:
-            st.session_state.messages = []
+        if 'session_id' not in st.session_state:
+            st.session_state.session_id = uuid.uuid4().hex
         if 'risk_assessment_complete' not in st.session_state:
             st.session_state.risk_assessment_complete = False
     
@@ -48,9 +64,48 @@ class ChatUI:
         if not user_input:
             return
         
+        # 同一会话开始新的一轮时，尚未完成的旧一轮会被取消；上一轮还在处理时重复提交的相同消息只处理一次
+        status, _ = await self.turn_runner.run(
+            st.session_state.session_id,
+            user_input,
+            lambda: self._admitted_turn(user_input)
+        )
+        if status == TURN_SUPERSEDED:
+            print("本轮对话已被用户的新消息取代，结果未保存")
+        elif status == TURN_DUPLICATE:
+            st.session_state.session_notice = f"「{user_input}」与上一条消息相同且仍在处理中，本次重复发送已忽略。"
+    
+    async def _admitted_turn(self, user_input: str):
+        """取得执行名额后执行一轮对话；系统繁忙时不调用 LLM，直接提示用户稍后再试"""
+        try:
+            # 多租户部署时在这里传入租户标识（tenant=...），按租户公平排队
+            async with self.admission.slot(st.session_state.session_id):
+                await self._process_turn(user_input)
+        except AdmissionRejected as e:
+            print(f"系统繁忙，本轮对话未被接纳: {e.reason}")
+            st.session_state.session_notice = e.busy_reply()
+    
+    async def _process_turn(self, user_input: str):
+        """执行一轮对话并写回会话存储，写回冲突时基于最新版本重试一次"""
+        session_id = st.session_state.session_id
+        for attempt in range(2):
+            await self._run_turn(user_input)
+            if current_turn_superseded():
+                return
+            # 重新估算会话大小、执行内存限制并写回共享后端
+            if self.session_store.commit(session_id):
+                return
+            # 其他 worker 同时更新了该会话：基于最新版本重新处理这一轮
+            print(f"警告: 会话写回冲突，基于最新版本重新处理本轮对话 (尝试 {attempt + 1}/2)")
+            self._bind_session(self.session_store.reload(session_id))
+        
+        st.session_state.session_notice = "您的会话同时在其他窗口中被更新，本轮对话结果未能保存，请确认后重新发送。"
+    
+    async def _run_turn(self, user_input: str):
+        """在当前绑定的会话上执行一轮对话"""
         try:
             # 添加用户消息
-            st.session_state.messages.append({"role": "user", "content": user_input})
+            self.session.add_to_transcript({"role": "user", "content": user_input})
             
             # 获取助手回复
             with st.spinner('思考中...'):
@@ -59,7 +114,7 @@ class ChatUI:
                 
                 if response:
                     # 添加助手消息
-                    st.session_state.messages.append({"role": "assistant", "content": response})
+                    self.session.add_to_transcript({"role": "assistant", "content": response})
                     print("消息已添加到会话状态")
                 else:
                     print("警告：收到空回复")
@@ -68,7 +123,7 @@ class ChatUI:
         except Exception as e:
             print(f"\n❌ 处理消息时出错: {str(e)}")
             st.error(f"处理消息时出错: {str(e)}")
-            st.session_state.messages.append({
+            self.session.add_to_transcript({
                 "role": "assistant",
                 "content": "抱歉，我现在遇到了一些问题。请稍后再试。"
             })
@@ -77,6 +132,10 @@ class ChatUI:
         """渲染对话界面"""
         st.title("💬 智能对话")
         
+        # 显示上一轮遗留的提示（例如会话写回冲突）
+        if notice := st.session_state.pop("session_notice", None):
+            st.warning(notice)
+        
         # 侧边栏显示系统状态
         with st.sidebar:
             st.subheader("系统状态")
@@ -93,8 +152,15 @@ class ChatUI:
             current_state = self.state_manager.current_state.value
             st.info(f"当前阶段：{state_labels.get(current_state, current_state)}")
             
+            # 系统负载较高时提示用户
+            load = self.admission.status()
+            if load['level'] != LOAD_NORMAL:
+                st.warning(f"⏳ 当前咨询的用户较多，回复可能需要多等待约 {max(1, round(load['estimated_wait']))} 秒")
+            
             # 显示风险评估状态
-            if st.session_state.get("risk_assessment_complete"):
+            # 风险评估可以在评估页面完成，也可以在对话中完成
+            if st.session_state.get("risk_assessment_complete") or \
+                    config.get('risk_profile', {}).get('score') is not None:
                 st.success("✅ 风险评估已完成")
                 if config.get('risk_profile', {}).get('score') is not None:
                     st.write("\n📊 风险评估结果:")
@@ -127,7 +193,7 @@ class ChatUI:
                     st.write(f"- {asset}: {weight*100:.1f}%")
         
         # 显示对话历史
-        for message in st.session_state.messages:
+        for message in self.session.transcript:
             with st.chat_message(message["role"]):
                 st.write(message["content"])
         
@@ -142,7 +208,10 @@ class ChatUI:
 
 def main():
     chat_ui = ChatUI()
-    chat_ui.render()
+    try:
+        chat_ui.render()
+    finally:
+        chat_ui.release_session()
 
 if __name__ == "__main__":
     main() 
@@ -1,8 +1,6 @@
 import streamlit as st
-import json
-from pathlib import Path
-import os
 from typing import Dict, Optional
+from src.managers.risk_questionnaire import get_questionnaire, QuestionnaireError
 
 class RiskAssessmentUI:
     def __init__(self):
@@ -10,33 +8,14 @@ class RiskAssessmentUI:
         self.init_session_state()
     
     def load_questions(self) -> list:
-        """加载风险评估问题"""
+        """加载风险评估问题（来自进程内共享的问卷缓存，文件修改后自动重新加载）"""
         try:
-            # 尝试多个可能的路径
-            possible_paths = [
-                Path(__file__).parent.parent / "risk_question.json",  # 相对于当前文件的路径
-                Path.cwd() / "risk_question.json",  # 相对于当前工作目录的路径
-                Path(os.path.dirname(os.path.abspath(__file__))).parent / "risk_question.json"  # 使用绝对路径
-            ]
-            
-            for path in possible_paths:
-                if path.exists():
-                    with open(path, 'r', encoding='utf-8') as f:
-                        questions = json.load(f)
-                        print(f"成功从路径加载问题: {path}")
-                        return questions
-            
-            # 如果所有路径都失败，尝试直接从streamlit的运行目录加载
-            with open("risk_question.json", 'r', encoding='utf-8') as f:
-                questions = json.load(f)
-                print("成功从当前目录加载问题")
-                return questions
-                
-        except Exception as e:
+            self.questionnaire = get_questionnaire()
+            return self.questionnaire.questions
+        except QuestionnaireError as e:
             st.error(f"加载风险评估问题时出错: {str(e)}")
             print(f"错误详情: {str(e)}")
-            print(f"当前工作目录: {os.getcwd()}")
-            print(f"尝试的路径: {[str(p) for p in possible_paths]}")
+            self.questionnaire = None
             return []
     
     def init_session_state(self):
@@ -51,16 +30,10 @@ class RiskAssessmentUI:
             st.session_state.risk_assessment_complete = False
     
     def calculate_risk_tolerance(self) -> str:
-        """计算风险承受能力类型"""
-        total_score = st.session_state.total_score
-        if total_score <= 20:
-            return "保守型"
-        elif total_score <= 30:
-            return "稳健型"
-        elif total_score <= 40:
-            return "进取型"
-        else:
-            return "激进型"
+        """计算风险承受能力类型，分档由问卷的总分范围决定"""
+        if self.questionnaire is None:
+            return "未知"
+        return self.questionnaire.tolerance_for(st.session_state.total_score)
     
     def reset_assessment(self):
         """重置评估"""
@@ -12,4 +12,13 @@ MAX_TOKENS = int(os.getenv("MAX_TOKENS", "2000"))
 # API 请求配置
 REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "30"))  # 请求超时时间（秒）
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))      # 最大重试次数
-RETRY_INTERVAL = int(os.getenv("RETRY_INTERVAL", "1"))   # 重试间隔（秒）
\ No newline at end of file
+RETRY_INTERVAL = int(os.getenv("RETRY_INTERVAL", "1"))   # 重试间隔（秒）
+TURN_TIMEOUT = float(os.getenv("TURN_TIMEOUT", "45"))   # 单轮对话的总时间预算（秒），包括所有 LLM 调用和重试
+# LLM 调用的录制与回放（见 src.utils.llm_cassette）
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off")                   # off / record / replay
+LLM_CASSETTE_PATH = os.getenv("LLM_CASSETTE_PATH", ".cassettes/llm.jsonl")  # 磁带文件
+LLM_CASSETTE_REPLAY_TIMING = os.getenv("LLM_CASSETTE_REPLAY_TIMING", "false").lower() == "true"  # 回放时是否按录制耗时等待
+# LLM 调用的优先级调度（见 src.utils.llm_dispatcher）
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "32"))             # 同时进行的 LLM 请求上限
+LLM_INTERACTIVE_RESERVE = int(os.getenv("LLM_INTERACTIVE_RESERVE", "4"))    # 只留给交互请求的名额
+LLM_PRIORITY_AGING = float(os.getenv("LLM_PRIORITY_AGING", "2"))            # 每等待这么多秒，优先级提升一级
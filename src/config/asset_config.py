@@ -0,0 +1,121 @@
+"""资产类别与资本市场假设
+
+规划计算（蒙特卡洛模拟、可行性计算、有效前沿）共用的资产注册表。收益率与波动率
+均为年化的长期假设，可以通过 CAPITAL_MARKET_ASSUMPTIONS 环境变量指向一个 JSON
+文件覆盖，格式与 ASSET_CLASSES / ASSET_CORRELATIONS 相同。
+"""
+import hashlib
+import json
+import os
+
+# 资产类别：年化预期收益率、年化波动率，以及用户描述中可能出现的别名
+ASSET_CLASSES = {
+    "cash": {
+        "name": "现金及存款",
+        "expected_return": 0.020,
+        "volatility": 0.005,
+        "aliases": ["现金", "存款", "活期", "定期", "货币基金", "余额宝", "银行理财"]
+    },
+    "bond": {
+        "name": "债券",
+        "expected_return": 0.035,
+        "volatility": 0.040,
+        "aliases": ["债券", "债基", "债券基金", "国债", "固收", "纯债"]
+    },
+    "balanced": {
+        "name": "混合型基金",
+        "expected_return": 0.055,
+        "volatility": 0.110,
+        "aliases": ["基金", "混合基金", "混合型基金", "理财"]
+    },
+    "equity": {
+        "name": "A股股票",
+        "expected_return": 0.075,
+        "volatility": 0.220,
+        "aliases": ["股票", "A股", "股票基金", "指数基金", "ETF", "偏股基金"]
+    },
+    "global_equity": {
+        "name": "海外股票",
+        "expected_return": 0.070,
+        "volatility": 0.170,
+        "aliases": ["美股", "港股", "海外股票", "QDII", "纳斯达克", "标普"]
+    },
+    "gold": {
+        "name": "黄金",
+        "expected_return": 0.040,
+        "volatility": 0.150,
+        "aliases": ["黄金", "贵金属", "黄金ETF"]
+    },
+    "real_estate": {
+        "name": "房地产",
+        "expected_return": 0.040,
+        "volatility": 0.120,
+        "aliases": ["房产", "房地产", "房子", "REITs", "REIT"]
+    }
+}
+
+# LLM 分析结果中常见的英文资产名称（按整词匹配，复数形式也能识别）
+ASSET_ENGLISH_ALIASES = {
+    "cash": ["cash", "deposit", "savings", "time deposit", "money market", "money market fund"],
+    "bond": ["bond", "bond fund", "treasury", "treasuries", "government bond", "fixed income"],
+    "balanced": ["fund", "mutual fund", "mixed fund", "balanced fund", "hybrid fund", "wealth management"],
+    "equity": ["stock", "equity", "equities", "share", "a share", "stock fund", "equity fund", "index fund", "etf"],
+    "global_equity": [
+        "us stock", "us equity", "us equities", "global stock", "global equity", "global equities",
+        "international stock", "foreign stock", "overseas stock", "hk stock", "hong kong stock",
+        "nasdaq", "s&p 500", "sp500", "qdii"
+    ],
+    "gold": ["gold", "gold etf", "precious metal"],
+    "real_estate": ["real estate", "property", "properties", "house", "housing", "reit"]
+}
+
+# 无法识别的资产按混合型基金处理
+DEFAULT_ASSET_CLASS = "balanced"
+
+# 资产类别之间的相关系数（对称，未列出的组合为 0）
+ASSET_CORRELATIONS = {
+    ("bond", "balanced"): 0.30,
+    ("bond", "equity"): -0.10,
+    ("bond", "global_equity"): 0.00,
+    ("bond", "gold"): 0.10,
+    ("bond", "real_estate"): 0.10,
+    ("balanced", "equity"): 0.85,
+    ("balanced", "global_equity"): 0.50,
+    ("balanced", "gold"): 0.05,
+    ("balanced", "real_estate"): 0.30,
+    ("equity", "global_equity"): 0.55,
+    ("equity", "gold"): 0.00,
+    ("equity", "real_estate"): 0.35,
+    ("global_equity", "gold"): 0.05,
+    ("global_equity", "real_estate"): 0.30,
+    ("gold", "real_estate"): 0.05
+}
+
+_assumptions_path = os.getenv("CAPITAL_MARKET_ASSUMPTIONS", "")
+if _assumptions_path:
+    with open(_assumptions_path, 'r', encoding='utf-8') as _f:
+        _overrides = json.load(_f)
+    for _key, _values in _overrides.get("asset_classes", {}).items():
+        ASSET_CLASSES.setdefault(_key, {"name": _key, "aliases": []}).update(_values)
+    for _pair, _value in _overrides.get("correlations", {}).items():
+        ASSET_CORRELATIONS[tuple(_pair.split(","))] = _value
+
+# 规划计算的默认参数
+PLANNING_DEFAULT_RETURN = float(os.getenv("PLANNING_DEFAULT_RETURN", "0.05"))   # 可行性计算假设的年化收益率
+PLANNING_SIMULATION_PATHS = int(os.getenv("PLANNING_SIMULATION_PATHS", "100000"))  # 蒙特卡洛模拟路径数
+PLANNING_SIMULATION_CHUNK = int(os.getenv("PLANNING_SIMULATION_CHUNK", "20000"))  # 每块模拟的路径数，决定内存占用
+PLANNING_RANDOM_SEED = int(os.getenv("PLANNING_RANDOM_SEED", "20240101"))       # 模拟使用的随机种子
+PLANNING_TABLE_DIR = os.getenv("PLANNING_TABLE_DIR", ".planning")                # 预计算表（有效前沿等）的存放目录
+BACKTEST_DATA_DIR = os.getenv("BACKTEST_DATA_DIR", "data/backtest")             # 历史月度收益率数据集的存放目录
+
+
+def assumptions_fingerprint() -> str:
+    """资本市场假设的指纹，假设变化时预计算的表需要重建"""
+    payload = json.dumps({
+        "assets": {
+            key: [spec["expected_return"], spec["volatility"]]
+            for key, spec in sorted(ASSET_CLASSES.items())
+        },
+        "correlations": sorted([list(pair) + [value] for pair, value in ASSET_CORRELATIONS.items()])
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
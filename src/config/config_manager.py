@@ -1,30 +1,34 @@
 from typing import Dict, List, Optional
 from dataclasses import dataclass, field
+from src.utils import binary_codec
 
-@dataclass
+# 二进制编码的 schema 版本，字段顺序变化时需要递增
+CONFIG_SCHEMA_VERSION = 1
+
+@dataclass(slots=True)
 class CoreInvestment:
     target_value: Optional[float] = None
     years: Optional[float] = None
     initial_investment: Optional[float] = None
 
-@dataclass
+@dataclass(slots=True)
 class RiskProfile:
     score: Optional[int] = None
     tolerance: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class Portfolio:
     assets: Optional[List[str]] = None
     weights: Optional[List[float]] = None
 
-@dataclass
+@dataclass(slots=True)
 class PersonalInfo:
     family_status: Optional[str] = None
     employment: Optional[str] = None
     wealth_source: Optional[str] = None
     investment_goal: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class FinancialInfo:
     cash_deposits: Optional[float] = None
     investments: Optional[float] = None
@@ -36,7 +40,7 @@ class FinancialInfo:
     other_debt: Optional[float] = None
     account_debt: Optional[float] = None
 
-@dataclass
+@dataclass(slots=True)
 class UserInfo:
     personal: PersonalInfo = field(default_factory=PersonalInfo)
     financial: FinancialInfo = field(default_factory=FinancialInfo)
@@ -146,4 +150,49 @@ class ConfigManager:
                     for field in FinancialInfo.__dataclass_fields__
                 }
             }
-        }
\ No newline at end of file
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ConfigManager":
+        """从字典格式恢复配置"""
+        manager = cls()
+        core_investment = data.get("core_investment", {})
+        manager.update_core_investment(**core_investment)
+        risk_profile = data.get("risk_profile", {})
+        manager.update_risk_profile(
+            score=risk_profile.get("score"),
+            tolerance=risk_profile.get("tolerance")
+        )
+        portfolio = data.get("portfolio", {})
+        manager.update_portfolio(
+            assets=portfolio.get("assets"),
+            weights=portfolio.get("weights")
+        )
+        user_info = data.get("user_info", {})
+        manager.update_user_info("personal", **user_info.get("personal", {}))
+        manager.update_user_info("financial", **user_info.get("financial", {}))
+        return manager
+
+    def to_bytes(self) -> bytes:
+        """编码为紧凑的二进制格式（字段按定义顺序位置编码）"""
+        return binary_codec.pack(binary_codec.KIND_CONFIG, CONFIG_SCHEMA_VERSION, [
+            [getattr(self.core_investment, field) for field in CoreInvestment.__dataclass_fields__],
+            [getattr(self.risk_profile, field) for field in RiskProfile.__dataclass_fields__],
+            [getattr(self.portfolio, field) for field in Portfolio.__dataclass_fields__],
+            [getattr(self.user_info.personal, field) for field in PersonalInfo.__dataclass_fields__],
+            [getattr(self.user_info.financial, field) for field in FinancialInfo.__dataclass_fields__]
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ConfigManager":
+        """从二进制格式恢复配置"""
+        schema_version, values = binary_codec.unpack(data, binary_codec.KIND_CONFIG)
+        if schema_version != CONFIG_SCHEMA_VERSION:
+            raise binary_codec.SchemaVersionError(f"不支持的配置 schema 版本: {schema_version}")
+        core, risk, portfolio, personal, financial = values
+        manager = cls()
+        manager.core_investment = CoreInvestment(*core)
+        manager.risk_profile = RiskProfile(*risk)
+        manager.portfolio = Portfolio(*portfolio)
+        manager.user_info = UserInfo(PersonalInfo(*personal), FinancialInfo(*financial))
+        return manager
@@ -0,0 +1,43 @@
+"""会话存储配置"""
+import os
+
+# 会话数量与空闲时间限制
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "1000"))        # 内存中最多保留的会话数
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", "1800"))          # 会话空闲超时时间（秒）
+
+# 内存占用限制
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", "262144"))      # 单个会话的近似内存上限（字节）
+SESSION_MAX_TOTAL_BYTES = int(os.getenv("SESSION_MAX_TOTAL_BYTES", "268435456"))  # 所有会话的近似内存上限（字节）
+SESSION_MAX_TRANSCRIPT = int(os.getenv("SESSION_MAX_TRANSCRIPT", "200"))  # 单个会话保留的界面展示消息数
+
+# 淘汰会话的落盘目录
+SESSION_SPILL_DIR = os.getenv("SESSION_SPILL_DIR", ".sessions")
+
+# 跨进程共享会话后端，例如 sqlite:///.sessions/sessions.db 或 redis://localhost:6379/0
+# 为空时会话只保存在当前进程中
+SESSION_BACKEND_URL = os.getenv("SESSION_BACKEND_URL", "")
+SESSION_BACKEND_TTL = int(os.getenv("SESSION_BACKEND_TTL", "604800"))   # 共享后端中会话的过期时间（秒）
+SESSION_BACKEND_TIMEOUT = float(os.getenv("SESSION_BACKEND_TIMEOUT", "5"))  # 后端连接/锁等待超时（秒）
+
+# 对话事件日志，为空时不记录
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR", ".sessions/events")
+EVENT_LOG_SHARDS = int(os.getenv("EVENT_LOG_SHARDS", "16"))                  # 日志分片数
+EVENT_SNAPSHOT_INTERVAL = int(os.getenv("EVENT_SNAPSHOT_INTERVAL", "20"))    # 每隔多少轮保存一次会话快照
+EVENT_LOG_FSYNC = os.getenv("EVENT_LOG_FSYNC", "false").lower() == "true"    # 每条事件写入后是否 fsync
+
+# 上一轮仍在处理、且开始不到该时间（秒）时重复提交的相同消息只处理一次
+TURN_DEDUP_WINDOW = float(os.getenv("TURN_DEDUP_WINDOW", "3"))
+
+# 回复生成之后的后台任务（对话历史、事件日志等）
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "2"))               # 后台线程数，同一会话的任务总在同一线程中按顺序执行
+BACKGROUND_MAX_PENDING = int(os.getenv("BACKGROUND_MAX_PENDING", "1000"))    # 排队任务数上限
+BACKGROUND_OVERFLOW = os.getenv("BACKGROUND_OVERFLOW", "inline")             # 队列满时：inline 在调用方执行，drop 丢弃可丢弃的任务
+BACKGROUND_DRAIN_TIMEOUT = float(os.getenv("BACKGROUND_DRAIN_TIMEOUT", "10"))  # 进程退出时等待队列清空的时间（秒）
+DEBUG_DUMPS = os.getenv("DEBUG_DUMPS", "false").lower() == "true"             # 是否输出分析结果、配置等的 JSON 调试信息（在后台线程中格式化）
+
+# 对话轮次的准入控制
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "32"))     # 同时执行的对话轮次上限
+ADMISSION_MAX_PER_SESSION = int(os.getenv("ADMISSION_MAX_PER_SESSION", "1"))    # 单个会话同时执行的轮次上限
+ADMISSION_MAX_PER_TENANT = int(os.getenv("ADMISSION_MAX_PER_TENANT", "0"))      # 单个租户同时执行的轮次上限，0 表示不限制
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "200"))              # 排队等待的轮次上限，超出时立即拒绝
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))      # 排队时间上限（秒），预计等待超过该值时立即拒绝
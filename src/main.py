@@ -2,6 +2,7 @@ from typing import Dict, Optional
 from src.managers.state_manager import StateManager, ConversationState
 from src.managers.conversation_manager import ConversationManager
 from src.config.config_manager import ConfigManager
+from src.utils.analysis_models import AnalysisResult
 
 class FinancialAdvisor:
     def __init__(self):
@@ -34,7 +35,7 @@ class FinancialAdvisor:
         
         return response
     
-    def _update_state(self, strategy: Dict, analysis: Dict) -> None:
+    def _update_state(self, strategy: Dict, analysis: AnalysisResult) -> None:
         """根据策略和分析结果更新状态"""
         current_state = self.state_manager.current_state
         
@@ -48,7 +49,7 @@ class FinancialAdvisor:
                 self.state_manager.transition_to(ConversationState.FREE_CHAT)
         
         # 更新问题计数器
-        is_question = analysis.get("intent") == "question"
+        is_question = analysis.intent == "question"
         self.state_manager.update_question_counter(is_question)
         
         # 更新当前关注点
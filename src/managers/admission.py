@@ -0,0 +1,262 @@
+"""对话轮次的准入控制与公平排队
+
+每一轮对话在调用 ConversationManager.chat 之前先取得执行名额：
+    - 全局同时执行的轮次不超过 max_concurrent，单个会话、单个租户也有各自的上限
+    - 名额不足时排队，释放名额时按 租户 -> 会话 轮转选择下一个等待者，同一会话内按
+      先后顺序，发消息频繁的用户不会挤占其他用户
+    - 排队时间不超过 queue_timeout（SLO）；队列已满，或按最近的平均耗时估计的等待
+      时间超过 SLO 时立即拒绝，由调用方返回 "繁忙" 回复，而不是让所有请求一起超时
+status() 给出当前负载等级与预计等待时间，供前端提示用户。
+
+Streamlit 的每次运行在各自线程的事件循环中执行，等待者在各自的事件循环中等待，
+名额通过 call_soon_threadsafe 交给等待者，控制器可以跨线程共享。
+"""
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+import asyncio
+import threading
+import time
+from src.config.session_config import (
+    ADMISSION_MAX_CONCURRENT,
+    ADMISSION_MAX_PER_SESSION,
+    ADMISSION_MAX_PER_TENANT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT
+)
+
+DEFAULT_TENANT = "default"
+
+# 负载等级
+LOAD_NORMAL = "normal"
+LOAD_BUSY = "busy"
+LOAD_OVERLOADED = "overloaded"
+
+# 拒绝原因
+REJECT_QUEUE_FULL = "queue_full"
+REJECT_SLO = "slo"
+REJECT_TIMEOUT = "timeout"
+
+BUSY_REPLY = "当前咨询的用户较多，请您约 {retry_after} 秒后再发送一次。"
+
+# 平均耗时的平滑系数，以及拒绝后保持 overloaded 等级的时间（秒）
+_EWMA_ALPHA = 0.2
+_OVERLOAD_HOLD = 10.0
+
+
+class AdmissionRejected(Exception):
+    """本轮对话未被接纳"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"对话轮次未被接纳: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def busy_reply(self) -> str:
+        return BUSY_REPLY.format(retry_after=max(1, round(self.retry_after)))
+
+
+class _Waiter:
+    __slots__ = ("session_id", "tenant", "loop", "future", "granted")
+
+    def __init__(self, session_id: str, tenant: str):
+        self.session_id = session_id
+        self.tenant = tenant
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+        self.granted = False
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        max_per_session: int = ADMISSION_MAX_PER_SESSION,
+        max_per_tenant: int = ADMISSION_MAX_PER_TENANT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_per_session = max(1, max_per_session)
+        self.max_per_tenant = max_per_tenant
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        # 租户 -> 会话 -> 等待者，两层都按轮转顺序排列
+        self._queues: "OrderedDict[str, OrderedDict[str, Deque[_Waiter]]]" = OrderedDict()
+        self._queued = 0
+        self._active = 0
+        self._active_sessions: Dict[str, int] = {}
+        self._active_tenants: Dict[str, int] = {}
+        self._avg_turn: Optional[float] = None
+        self._last_rejected = 0.0
+        self.stats = {
+            'admitted': 0,
+            'queued': 0,
+            REJECT_QUEUE_FULL: 0,
+            REJECT_SLO: 0,
+            REJECT_TIMEOUT: 0,
+            'cancelled': 0
+        }
+
+    @asynccontextmanager
+    async def slot(self, session_id: str, tenant: Optional[str] = None):
+        """取得执行名额，未被接纳时抛出 AdmissionRejected"""
+        tenant = tenant or DEFAULT_TENANT
+        await self.acquire(session_id, tenant)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(session_id, tenant, time.monotonic() - started)
+
+    async def acquire(self, session_id: str, tenant: str = DEFAULT_TENANT) -> None:
+        waiter = _Waiter(session_id, tenant)
+        with self._lock:
+            if not self._queued and self._eligible(session_id, tenant):
+                self._grant(waiter)
+                return
+            if self._queued >= self.max_queue:
+                raise self._reject(REJECT_QUEUE_FULL)
+            wait = self._estimated_wait(self._queued + 1)
+            if wait is not None and wait > self.queue_timeout:
+                raise self._reject(REJECT_SLO)
+            self._queues.setdefault(tenant, OrderedDict()).setdefault(session_id, deque()).append(waiter)
+            self._queued += 1
+            self.stats['queued'] += 1
+            self._dispatch()
+            if waiter.granted:
+                return
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if not waiter.granted:
+                    self._remove(waiter)
+                    raise self._reject(REJECT_TIMEOUT)
+        except asyncio.CancelledError:
+            # 本轮被取代或取消：已经拿到的名额要还回去
+            with self._lock:
+                self.stats['cancelled'] += 1
+                if waiter.granted:
+                    self._release_locked(session_id, tenant, None)
+                else:
+                    self._remove(waiter)
+            raise
+
+    def release(self, session_id: str, tenant: str = DEFAULT_TENANT, elapsed: Optional[float] = None) -> None:
+        with self._lock:
+            self._release_locked(session_id, tenant, elapsed)
+
+    def status(self) -> Dict:
+        """当前负载，供前端展示（负载等级、排队数、预计等待秒数）"""
+        with self._lock:
+            wait = self._estimated_wait(self._queued) or 0.0
+            utilization = self._active / self.max_concurrent
+            if time.monotonic() - self._last_rejected < _OVERLOAD_HOLD or wait > self.queue_timeout / 2:
+                level = LOAD_OVERLOADED
+            elif self._queued or utilization >= 0.8:
+                level = LOAD_BUSY
+            else:
+                level = LOAD_NORMAL
+            return {
+                'level': level,
+                'active': self._active,
+                'queued': self._queued,
+                'max_concurrent': self.max_concurrent,
+                'utilization': round(utilization, 3),
+                'estimated_wait': round(wait, 2),
+                'avg_turn_seconds': round(self._avg_turn, 3) if self._avg_turn is not None else None
+            }
+
+    def _eligible(self, session_id: str, tenant: str) -> bool:
+        if self._active >= self.max_concurrent:
+            return False
+        if self._active_sessions.get(session_id, 0) >= self.max_per_session:
+            return False
+        return not self.max_per_tenant or self._active_tenants.get(tenant, 0) < self.max_per_tenant
+
+    def _grant(self, waiter: _Waiter) -> None:
+        waiter.granted = True
+        self._active += 1
+        self._active_sessions[waiter.session_id] = self._active_sessions.get(waiter.session_id, 0) + 1
+        self._active_tenants[waiter.tenant] = self._active_tenants.get(waiter.tenant, 0) + 1
+        self.stats['admitted'] += 1
+
+    def _dispatch(self) -> None:
+        """按 租户 -> 会话 轮转把空出的名额交给等待者"""
+        while self._queued and self._active < self.max_concurrent:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return  # 剩余等待者都受会话或租户上限限制
+            self._grant(waiter)
+            try:
+                waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+            except RuntimeError:
+                # 等待者的事件循环已关闭，名额还回去
+                self._release_locked(waiter.session_id, waiter.tenant, None, dispatch=False)
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        for tenant, sessions in self._queues.items():
+            if self.max_per_tenant and self._active_tenants.get(tenant, 0) >= self.max_per_tenant:
+                continue
+            for session_id, waiters in sessions.items():
+                if self._active_sessions.get(session_id, 0) >= self.max_per_session:
+                    continue
+                waiter = waiters.popleft()
+                self._queued -= 1
+                # 轮转：本会话、本租户移到末尾
+                if waiters:
+                    sessions.move_to_end(session_id)
+                else:
+                    del sessions[session_id]
+                if sessions:
+                    self._queues.move_to_end(tenant)
+                else:
+                    del self._queues[tenant]
+                return waiter
+        return None
+
+    def _remove(self, waiter: _Waiter) -> None:
+        sessions = self._queues.get(waiter.tenant)
+        waiters = sessions.get(waiter.session_id) if sessions else None
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        self._queued -= 1
+        if not waiters:
+            del sessions[waiter.session_id]
+            if not sessions:
+                del self._queues[waiter.tenant]
+
+    def _release_locked(self, session_id: str, tenant: str, elapsed: Optional[float], dispatch: bool = True) -> None:
+        self._active -= 1
+        for counts, key in ((self._active_sessions, session_id), (self._active_tenants, tenant)):
+            count = counts.get(key, 0) - 1
+            if count > 0:
+                counts[key] = count
+            else:
+                counts.pop(key, None)
+        if elapsed is not None:
+            self._avg_turn = elapsed if self._avg_turn is None else \
+                (1 - _EWMA_ALPHA) * self._avg_turn + _EWMA_ALPHA * elapsed
+        if dispatch:
+            self._dispatch()
+
+    def _estimated_wait(self, position: int) -> Optional[float]:
+        """排在第 position 位时的预计等待时间，还没有耗时数据时返回 None"""
+        if self._avg_turn is None:
+            return None
+        return position / self.max_concurrent * self._avg_turn
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.stats[reason] += 1
+        self._last_rejected = time.monotonic()
+        retry_after = self._estimated_wait(self._queued) or self.queue_timeout
+        return AdmissionRejected(reason, max(retry_after, 1.0))
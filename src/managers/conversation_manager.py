@@ -1,9 +1,30 @@
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from src.managers.state_manager import StateManager, ConversationState
-from src.config.config_manager import ConfigManager
+from src.config.config_manager import ConfigManager, Portfolio
+from src.managers.risk_assessment_manager import RiskAssessmentManager
 from src.utils.llm_utils import LLMUtils
+from src.utils.llm_dispatcher import PRIORITY_INTERACTIVE
+from src.utils.json_extract import ANALYSIS_SCHEMA, STATE_DETECTION_SCHEMA, MODIFICATION_SCHEMA
+from src.utils.analysis_models import (
+    AnalysisResult, QuestionInfo, StateDetectionResult, ModificationResult, non_null
+)
+from src.utils.event_log import diff_dicts
+from src.utils.deadline import Deadline, set_current_deadline, reset_current_deadline
+from src.utils.background import get_background_queue
+from src.managers.turn_runner import current_turn_superseded
+from src.planning.monte_carlo import simulate_goal
+from src.planning.feasibility import parse_feasibility_question
+from src.planning.frontier import get_frontier_table
+from src.planning.probability_grid import parse_what_if_years, success_probability
+from src.planning.derived import DerivedResults
+from src.planning.assets import unresolved_assets
+from src.config.asset_config import ASSET_CLASSES, DEFAULT_ASSET_CLASS
+from src.config.api_config import TURN_TIMEOUT
+from src.config.session_config import DEBUG_DUMPS
+import asyncio
 import json
 import re
+import time
 
 class ConversationManager:
     def __init__(self, config_manager: ConfigManager, state_manager: StateManager):
@@ -51,8 +72,18 @@ class ConversationManager:
             ConversationState.RISK_ASSESSMENT: self._handle_risk_assessment_state,
             ConversationState.PORTFOLIO_PLANNING: self._handle_portfolio_planning_state
         }
+        # 风险评估问卷（本地计分，不调用 LLM）
+        self.risk_assessment = RiskAssessmentManager()
+        # 上一次在回复中展示可行性分析时的核心信息，信息变化后才重新展示
+        self._feasibility_key = None
+        # 可行性、模拟、推荐配置等派生结果，按输入字段的取值缓存
+        self.derived = DerivedResults(config_manager)
+        # 每轮对话结束后的事件回调（例如写入事件日志），参数为本轮事件字典
+        self.event_recorder = None
+        # 回复之后的记账（对话历史、事件日志）在后台完成，以本对象为 key 保证同一会话内的顺序
+        self.background = get_background_queue()
         
-    async def analyze_input(self, user_input: str) -> Dict:
+    async def analyze_input(self, user_input: str) -> AnalysisResult:
         """分析用户输入，提取意图和信息"""
         print("\n=== 开始分析用户输入 ===")
         print(f"用户输入: {user_input}")
@@ -65,104 +96,78 @@ class ConversationManager:
             
             response = await LLMUtils.call_llm(
                 prompt=prompt,
-                temperature=0.2
+                temperature=0.2,
+                priority=PRIORITY_INTERACTIVE
             )
             
             # 提取 JSON 结果
-            analysis_result = LLMUtils.extract_json_from_response(response["text"])
-            if not analysis_result:
+            data = LLMUtils.extract_json_from_response(response["text"], ANALYSIS_SCHEMA)
+            if not data:
                 raise ValueError("无法解析 LLM 响应中的 JSON 数据")
+            analysis_result = AnalysisResult.from_dict(data)
             
-            print("\n分析结果:")
-            print(json.dumps(analysis_result, ensure_ascii=False, indent=2))
+            self._debug_dump("\n分析结果:", analysis_result.to_dict)
             
             return analysis_result
             
         except Exception as e:
             print(f"\n❌ 分析用户输入时出错: {str(e)}")
-            return {
-                "intent": "provide_info",
-                "emotion": "neutral",
-                "extracted_info": {},
-                "requires_immediate_response": True
-            }
+            return AnalysisResult(
+                intent="provide_info",
+                question_info=QuestionInfo(requires_immediate_response=True)
+            )
     
-    def _update_config_from_analysis(self, analysis: Dict) -> None:
-        """根据分析结果更新配置"""
+    def _update_config_from_analysis(self, analysis: AnalysisResult) -> None:
+        """根据分析结果更新配置（分析结果已校验，只写入非空的值）"""
         print("\n=== 开始更新配置 ===")
-        if "extracted_info" in analysis:
-            extracted_info = analysis["extracted_info"]
-            print("\n提取的信息:")
-            print(json.dumps(extracted_info, ensure_ascii=False, indent=2))
-            
-            # 更新核心投资信息
-            if "core_investment" in extracted_info:
-                core_info = extracted_info["core_investment"]
-                print("\n更新核心投资信息...")
-                self.config_manager.update_core_investment(
-                    target_value=core_info.get("target_value"),
-                    years=core_info.get("years"),
-                    initial_investment=core_info.get("initial_investment")
-                )
-                print("核心投资信息更新完成")
-            
-            # 更新个人信息
-            if "personal_info" in extracted_info:
-                personal_info = extracted_info["personal_info"]
-                if any(v is not None for v in personal_info.values()):
-                    print("\n更新个人信息...")
-                    self.config_manager.update_user_info("personal", **personal_info)
-                    print("个人信息更新完成")
-            
-            # 更新财务信息
-            if "financial_info" in extracted_info:
-                financial_info = extracted_info["financial_info"]
-                if any(v is not None for v in financial_info.values()):
-                    print("\n更新财务信息...")
-                    self.config_manager.update_user_info("financial", **financial_info)
-                    print("财务信息更新完成")
-            
-            # 更新投资组合信息
-            if "portfolio" in extracted_info:
-                portfolio = extracted_info["portfolio"]
-                portfolio_reasoning = analysis.get("reasoning", {}).get("portfolio_parsing", "")
-                
-                # 只有在明确提供了资产配置信息时才更新
-                if portfolio.get("assets") and portfolio.get("weights"):
-                    print("\n更新投资组合...")
-                    print(f"资产: {portfolio['assets']}")
-                    print(f"权重: {portfolio['weights']}")
-                    
-                    # 验证权重总和
-                    weights_sum = sum(portfolio['weights'])
-                    if abs(weights_sum - 1.0) > 0.01:  # 允许1%的误差
-                        print(f"警告：权重总和 ({weights_sum}) 不等于1，进行归一化")
-                        normalized_weights = [w/weights_sum for w in portfolio['weights']]
-                        portfolio['weights'] = normalized_weights
-                    
-                    self.config_manager.update_portfolio(
-                        assets=portfolio['assets'],
-                        weights=portfolio['weights']
-                    )
-                    print("投资组合更新完成")
-                    
-                    # 标记投资组合阶段完成
-                    self.collection_stages['portfolio']['completed'] = True
-            
-            # 检查是否完成了额外信息的收集
-            user_info = self.config_manager.to_dict().get('user_info', {})
-            personal_info = user_info.get('personal', {})
-            financial_info = user_info.get('financial', {})
-            
-            # 如果收集了足够的额外信息，标记为完成
-            additional_info_count = sum(
-                1 for field in self.collection_stages['additional_info']['fields']
-                if personal_info.get(field) is not None or financial_info.get(field) is not None
-            )
-            if additional_info_count >= 2:  # 如果至少收集了2项额外信息
-                self.collection_stages['additional_info']['completed'] = True
+        if current_turn_superseded():
+            print("本轮对话已被取代，不再写入配置")
+            return
+        self._debug_dump("\n提取的信息:", analysis.extracted_info)
+        
+        # 更新核心投资信息
+        if analysis.core_investment is not None:
+            print("\n更新核心投资信息...")
+            self.config_manager.update_core_investment(**non_null(analysis.core_investment))
+            print("核心投资信息更新完成")
+        
+        # 更新个人信息
+        if analysis.personal_info is not None:
+            print("\n更新个人信息...")
+            self.config_manager.update_user_info("personal", **non_null(analysis.personal_info))
+            print("个人信息更新完成")
+        
+        # 更新财务信息
+        if analysis.financial_info is not None:
+            print("\n更新财务信息...")
+            self.config_manager.update_user_info("financial", **non_null(analysis.financial_info))
+            print("财务信息更新完成")
+        
+        # 更新投资组合信息（权重已归一化）
+        portfolio = analysis.portfolio
+        if portfolio is not None:
+            print("\n更新投资组合...")
+            print(f"资产: {portfolio.assets}")
+            print(f"权重: {portfolio.weights}")
+            self.config_manager.update_portfolio(assets=portfolio.assets, weights=portfolio.weights)
+            print("投资组合更新完成")
             
-            print("\n配置更新完成")
+            # 标记投资组合阶段完成
+            self.collection_stages['portfolio']['completed'] = True
+        
+        # 检查是否完成了额外信息的收集
+        personal_info = self.config_manager.user_info.personal
+        financial_info = self.config_manager.user_info.financial
+        
+        # 如果收集了足够的额外信息，标记为完成
+        additional_info_count = sum(
+            1 for field in self.collection_stages['additional_info']['fields']
+            if getattr(personal_info, field, None) is not None or getattr(financial_info, field, None) is not None
+        )
+        if additional_info_count >= 2:  # 如果至少收集了2项额外信息
+            self.collection_stages['additional_info']['completed'] = True
+        
+        print("\n配置更新完成")
     
     def _build_analysis_prompt(self, user_input: str) -> str:
         """构建用于分析用户输入的 prompt"""
@@ -283,21 +288,20 @@ class ConversationManager:
         else:
             return f"{amount:,.0f}"
     
-    def determine_strategy(self, analysis: Dict) -> Dict:
+    def determine_strategy(self, analysis: AnalysisResult) -> Dict:
         """根据分析结果确定对话策略"""
         print("\n=== 确定对话策略 ===")
         print(f"当前状态: {self.state_manager.current_state.value}")
-        print(f"用户意图: {analysis.get('intent')}")
-        print(f"分析结果: {json.dumps(analysis, ensure_ascii=False, indent=2)}")
+        print(f"用户意图: {analysis.intent}")
+        self._debug_dump("分析结果:", analysis.to_dict)
         
         # 如果用户提出问题
-        if analysis.get("intent") == "ask_question":
+        if analysis.intent == "ask_question":
             print("\n检测到用户提问...")
-            question_info = analysis.get("question_info", {})
+            question_info = analysis.question_info
             
             # 检查是否是纯知识咨询
-            if question_info.get("type") == "general_inquiry" and \
-               not question_info.get("can_collect_info", True):
+            if question_info.type == "general_inquiry" and not question_info.can_collect_info:
                 print("检测到纯知识咨询问题")
                 return {
                     "primary_goal": "answer_question",
@@ -312,10 +316,9 @@ class ConversationManager:
             # 如果当前是收集信息状态，检查是否可以临时切换到自由问答
             if self.state_manager.current_state == ConversationState.COLLECTING_INFO:
                 # 检查是否已经收集了足够的信息
-                config = self.config_manager.to_dict()
+                core = self.config_manager.core_investment
                 core_info_complete = all(
-                    config.get('core_investment', {}).get(field) is not None
-                    for field in ['target_value', 'years', 'initial_investment']
+                    value is not None for value in (core.target_value, core.years, core.initial_investment)
                 )
                 
                 if core_info_complete:
@@ -349,16 +352,15 @@ class ConversationManager:
             }
         
         # 如果用户提供了信息
-        if analysis.get("intent") == "provide_info":
+        if analysis.intent == "provide_info":
             print("检测到用户提供了新信息")
             
             # 更新信息收集进度
-            extracted_info = analysis.get("extracted_info", {})
-            if extracted_info.get("core_investment"):
+            if analysis.core_investment is not None:
                 self.state_manager.update_info_collection_progress("core_info")
-            elif extracted_info.get("portfolio"):
+            elif analysis.portfolio is not None:
                 self.state_manager.update_info_collection_progress("portfolio")
-            elif any(extracted_info.get(key) for key in ["personal_info", "financial_info"]):
+            elif analysis.personal_info is not None or analysis.financial_info is not None:
                 self.state_manager.update_info_collection_progress("additional_info")
             else:
                 self.state_manager.update_info_collection_progress()  # 让状态管理器自动判断
@@ -370,8 +372,7 @@ class ConversationManager:
             personal_info = user_info.get('personal', {})
             portfolio = config.get('portfolio', {})
             
-            print("\n核心信息完整性检查:")
-            print(json.dumps(core_investment, ensure_ascii=False, indent=2))
+            self._debug_dump("\n核心信息完整性检查:", lambda: core_investment)
             
             has_target = core_investment.get('target_value') is not None
             has_years = core_investment.get('years') is not None
@@ -431,7 +432,7 @@ class ConversationManager:
             # 如果投资目的已知但未询问投资组合
             if not has_portfolio:
                 # 检查是否刚刚收到了"没有投资组合"的回答
-                if analysis.get("extracted_info", {}).get("portfolio", {}).get("assets") == ["cash"]:
+                if analysis.portfolio is not None and analysis.portfolio.assets == ["cash"]:
                     return {
                         "primary_goal": "summarize_info",
                         "secondary_goal": "guide_next_step",
@@ -465,64 +466,46 @@ class ConversationManager:
             "allow_free_chat": True
         }
     
-    async def chat(self, user_input: str) -> str:
-        """处理用户输入并生成回复"""
+    async def chat(self, user_input: str, deadline: Optional[Deadline] = None) -> str:
+        """处理用户输入并生成回复
+
+        整轮对话（包括其中所有 LLM 调用与重试）受 deadline 限制，默认为
+        TURN_TIMEOUT 秒。超时后取消仍在进行的 LLM 调用，改用规则判断状态并
+        返回当前阶段的固定问题。回复生成后立即返回，对话历史与事件日志在后台
+        任务中完成；下一轮开始前会等待这些任务结束。
+        """
         print("\n=== 开始对话流程 ===")
         print("当前状态:", self.state_manager.current_state.value)
         print("用户输入:", user_input)
         
+        if deadline is None:
+            deadline = Deadline.after(TURN_TIMEOUT)
+        token = set_current_deadline(deadline)
+        started = time.monotonic()
         try:
-            # 1. 优先检测状态
-            print("\n1. 检测对话状态...")
-            new_state = await self._detect_state(user_input, {})
-            if new_state and new_state != self.state_manager.current_state:
-                print(f"状态需要从 {self.state_manager.current_state.value} 切换到 {new_state.value}")
-                if self.state_manager.can_transition_to(new_state):
-                    print("执行状态转换")
-                    self.state_manager.transition_to(new_state)
-                else:
-                    print(f"无法切换到 {new_state.value} 状态")
+            # 上一轮的记账完成后再开始，保证对话历史完整
+            await self.background.wait_for(self)
+            config_before = self.config_manager.to_dict()
             
-            # 2. 根据状态决定是否需要详细分析
-            print("\n2. 根据状态进行分析...")
-            analysis = {}
-            if self.state_manager.current_state == ConversationState.COLLECTING_INFO:
-                # 只有在收集信息状态才进行详细分析
-                analysis = await self.analyze_input(user_input)
-            else:
-                # 自由问答状态使用简化分析
-                analysis = {
-                    "intent": "ask_question",
-                    "emotion": "neutral",
-                    "question_info": {
-                        "type": "general",
-                        "original_question": user_input,
-                        "requires_immediate_response": True
-                    }
-                }
-            
-            # 3. 生成回复
-            print("\n3. 生成回复...")
-            response = await self.generate_response(analysis, user_input)
+            try:
+                new_state, analysis, response = await asyncio.wait_for(
+                    self._run_turn(user_input),
+                    timeout=deadline.remaining()
+                )
+            except asyncio.TimeoutError:
+                elapsed = time.monotonic() - started
+                budget = f"{deadline.budget:g} 秒" if deadline.budget is not None else "调用方指定的截止时间"
+                print(f"\n⚠️ 本轮对话超出时间预算（{budget}，已用 {elapsed:.1f} 秒），使用降级回复")
+                new_state, analysis, response = self._degraded_turn(user_input)
             
-            # 4. 更新对话历史
-            print("\n4. 更新对话历史...")
-            # 添加用户消息
-            user_message = {
-                "role": "user",
-                "content": user_input,
-                "state": self.state_manager.current_state.value,
-                "extracted_info": analysis.get("extracted_info", {})
-            }
-            self.state_manager.add_to_history(user_message)
+            if current_turn_superseded():
+                # 用户已经发送了新消息，本轮结果作废
+                raise asyncio.CancelledError()
             
-            # 添加助手回复
-            assistant_message = {
-                "role": "assistant",
-                "content": response,
-                "state": self.state_manager.current_state.value
-            }
-            self.state_manager.add_to_history(assistant_message)
+            # 4. 更新对话历史、记录本轮事件（后台完成）
+            self.background.submit(
+                self, self._finish_turn, user_input, new_state, analysis, config_before, response
+            )
             
             return response
             
@@ -532,38 +515,189 @@ class ConversationManager:
             import traceback
             print(traceback.format_exc())
             return "抱歉，我在处理您的消息时遇到了问题。请再说一遍您的需求。"
+        finally:
+            reset_current_deadline(token)
     
-    async def _detect_state(self, user_input: str, analysis: Dict) -> Optional[ConversationState]:
-        """检测用户输入应该对应的状态"""
-        print("\n=== 检测对话状态 ===")
-        print(f"用户输入: {user_input}")
-        print(f"当前状态: {self.state_manager.current_state.value}")
+    async def _run_turn(self, user_input: str) -> Tuple[Optional[ConversationState], AnalysisResult, str]:
+        """检测状态、分析输入并生成回复，返回 (检测到的状态, 分析结果, 回复)"""
+        # 0. "5年从100万到500万现实吗" 这类问题直接计算回答，不调用 LLM。
+        #    收集信息的阶段（初始化、收集中）消息里的金额和年限需要提取到配置中，仍走完整流程
+        feasibility = None
+        if self.state_manager.current_state != ConversationState.RISK_ASSESSMENT:
+            feasibility = parse_feasibility_question(user_input)
+        if feasibility is not None and self.state_manager.current_state in (
+            ConversationState.FREE_CHAT, ConversationState.PORTFOLIO_PLANNING
+        ):
+            print("\n检测到目标可行性问题，直接计算回答")
+            return None, AnalysisResult(intent="ask_question"), self._format_feasibility(feasibility)
+        
+        # 1. 优先检测状态（问卷进行中时用户输入都是答案，不检测状态）
+        print("\n1. 检测对话状态...")
+        new_state = None
+        if self.state_manager.current_state != ConversationState.RISK_ASSESSMENT:
+            new_state = await self._detect_state(user_input, {})
+        if new_state and new_state != self.state_manager.current_state:
+            print(f"状态需要从 {self.state_manager.current_state.value} 切换到 {new_state.value}")
+            if self.state_manager.can_transition_to(new_state):
+                print("执行状态转换")
+                self.state_manager.transition_to(new_state)
+            else:
+                print(f"无法切换到 {new_state.value} 状态")
+        
+        # 2. 根据状态决定是否需要详细分析
+        print("\n2. 根据状态进行分析...")
+        if self.state_manager.current_state == ConversationState.COLLECTING_INFO:
+            # 只有在收集信息状态才进行详细分析
+            analysis = await self.analyze_input(user_input)
+        else:
+            # 自由问答状态使用简化分析
+            analysis = AnalysisResult(
+                intent="ask_question",
+                question_info=QuestionInfo(
+                    type="general",
+                    original_question=user_input,
+                    requires_immediate_response=True
+                )
+            )
         
+        # 3. 生成回复
+        print("\n3. 生成回复...")
+        shown_key = self._feasibility_key
+        response = await self.generate_response(analysis, user_input)
+        if feasibility is not None:
+            key = (feasibility.target_value, feasibility.years, feasibility.initial_investment)
+            if self._feasibility_key == shown_key or self._feasibility_key != key:
+                # 本轮回复中的可行性分析（按提取后的配置计算）没有回答这个问题时，补上直接计算的结果
+                response = self._format_feasibility(feasibility) + "\n\n" + response
+        return new_state, analysis, response
+    
+    def _degraded_turn(self, user_input: str) -> Tuple[Optional[ConversationState], AnalysisResult, str]:
+        """时间预算耗尽时的降级处理：只用规则判断状态，回复当前阶段的固定问题"""
+        new_state = None
+        if self.state_manager.current_state != ConversationState.RISK_ASSESSMENT:
+            new_state, _ = self._detect_state_by_rules(user_input)
+        if new_state and new_state != self.state_manager.current_state \
+                and self.state_manager.can_transition_to(new_state):
+            self.state_manager.transition_to(new_state)
+        
+        config = self.config_manager.to_dict()
+        stage = self._check_collection_stage(config, user_input)
+        response = self._get_next_question(stage, config)
+        if self.state_manager.current_state == ConversationState.FREE_CHAT:
+            response = "抱歉，这个问题暂时没能及时回答，您可以稍后再问一次。\n\n" + response
+        return new_state, AnalysisResult(), response
+    
+    def _finish_turn(
+        self,
+        user_input: str,
+        detected_state: Optional[ConversationState],
+        analysis: AnalysisResult,
+        config_before: Dict,
+        response: str
+    ) -> None:
+        """回复之后的记账：更新对话历史并记录本轮事件"""
+        print("\n4. 更新对话历史...")
+        state = self.state_manager.current_state.value
+        # 添加用户消息
+        self.state_manager.add_to_history({
+            "role": "user",
+            "content": user_input,
+            "state": state,
+            "extracted_info": analysis.extracted_info()
+        })
+        # 添加助手回复
+        self.state_manager.add_to_history({
+            "role": "assistant",
+            "content": response,
+            "state": state
+        })
+        
+        # 5. 记录本轮事件
+        self._record_turn_event(user_input, detected_state, analysis, config_before, response)
+    
+    def _debug_dump(self, title: str, build: Callable[[], Any]) -> None:
+        """输出 JSON 调试信息：DEBUG_DUMPS 关闭时不构建；开启时立即取值，格式化与输出交给后台线程"""
+        if not DEBUG_DUMPS:
+            return
+        payload = build()
+        self.background.submit(
+            self, lambda: print(f"{title}\n{json.dumps(payload, ensure_ascii=False, indent=2, default=str)}"),
+            droppable=True
+        )
+    
+    def flush_background(self, timeout: Optional[float] = None) -> bool:
+        """等待本会话的后台记账完成（序列化或写回会话之前调用）"""
+        return self.background.flush(self, timeout)
+    
+    def _record_turn_event(
+        self,
+        user_input: str,
+        detected_state: Optional[ConversationState],
+        analysis: AnalysisResult,
+        config_before: Dict,
+        response: str
+    ) -> None:
+        """将本轮对话作为事件交给 event_recorder"""
+        if self.event_recorder is None:
+            return
+        try:
+            self.event_recorder({
+                "user_input": user_input,
+                "detected_state": detected_state.value if detected_state else None,
+                "state": self.state_manager.current_state.value,
+                "analysis": analysis.to_dict(),
+                "config_delta": diff_dicts(config_before, self.config_manager.to_dict()),
+                "reply": response,
+                "info_collection_progress": self.state_manager.get_info_collection_progress(),
+                "risk_assessment": self.risk_assessment.get_progress(),
+                # 收集阶段与状态数据也记入事件，没有快照时重放即可恢复，不会重复询问已收集的信息
+                "collection_stages": {
+                    stage: {"completed": values["completed"], "modifiable": values["modifiable"]}
+                    for stage, values in self.collection_stages.items()
+                },
+                "state_data": self.state_manager.export_state_data()
+            })
+        except Exception as e:
+            print(f"❌ 记录对话事件失败: {str(e)}")
+    
+    def _detect_state_by_rules(self, user_input: str) -> Tuple[Optional[ConversationState], bool]:
+        """只用规则检测状态，返回 (状态, 是否已有结论)，没有结论时需要 LLM 判断"""
         # 1. 优先检查是否是知识咨询类问题
         knowledge_query_pattern = r'(是什么|有哪些|怎么样|如何|什么意思|区别|推荐|介绍)'
         investment_terms = r'(股票|基金|债券|美股|港股|理财|指数|ETF|期货|外汇|加密货币|比特币)'
         if re.search(knowledge_query_pattern, user_input) and re.search(investment_terms, user_input):
             print("检测到知识咨询问题，切换到自由问答状态")
-            return ConversationState.FREE_CHAT
+            return ConversationState.FREE_CHAT, True
         
         # 2. 检查是否是市场分析请求
         analysis_pattern = r'(帮我*分析|分析下|看看|预测|走势)'
         if re.search(analysis_pattern, user_input) and re.search(investment_terms, user_input):
             print("检测到市场分析请求，切换到自由问答状态")
-            return ConversationState.FREE_CHAT
+            return ConversationState.FREE_CHAT, True
             
         # 3. 检查是否是个人投资相关
         personal_investment_pattern = r'(我.*(想|要|准备|计划|考虑|打算).*(投资|理财|买入|买房|保险|保障|退休|养老|传承|教育|留学|慈善)|准备.*([0-9]+[万亿]|[0-9]+\s*年)|我.*需要.*[0-9]+[万亿]|我的.*(投资|保险|基金|资产|理财|退休金|养老金|教育金))'
         if re.search(personal_investment_pattern, user_input):
             print("检测到明确的个人投资意图，切换到信息收集状态")
-            return ConversationState.COLLECTING_INFO
+            return ConversationState.COLLECTING_INFO, True
 
         # 4. 其他投资相关信息，交给 LLM 进行更细致的判断
         investment_pattern = r'([0-9]+[万亿]|[0-9]+\s*年|目标|买房|理财|投资|基金|股票|债券)'
         if re.search(investment_pattern, user_input):
             print("检测到投资相关信息，需要进一步判断")
-            # 继续执行后续的 LLM 判断逻辑
-            return None
+            return None, True
+
+        return None, False
+
+    async def _detect_state(self, user_input: str, analysis: Dict) -> Optional[ConversationState]:
+        """检测用户输入应该对应的状态"""
+        print("\n=== 检测对话状态 ===")
+        print(f"用户输入: {user_input}")
+        print(f"当前状态: {self.state_manager.current_state.value}")
+        
+        state, decided = self._detect_state_by_rules(user_input)
+        if decided:
+            return state
 
         # 获取最近的对话历史
         context = self.state_manager.get_recent_context()
@@ -598,24 +732,25 @@ FREE_CHAT: 咨询知识、市场分析、非个人投资话题
             print("\n调用 LLM 进行状态检测...")
             response = await LLMUtils.call_llm(
                 prompt=prompt,
-                temperature=0.2
+                temperature=0.2,
+                priority=PRIORITY_INTERACTIVE
             )
             
-            result = LLMUtils.extract_json_from_response(response["text"])
-            if not result:
+            data = LLMUtils.extract_json_from_response(response["text"], STATE_DETECTION_SCHEMA)
+            if not data:
                 print("无法解析 LLM 响应")
                 return None
+            result = StateDetectionResult.from_dict(data)
                 
-            print("\n状态检测结果:")
-            print(json.dumps(result, ensure_ascii=False, indent=2))
+            self._debug_dump("\n状态检测结果:", result.to_dict)
             
-            target_state = result.get("target_state")
-            confidence = result.get("confidence", 0)
+            target_state = result.target_state
+            confidence = result.confidence
             
             # 降低转换到 COLLECTING_INFO 的门槛，提高转换到 FREE_CHAT 的灵活性
-            if target_state == "COLLECTING_INFO" and confidence >= 0.8:
+            if target_state == ConversationState.COLLECTING_INFO and confidence >= 0.8:
                 return ConversationState.COLLECTING_INFO
-            elif target_state == "FREE_CHAT" and confidence >= 0.6:
+            elif target_state == ConversationState.FREE_CHAT and confidence >= 0.6:
                 return ConversationState.FREE_CHAT
             
             # 如果置信度不够，默认保持当前状态
@@ -625,7 +760,7 @@ FREE_CHAT: 咨询知识、市场分析、非个人投资话题
             print(f"\n❌ 状态检测出错: {str(e)}")
             return None
     
-    async def generate_response(self, analysis: Dict, user_input: str) -> str:
+    async def generate_response(self, analysis: AnalysisResult, user_input: str) -> str:
         """根据当前状态和分析结果生成回复"""
         try:
             current_state = self.state_manager.current_state
@@ -646,8 +781,7 @@ FREE_CHAT: 咨询知识、市场分析、非个人投资话题
     def _check_collection_stage(self, config: Dict, user_input: str = None) -> str:
         """检查当前应该收集哪个阶段的信息"""
         print("\n=== 检查收集阶段 ===")
-        print("当前配置:")
-        print(json.dumps(config, ensure_ascii=False, indent=2))
+        self._debug_dump("当前配置:", lambda: config)
         
         # 检查核心信息
         if not self.collection_stages['core_info']['completed']:
@@ -720,7 +854,7 @@ FREE_CHAT: 咨询知识、市场分析、非个人投资话题
             
         return "让我们开始进行风险评估，这将帮助我们为您制定更合适的投资方案。"
     
-    async def _generate_free_chat_response(self, analysis: Dict, user_input: str) -> str:
+    async def _generate_free_chat_response(self, analysis: AnalysisResult, user_input: str) -> str:
         """生成自由问答状态的回复"""
         # 只获取自由问答状态的历史记录
         context = self.state_manager.get_recent_context(
@@ -754,7 +888,8 @@ FREE_CHAT: 咨询知识、市场分析、非个人投资话题
         try:
             response = await LLMUtils.call_llm(
                 prompt=prompt,
-                temperature=0.7
+                temperature=0.7,
+                priority=PRIORITY_INTERACTIVE
             )
             return response["text"]
         except Exception as e:
@@ -781,11 +916,11 @@ FREE_CHAT: 咨询知识、市场分析、非个人投资话题
         
         return "、".join(portfolio_items)
 
-    async def _check_modification_intent(self, user_input: str, analysis: Dict) -> Optional[Dict]:
+    async def _check_modification_intent(self, user_input: str, analysis: AnalysisResult) -> Optional[ModificationResult]:
         """检查用户是否想要修改之前提供的信息"""
         print("\n=== 开始检查修改意图 ===")
         print(f"用户输入: {user_input}")
-        print(f"分析结果: {json.dumps(analysis, ensure_ascii=False, indent=2)}")
+        self._debug_dump("分析结果:", analysis.to_dict)
         
         # 使用更智能的方式检测修改意图
         prompt = f"""分析用户输入是否表达了修改之前信息的意图。
@@ -815,15 +950,16 @@ FREE_CHAT: 咨询知识、市场分析、非个人投资话题
 
         try:
             print("\n调用 LLM 分析修改意图...")
-            response = await LLMUtils.call_llm(prompt=prompt, temperature=0.2)
-            print(f"LLM 响应: {json.dumps(response, ensure_ascii=False, indent=2)}")
+            response = await LLMUtils.call_llm(prompt=prompt, temperature=0.2, priority=PRIORITY_INTERACTIVE)
+            self._debug_dump("LLM 响应:", lambda: response)
             
-            result = LLMUtils.extract_json_from_response(response["text"])
-            print(f"解析结果: {json.dumps(result, ensure_ascii=False, indent=2)}")
+            data = LLMUtils.extract_json_from_response(response["text"], MODIFICATION_SCHEMA)
+            result = ModificationResult.from_dict(data) if data else None
+            self._debug_dump("解析结果:", lambda: result.to_dict() if result else None)
             
             if result:
-                has_intent = result.get("has_modification_intent", False)
-                confidence = result.get("confidence", 0)
+                has_intent = result.has_modification_intent
+                confidence = result.confidence
                 print(f"是否有修改意图: {has_intent}")
                 print(f"置信度: {confidence}")
                 
@@ -848,10 +984,12 @@ FREE_CHAT: 咨询知识、市场分析、非个人投资话题
     def _handle_modification(self, field: str, new_value: any) -> None:
         """处理修改请求"""
         print(f"\n=== 开始处理修改请求 ===")
+        if current_turn_superseded():
+            print("本轮对话已被取代，不再写入配置")
+            return
         print(f"目标字段: {field}")
         print(f"新的值: {new_value}")
-        print(f"当前配置状态:")
-        print(json.dumps(self.config_manager.to_dict(), ensure_ascii=False, indent=2))
+        self._debug_dump("当前配置状态:", self.config_manager.to_dict)
         
         # 确定字段所属的阶段
         field_to_stage = {
@@ -872,34 +1010,32 @@ FREE_CHAT: 咨询知识、市场分析、非个人投资话题
             # 更新配置
             if stage == 'core_info':
                 print(f"更新核心信息字段：{field}")
-                print(f"更新前的核心信息:")
-                print(json.dumps(self.config_manager.to_dict().get('core_investment', {}), ensure_ascii=False, indent=2))
+                self._debug_dump("更新前的核心信息:", lambda: self.config_manager.to_dict().get('core_investment', {}))
                 
                 self.config_manager.update_core_investment(**{field: new_value})
                 
-                print(f"更新后的核心信息:")
-                print(json.dumps(self.config_manager.to_dict().get('core_investment', {}), ensure_ascii=False, indent=2))
+                self._debug_dump("更新后的核心信息:", lambda: self.config_manager.to_dict().get('core_investment', {}))
                 
                 # 重置核心信息的完成状态
                 self.collection_stages['core_info']['completed'] = False
                 
             elif stage == 'portfolio':
                 print(f"更新投资组合信息")
-                print(f"更新前的投资组合:")
-                print(json.dumps(self.config_manager.to_dict().get('portfolio', {}), ensure_ascii=False, indent=2))
+                self._debug_dump("更新前的投资组合:", lambda: self.config_manager.to_dict().get('portfolio', {}))
                 
-                if isinstance(new_value, dict):
-                    self.config_manager.update_portfolio(**new_value)
+                if isinstance(new_value, Portfolio):
+                    self.config_manager.update_portfolio(assets=new_value.assets, weights=new_value.weights)
                 else:
                     print(f"❌ 投资组合的新值格式错误: {type(new_value)}")
                     return
                     
-                print(f"更新后的投资组合:")
-                print(json.dumps(self.config_manager.to_dict().get('portfolio', {}), ensure_ascii=False, indent=2))
+                self._debug_dump("更新后的投资组合:", lambda: self.config_manager.to_dict().get('portfolio', {}))
                 
                 # 重置投资组合的完成状态
                 self.collection_stages['portfolio']['completed'] = False
                 
+            # 只有依赖该字段的派生结果需要重新计算，其余的继续使用缓存
+            print(f"需要重新计算的派生结果: {self.derived.affected_by_modification(field)}")
             print("\n✅ 修改请求处理完成")
             
         except Exception as e:
@@ -910,25 +1046,24 @@ FREE_CHAT: 咨询知识、市场分析、非个人投资话题
             import traceback
             print(traceback.format_exc())
 
-    async def _handle_initializing_state(self, user_input: str, analysis: Dict) -> str:
+    async def _handle_initializing_state(self, user_input: str, analysis: AnalysisResult) -> str:
         """处理初始化状态"""
         # 检查是否是知识咨询
-        if analysis.get("intent") == "ask_question":
+        if analysis.intent == "ask_question":
             self.state_manager.transition_to(ConversationState.FREE_CHAT)
             return await self._generate_free_chat_response(analysis, user_input)
         # 检查是否提供了投资相关信息
-        if analysis.get("intent") == "provide_info":
+        if analysis.intent == "provide_info":
             self.state_manager.transition_to(ConversationState.COLLECTING_INFO)
             return await self._handle_collecting_info_state(user_input, analysis)
         # 默认转到自由问答
         self.state_manager.transition_to(ConversationState.FREE_CHAT)
         return "您好！我是GLAD智能投顾助手。请问有什么可以帮您？"
         
-    async def _handle_collecting_info_state(self, user_input: str, analysis: Dict) -> str:
+    async def _handle_collecting_info_state(self, user_input: str, analysis: AnalysisResult) -> str:
         """处理信息收集状态"""
         # 如果是纯知识咨询问题，临时切换到自由问答
-        if analysis.get("intent") == "ask_question" and \
-           analysis.get("question_info", {}).get("type") == "general_inquiry":
+        if analysis.intent == "ask_question" and analysis.question_info.type == "general_inquiry":
             response = await self._generate_free_chat_response(analysis, user_input)
             # 获取下一个收集阶段的问题
             next_question = self._get_next_question(
@@ -942,12 +1077,12 @@ FREE_CHAT: 咨询知识、市场分析、非个人投资话题
         # 处理信息收集
         return await self._process_info_collection(user_input, analysis)
         
-    async def _process_info_collection(self, user_input: str, analysis: Dict) -> str:
+    async def _process_info_collection(self, user_input: str, analysis: AnalysisResult) -> str:
         """处理信息收集状态下的具体逻辑"""
         # 检查是否是修改请求
         modification = await self._check_modification_intent(user_input, analysis)
         if modification:
-            field = modification.get("target_field")
+            field = modification.target_field
             stage = {
                 'target_value': 'core_info',
                 'years': 'core_info',
@@ -957,16 +1092,18 @@ FREE_CHAT: 咨询知识、市场分析、非个人投资话题
             
             if stage:
                 # 处理修改请求
-                self._handle_modification(field, modification.get("new_value"))
+                self._handle_modification(field, modification.new_value)
                 # 获取当前配置
                 config = self.config_manager.to_dict()
                 # 重新检查收集阶段
                 current_stage = self._check_collection_stage(config)
+                # 核心信息变化后附上更新的可行性分析
+                feasibility_note = self._feasibility_note()
                 if current_stage != 'completed':
                     next_question = self._get_next_question(current_stage, config)
-                    return f"好的，已经帮您修改了信息。{next_question}"
+                    return f"好的，已经帮您修改了信息。{feasibility_note}{next_question}"
                 else:
-                    return "好的，已经帮您修改了信息。您可以继续修改其他信息，或者输入'确认'进入风险评估阶段。"
+                    return f"好的，已经帮您修改了信息。{feasibility_note}您可以继续修改其他信息，或者输入'确认'进入风险评估阶段。"
             else:
                 return "抱歉，该信息目前无法修改。让我们继续完成信息收集。"
 
@@ -981,12 +1118,15 @@ FREE_CHAT: 咨询知识、市场分析、非个人投资话题
                 self.collection_stages['portfolio']['modifiable'] = False
                 # 转换到风险评估状态
                 self.state_manager.transition_to(ConversationState.RISK_ASSESSMENT)
-                return "好的，让我们开始风险评估。请回答以下问题..."
+                self.risk_assessment.reset()
+                if not self.risk_assessment.questions:
+                    return "抱歉，风险评估问卷暂时无法加载，请稍后再试。"
+                return "好的，让我们开始风险评估。\n\n" + self.risk_assessment.format_question()
             else:
                 return "在进入风险评估之前，我们需要先完成必要信息的收集。"
 
         # 更新配置
-        if analysis.get("intent") == "provide_info":
+        if analysis.intent == "provide_info":
             self._update_config_from_analysis(analysis)
             # 更新信息收集进度
             self.state_manager.update_info_collection_progress()
@@ -997,29 +1137,194 @@ FREE_CHAT: 咨询知识、市场分析、非个人投资话题
         # 检查当前收集阶段
         current_stage = self._check_collection_stage(config)
         
+        # 核心信息完整后附上可行性分析
+        feasibility_note = self._feasibility_note()
+        
         if current_stage == 'completed':
-            return "我们已经收集了所有必要的信息。您可以继续修改已填写的信息，或者输入\"确认\"进入风险评估阶段。"
+            return feasibility_note + "我们已经收集了所有必要的信息。您可以继续修改已填写的信息，或者输入\"确认\"进入风险评估阶段。"
         
         # 获取下一个问题
         next_question = self._get_next_question(current_stage, config)
-        return next_question
+        return feasibility_note + next_question
+    
+    def _feasibility_note(self) -> str:
+        """核心信息完整且与上次展示时不同时，返回可行性分析段落，否则返回空字符串"""
+        if not self.config_manager.is_core_info_complete():
+            return ""
+        core = self.config_manager.core_investment
+        key = (core.target_value, core.years, core.initial_investment)
+        if key == self._feasibility_key:
+            return ""
+        result = self.derived.get("feasibility")
+        if result is None:
+            return ""
+        self._feasibility_key = key
+        return self._format_feasibility(result) + "\n\n"
+    
+    def _format_feasibility(self, result) -> str:
+        """把可行性计算结果整理为回复文本"""
+        lines = [
+            f"从 {self._format_amount(result.initial_investment)} 在 {result.years:g} 年内达到 "
+            f"{self._format_amount(result.target_value)}，需要约 {result.required_cagr:.1%} 的年化收益率，{result.level}。"
+        ]
+        if result.monthly_contribution > 0:
+            lines.append(
+                f"- 按 {result.assumed_return:.0%} 的年化收益估算，每月还需追加约 "
+                f"{self._format_amount(result.monthly_contribution)}"
+            )
+        else:
+            lines.append(f"- 按 {result.assumed_return:.0%} 的年化收益估算，无需追加投入即可达到目标")
+        if result.years_needed != float("inf"):
+            lines.append(f"- 不追加投入的话，大约需要 {result.years_needed:.1f} 年")
+        return "\n".join(lines)
         
-    async def _handle_free_chat_state(self, user_input: str, analysis: Dict) -> str:
+    async def _handle_free_chat_state(self, user_input: str, analysis: AnalysisResult) -> str:
         """处理自由问答状态"""
         # 如果检测到需要收集信息，切换到收集状态
-        if analysis.get("intent") == "provide_info" and \
-           analysis.get("extracted_info", {}).get("core_investment"):
+        if analysis.intent == "provide_info" and analysis.core_investment is not None:
             self.state_manager.transition_to(ConversationState.COLLECTING_INFO)
             return await self._handle_collecting_info_state(user_input, analysis)
         # 继续自由问答
         return await self._generate_free_chat_response(analysis, user_input)
         
-    async def _handle_risk_assessment_state(self, user_input: str, analysis: Dict) -> str:
-        """处理风险评估状态"""
-        # TODO: 实现风险评估逻辑
-        pass
+    async def _handle_risk_assessment_state(self, user_input: str, analysis: AnalysisResult) -> str:
+        """处理风险评估状态：在对话中逐题完成问卷，本地解析答案并计分"""
+        risk_assessment = self.risk_assessment
+        if not risk_assessment.questions:
+            return "抱歉，风险评估问卷暂时无法加载，请稍后再试。"
+        if risk_assessment.get_current_question() is None:
+            # 问卷已完成（例如恢复的会话），重新开始
+            risk_assessment.reset()
+            return risk_assessment.format_question()
+        
+        answer = risk_assessment.parse_answer(user_input)
+        if answer is None:
+            return "抱歉，我没有识别出您的选择。\n\n" + risk_assessment.format_question()
+        
+        result = risk_assessment.process_answer(answer)
+        if not result["success"]:
+            return result["message"] + "\n\n" + risk_assessment.format_question()
+        if not result["is_complete"]:
+            return risk_assessment.format_question()
+        
+        # 全部答完：写入风险评估结果并进入投资组合规划
+        score = result["total_score"]
+        tolerance = risk_assessment.calculate_risk_tolerance()
+        if current_turn_superseded():
+            print("本轮对话已被取代，不再写入配置")
+            return ""
+        self.config_manager.update_risk_profile(score=score, tolerance=tolerance)
+        self.state_manager.transition_to(ConversationState.PORTFOLIO_PLANNING)
+        return f"风险评估已完成！您的得分为 {score} 分，风险承受能力类型为：{tolerance}。"
+        
+    async def _handle_portfolio_planning_state(self, user_input: str, analysis: AnalysisResult) -> str:
+        """处理投资组合规划状态：用蒙特卡洛模拟估算当前配置达成目标的概率（不调用 LLM）"""
+        core = self.config_manager.core_investment
+        if core.target_value is None or core.years is None or core.initial_investment is None:
+            self.state_manager.transition_to(ConversationState.COLLECTING_INFO)
+            config = self.config_manager.to_dict()
+            return "在制定投资规划之前，还需要补充一些信息。" + self._get_next_question(
+                self._check_collection_stage(config), config
+            )
+        tolerance = self.config_manager.risk_profile.tolerance
+        what_if_years = parse_what_if_years(user_input)
+        if what_if_years is not None and tolerance:
+            # 调整年限的假设问题：推荐配置的达成概率查预计算网格，不需要重新模拟
+            return await asyncio.to_thread(self._format_what_if_years, tolerance, what_if_years)
+        
+        allocation = self.derived.get("allocation")
+        if allocation is None:
+            return "请先告诉我您目前的资产配置情况，比如存款、股票、基金等的占比。"
+        
+        # 模拟计算量较大，放到线程中执行，避免阻塞事件循环；输入未变化时直接使用缓存结果
+        if what_if_years is not None:
+            result = await asyncio.to_thread(
+                simulate_goal,
+                core.initial_investment,
+                core.target_value,
+                what_if_years,
+                allocation
+            )
+        else:
+            result = await asyncio.to_thread(self.derived.get, "projection")
+        reply = self._format_simulation_reply(result, core.target_value)
+        unknown = unresolved_assets(self.config_manager.portfolio.assets)
+        if unknown:
+            reply += (
+                f"\n- 其中 {'、'.join(unknown)} 未能识别具体类型，暂按"
+                f"{ASSET_CLASSES[DEFAULT_ASSET_CLASS]['name']}的收益假设估算，您可以告诉我它们具体是什么资产"
+            )
         
-    async def _handle_portfolio_planning_state(self, user_input: str, analysis: Dict) -> str:
-        """处理投资组合规划状态"""
-        # TODO: 实现投资组合规划逻辑
-        pass
+        # 有历史数据集时，附上当前配置在历史上所有同样长度区间中的表现
+        try:
+            backtest = await asyncio.to_thread(self.derived.get, "backtest")
+            if backtest is not None:
+                reply += "\n\n" + self._format_backtest(backtest)
+        except Exception as e:
+            print(f"❌ 历史回测失败: {str(e)}")
+        
+        # 已完成风险评估时，附上对应风险类型与年限的推荐配置（查预计算表）
+        if tolerance:
+            try:
+                recommendation = await asyncio.to_thread(self.derived.get, "recommendation")
+                reply += "\n\n" + self._format_recommended_allocation(recommendation, tolerance, core.years)
+                probability = await asyncio.to_thread(self.derived.get, "recommendation_probability")
+                reply += f"\n按此配置，{core.years:g} 年后达到目标的概率约为 {probability:.0%}。"
+            except Exception as e:
+                print(f"❌ 查询推荐配置失败: {str(e)}")
+        return reply + "\n\n以上结果基于长期资本市场假设，仅供参考，不构成收益承诺。"
+    
+    def _format_what_if_years(self, tolerance: str, years: float) -> str:
+        """比较推荐配置在当前年限与假设年限下达成目标的概率"""
+        core = self.config_manager.core_investment
+        current = success_probability(tolerance, core.initial_investment, core.target_value, core.years)
+        changed = success_probability(tolerance, core.initial_investment, core.target_value, years)
+        allocation = get_frontier_table().lookup(tolerance, years)
+        mix = "，".join(
+            f"{ASSET_CLASSES[key]['name']} {weight:.0%}"
+            for key, weight in sorted(allocation.items(), key=lambda item: -item[1])
+        )
+        return (
+            f"按照您的风险承受能力（{tolerance}）的推荐配置，目标 {self._format_amount(core.target_value)}：\n"
+            f"- 投资 {core.years:g} 年，达成概率约为 {current:.0%}\n"
+            f"- 投资 {years:g} 年，达成概率约为 {changed:.0%}（参考配置：{mix}）\n\n"
+            "以上结果基于长期资本市场假设，仅供参考，不构成收益承诺。"
+        )
+    
+    def _format_recommended_allocation(self, allocation: Dict[str, float], tolerance: str, years: float) -> str:
+        """把推荐配置整理为回复文本"""
+        mu = sum(w * ASSET_CLASSES[key]["expected_return"] for key, w in allocation.items())
+        lines = [f"按照您的风险承受能力（{tolerance}）和 {years:g} 年的投资期限，参考配置为："]
+        for key, weight in sorted(allocation.items(), key=lambda item: -item[1]):
+            lines.append(f"- {ASSET_CLASSES[key]['name']}: {weight:.0%}")
+        lines.append(f"该配置的预期年化收益约 {mu:.1%}。")
+        return "\n".join(lines)
+    
+    def _format_backtest(self, result) -> str:
+        """把历史回测结果整理为回复文本"""
+        source = f"（数据来源：{result.source}）" if result.source else ""
+        lines = [
+            f"参考历史数据{source}，在 {result.first_start} 至 {result.last_start} 之间开始的 "
+            f"{result.windows} 个 {result.window_years} 年区间中，您当前的配置：",
+            f"- 年化收益中位数约 {result.cagr_percentiles[50]:.1%}，"
+            f"较差的 5% 区间低于 {result.cagr_percentiles[5]:.1%}",
+            f"- 最差的 {result.window_years} 年（{result.worst_start} 起）年化 {result.worst_cagr:.1%}，"
+            f"期间最大回撤最深达 {result.worst_max_drawdown:.0%}"
+        ]
+        if result.loss_probability > 0:
+            lines.append(f"- 约 {result.loss_probability:.0%} 的区间期末出现亏损")
+        if result.coverage < 1:
+            lines.append(f"（历史数据覆盖了配置中 {result.coverage:.0%} 的资产）")
+        return "\n".join(lines)
+    
+    def _format_simulation_reply(self, result, target_value: float) -> str:
+        """把模拟结果整理为回复文本"""
+        return (
+            f"根据您当前的资产配置（预期年化收益约 {result.expected_return:.1%}，"
+            f"年化波动约 {result.volatility:.1%}），我们模拟了 {result.paths:,} 种市场情景：\n"
+            f"- {result.years} 年后资产达到目标 {self._format_amount(target_value)} 的概率约为 "
+            f"{result.success_probability:.0%}\n"
+            f"- 期末资产中位数约 {self._format_amount(result.final_percentile(50))}\n"
+            f"- 较差情况（5% 分位）约 {self._format_amount(result.final_percentile(5))}，"
+            f"较好情况（95% 分位）约 {self._format_amount(result.final_percentile(95))}"
+        )
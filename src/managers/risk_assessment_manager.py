@@ -1,22 +1,29 @@
-import json
+import re
+import unicodedata
 from typing import Dict, List, Optional
-from pathlib import Path
+from src.managers.risk_questionnaire import Questionnaire, QuestionnaireError, get_questionnaire
+
+# 形如 "B"、"选b"、"我选 C。"、"答案是D" 的回答
+_LETTER_ANSWER_PATTERN = re.compile(r'^(?:我?选择?|答案是?|答)?\s*([A-Z])\s*(?:项|选项)?\s*[.。、,，)）!！]?$')
+_OPTION_PREFIX_PATTERN = re.compile(r'^[A-Z]\s*[.、．]\s*')
 
 class RiskAssessmentManager:
     def __init__(self):
         self.questions = []
+        self.questionnaire: Optional[Questionnaire] = None
         self.current_question_index = 0
         self.total_score = 0
+        self.answers: List[str] = []
         self.load_questions()
     
     def load_questions(self) -> None:
-        """加载风险评估问题"""
-        questions_path = Path(__file__).parent.parent.parent / "risk_question.json"
+        """加载风险评估问题（来自进程内共享的问卷缓存）"""
         try:
-            with open(questions_path, 'r', encoding='utf-8') as f:
-                self.questions = json.load(f)
-        except Exception as e:
+            self.questionnaire = get_questionnaire()
+            self.questions = self.questionnaire.questions
+        except QuestionnaireError as e:
             print(f"加载风险评估问题时出错: {str(e)}")
+            self.questionnaire = None
             self.questions = []
     
     def get_current_question(self) -> Optional[Dict]:
@@ -45,6 +52,7 @@ class RiskAssessmentManager:
         
         # 计算得分
         self.total_score += current_question["scores"][answer]
+        self.answers.append(answer)
         self.current_question_index += 1
         
         # 检查是否完成所有问题
@@ -58,18 +66,73 @@ class RiskAssessmentManager:
         }
     
     def calculate_risk_tolerance(self) -> str:
-        """根据总分计算风险承受能力"""
-        # 假设总分范围是13-46分
-        if self.total_score <= 20:
-            return "保守型"
-        elif self.total_score <= 30:
-            return "稳健型"
-        elif self.total_score <= 40:
-            return "进取型"
-        else:
-            return "激进型"
+        """根据总分计算风险承受能力，分档由问卷的总分范围决定"""
+        if self.questionnaire is None:
+            self.load_questions()
+        if self.questionnaire is None:
+            raise QuestionnaireError("风险评估问卷不可用")
+        return self.questionnaire.tolerance_for(self.total_score)
+    
+    def parse_answer(self, text: str) -> Optional[str]:
+        """把用户的回复解析为当前问题的选项字母，无法识别时返回 None
+
+        支持 "B"、"选b"、"第2个"、全角字母以及选项原文（如 "谨慎"）。
+        """
+        current_question = self.get_current_question()
+        if not current_question:
+            return None
+        scores = current_question["scores"]
+        normalized = unicodedata.normalize("NFKC", text).strip().upper()
+        
+        match = _LETTER_ANSWER_PATTERN.match(normalized)
+        if match:
+            return match.group(1) if match.group(1) in scores else None
+        
+        match = re.fullmatch(r'第?\s*([1-9])\s*(?:个|项|个选项)?', normalized)
+        if match:
+            letter = chr(64 + int(match.group(1)))
+            return letter if letter in scores else None
+        
+        # 按选项原文匹配，只有唯一匹配时才采纳
+        candidates = []
+        for option in current_question["options"]:
+            letter = option.strip()[:1].upper()
+            body = _OPTION_PREFIX_PATTERN.sub('', unicodedata.normalize("NFKC", option).strip().upper())
+            if body and (body in normalized or (len(normalized) >= 2 and normalized in body)):
+                candidates.append(letter)
+        if len(candidates) == 1 and candidates[0] in scores:
+            return candidates[0]
+        return None
+    
+    def format_question(self) -> str:
+        """把当前问题格式化为对话中展示的文本"""
+        current_question = self.get_current_question()
+        if not current_question:
+            return ""
+        options = "\n".join(f"- {option}" for option in current_question["options"])
+        return (
+            f"问题 {self.current_question_index + 1}/{len(self.questions)}：{current_question['question']}\n"
+            f"{options}\n\n"
+            "请回复选项字母（例如 A）。"
+        )
+    
+    def get_progress(self) -> Dict:
+        """获取答题进度，用于会话持久化"""
+        return {
+            "current_question_index": self.current_question_index,
+            "total_score": self.total_score,
+            "answers": list(self.answers)
+        }
+    
+    def restore_progress(self, progress: Dict) -> None:
+        """恢复答题进度"""
+        self.current_question_index = progress.get("current_question_index", 0)
+        self.total_score = progress.get("total_score", 0)
+        self.answers = list(progress.get("answers", []))
     
     def reset(self) -> None:
-        """重置评估状态"""
+        """重置评估状态，并加载问卷的最新版本"""
+        self.load_questions()
         self.current_question_index = 0
-        self.total_score = 0 
+        self.total_score = 0
+        self.answers = []
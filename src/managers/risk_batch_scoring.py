@@ -0,0 +1,217 @@
+"""风险评估问卷批量计分
+
+问卷权重或分档调整后，需要对所有已保存的问卷答案重新计分。本模块把答案编码为
+整数矩阵（行：问卷，列：题目，值：选项序号），用 题目×选项 的分值表一次性查表
+求和，再用 np.searchsorted 按分档边界归类。输入按块流式读取，内存占用与
+chunk_size 成正比，与记录总数无关。
+
+输入格式：
+    CSV：   id,answers（answers 为 "ABDC..." 形式的字符串），或 id,q1,q2,...（每列一个选项字母）
+    JSONL： {"id": ..., "answers": "ABDC..." 或 ["A", "B", ...]}
+
+命令行用法：
+    python -m src.managers.risk_batch_scoring answers.csv -o scores.csv [--bands 20,30,40]
+"""
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from pathlib import Path
+import argparse
+import csv
+import json
+import time
+import numpy as np
+from src.managers.risk_questionnaire import (
+    Questionnaire,
+    RISK_TOLERANCE_LABELS,
+    get_questionnaire
+)
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+# 无效答案（缺失、超出选项范围）的编码
+INVALID = -1
+
+
+def build_score_table(questionnaire: Questionnaire) -> np.ndarray:
+    """构造 题目×选项 的分值表，不存在的选项为 INVALID"""
+    max_options = max(len(q["options"]) for q in questionnaire.questions)
+    table = np.full((len(questionnaire.questions), max_options), INVALID, dtype=np.int32)
+    for i, question in enumerate(questionnaire.questions):
+        for letter, score in question["scores"].items():
+            table[i, ord(letter) - 65] = score
+    return table
+
+
+def encode_answers(answers: Sequence, n_questions: int) -> np.ndarray:
+    """把一批答案编码为 int8 矩阵，选项 A 为 0，无效答案为 INVALID
+
+    答案可以是 "ABDC..." 字符串或字母列表。长度都等于题目数的字符串走向量化
+    路径，其余逐行处理。
+    """
+    if answers and all(type(a) is str and len(a) == n_questions for a in answers):
+        try:
+            raw = "".join(answers).upper().encode("ascii")
+        except UnicodeEncodeError:
+            raw = None
+        if raw is not None:
+            codes = np.frombuffer(raw, dtype=np.uint8).reshape(len(answers), n_questions).astype(np.int8) - 65
+            codes[(codes < 0) | (codes >= 26)] = INVALID
+            return codes
+
+    codes = np.full((len(answers), n_questions), INVALID, dtype=np.int8)
+    for row, answer in enumerate(answers):
+        letters = list(answer) if isinstance(answer, str) else answer
+        for col, letter in enumerate(letters[:n_questions]):
+            if isinstance(letter, str) and len(letter.strip()) == 1:
+                code = ord(letter.strip().upper()) - 65
+                if 0 <= code < 26:
+                    codes[row, col] = code
+    return codes
+
+
+def score_codes(codes: np.ndarray, table: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """按分值表计算每行总分，返回 (总分, 是否有效)
+
+    任意一题答案无效的行视为无效，总分为 0。
+    """
+    n_options = table.shape[1]
+    valid_cells = (codes >= 0) & (codes < n_options)
+    clipped = np.where(valid_cells, codes, 0)
+    scores = table[np.arange(table.shape[0]), clipped]
+    valid_cells &= scores != INVALID
+    valid = valid_cells.all(axis=1)
+    totals = np.where(valid, np.where(valid_cells, scores, 0).sum(axis=1), 0)
+    return totals, valid
+
+
+def bucket_scores(totals: np.ndarray, band_edges: Sequence[float]) -> np.ndarray:
+    """按分档上限（含）归类，返回 RISK_TOLERANCE_LABELS 的下标"""
+    return np.searchsorted(np.asarray(band_edges, dtype=np.float64), totals, side="left")
+
+
+def _iter_csv(path: Path, chunk_size: int) -> Iterator[Tuple[List[str], List]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return
+        id_col = header.index("id") if "id" in header else 0
+        if "answers" in header:
+            answer_col = header.index("answers")
+            extract = lambda row: row[answer_col].strip()
+        else:
+            question_cols = [i for i in range(len(header)) if i != id_col]
+            extract = lambda row: "".join(row[i].strip() or "?" for i in question_cols)
+        ids, answers = [], []
+        for row in reader:
+            if not row:
+                continue
+            ids.append(row[id_col])
+            answers.append(extract(row))
+            if len(ids) >= chunk_size:
+                yield ids, answers
+                ids, answers = [], []
+        if ids:
+            yield ids, answers
+
+
+def _iter_jsonl(path: Path, chunk_size: int) -> Iterator[Tuple[List[str], List]]:
+    with open(path, encoding="utf-8") as f:
+        ids, answers = [], []
+        for line_no, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            ids.append(str(record.get("id", line_no)))
+            answers.append(record.get("answers", ""))
+            if len(ids) >= chunk_size:
+                yield ids, answers
+                ids, answers = [], []
+        if ids:
+            yield ids, answers
+
+
+def iter_answer_chunks(path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[List[str], List]]:
+    """按块读取答案文件，返回 (id 列表, 答案列表)"""
+    path = Path(path)
+    if path.suffix.lower() in (".jsonl", ".ndjson"):
+        return _iter_jsonl(path, chunk_size)
+    return _iter_csv(path, chunk_size)
+
+
+def score_file(
+    input_path,
+    output_path=None,
+    questionnaire: Optional[Questionnaire] = None,
+    band_edges: Optional[Sequence[float]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict:
+    """对答案文件批量计分
+
+    Args:
+        input_path: CSV 或 JSONL 答案文件
+        output_path: 结果 CSV（id,total_score,tolerance），为空时只统计
+        questionnaire: 计分使用的问卷，默认使用当前问卷
+        band_edges: 分档上限，默认由问卷的总分范围计算
+        chunk_size: 每块处理的记录数
+
+    Returns:
+        统计信息：总数、无效数、各类型人数、耗时
+    """
+    questionnaire = questionnaire or get_questionnaire()
+    band_edges = list(band_edges if band_edges is not None else questionnaire.band_edges)
+    if len(band_edges) != len(RISK_TOLERANCE_LABELS) - 1:
+        raise ValueError(f"需要 {len(RISK_TOLERANCE_LABELS) - 1} 个分档边界，实际 {len(band_edges)} 个")
+    table = build_score_table(questionnaire)
+    n_questions = table.shape[0]
+    labels = np.array(RISK_TOLERANCE_LABELS + ["无效"], dtype=object)
+
+    counts = np.zeros(len(labels), dtype=np.int64)
+    total = 0
+    started = time.perf_counter()
+    out = open(output_path, "w", newline="", encoding="utf-8") if output_path else None
+    try:
+        writer = csv.writer(out) if out else None
+        if writer:
+            writer.writerow(["id", "total_score", "tolerance"])
+        for ids, answers in iter_answer_chunks(input_path, chunk_size):
+            codes = encode_answers(answers, n_questions)
+            totals, valid = score_codes(codes, table)
+            bands = np.where(valid, bucket_scores(totals, band_edges), len(labels) - 1)
+            counts += np.bincount(bands, minlength=len(labels))
+            total += len(ids)
+            if writer:
+                writer.writerows(zip(ids, np.where(valid, totals, -1).tolist(), labels[bands].tolist()))
+    finally:
+        if out:
+            out.close()
+
+    return {
+        "total": total,
+        "invalid": int(counts[-1]),
+        "by_tolerance": {label: int(count) for label, count in zip(RISK_TOLERANCE_LABELS, counts[:-1])},
+        "band_edges": band_edges,
+        "seconds": time.perf_counter() - started
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="风险评估问卷批量计分")
+    parser.add_argument("input", help="答案文件（.csv 或 .jsonl）")
+    parser.add_argument("-o", "--output", help="结果 CSV 文件")
+    parser.add_argument("--questionnaire", help="问卷文件，默认使用当前问卷")
+    parser.add_argument("--bands", help="分档上限，逗号分隔，例如 20,30,40")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    questionnaire = get_questionnaire(args.questionnaire) if args.questionnaire else None
+    band_edges = [float(x) for x in args.bands.split(",")] if args.bands else None
+    stats = score_file(args.input, args.output, questionnaire, band_edges, args.chunk_size)
+    rate = stats["total"] / stats["seconds"] if stats["seconds"] else 0
+    print(f"共 {stats['total']} 条，无效 {stats['invalid']} 条，耗时 {stats['seconds']:.2f} 秒（{rate:,.0f} 条/秒）")
+    print(f"分档上限: {stats['band_edges']}")
+    for label, count in stats["by_tolerance"].items():
+        print(f"- {label}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from pathlib import Path
+import bisect
+import json
+import os
+import threading
+
+RISK_QUESTION_PATH = Path(os.getenv(
+    "RISK_QUESTION_PATH",
+    str(Path(__file__).parent.parent.parent / "risk_question.json")
+))
+
+# 风险承受能力类型，从低到高
+RISK_TOLERANCE_LABELS = ["保守型", "稳健型", "进取型", "激进型"]
+
+# 单个选项允许的分值范围
+MIN_OPTION_SCORE = 0
+MAX_OPTION_SCORE = 100
+
+
+class QuestionnaireError(ValueError):
+    """问卷文件不存在或格式不正确"""
+
+
+@dataclass(slots=True)
+class Questionnaire:
+    """经过校验的风险评估问卷"""
+    questions: List[Dict]
+    min_score: int  # 可能的最低总分
+    max_score: int  # 可能的最高总分
+    band_edges: List[float] = field(default_factory=list)  # 各类型的总分上限（含），最后一档没有上限
+    mtime: float = 0.0
+
+    def tolerance_for(self, total_score: float) -> str:
+        """根据总分确定风险承受能力类型"""
+        return RISK_TOLERANCE_LABELS[bisect.bisect_left(self.band_edges, total_score)]
+
+
+def _option_letter(option: str) -> str:
+    return option.strip()[:1].upper()
+
+
+def validate_questions(questions) -> List[Dict]:
+    """校验问卷结构：选项与计分的字母一致，分值为范围内的整数"""
+    if not isinstance(questions, list) or not questions:
+        raise QuestionnaireError("问卷必须是非空列表")
+    for index, question in enumerate(questions, start=1):
+        if not isinstance(question, dict):
+            raise QuestionnaireError(f"第 {index} 题格式不正确")
+        if not isinstance(question.get("question"), str) or not question["question"].strip():
+            raise QuestionnaireError(f"第 {index} 题缺少题目")
+        options = question.get("options")
+        scores = question.get("scores")
+        if not isinstance(options, list) or len(options) < 2:
+            raise QuestionnaireError(f"第 {index} 题至少需要两个选项")
+        if not isinstance(scores, dict):
+            raise QuestionnaireError(f"第 {index} 题缺少计分")
+        letters = [_option_letter(option) for option in options]
+        expected = [chr(65 + i) for i in range(len(options))]
+        if letters != expected:
+            raise QuestionnaireError(f"第 {index} 题的选项应依次以 {'、'.join(expected)} 开头")
+        if set(scores) != set(letters):
+            raise QuestionnaireError(f"第 {index} 题的计分项 {sorted(scores)} 与选项 {letters} 不一致")
+        for letter, score in scores.items():
+            if type(score) is not int or not MIN_OPTION_SCORE <= score <= MAX_OPTION_SCORE:
+                raise QuestionnaireError(
+                    f"第 {index} 题选项 {letter} 的分值 {score!r} 不在 {MIN_OPTION_SCORE}-{MAX_OPTION_SCORE} 范围内"
+                )
+    return questions
+
+
+def compute_band_edges(min_score: int, max_score: int, bands: int = len(RISK_TOLERANCE_LABELS)) -> List[float]:
+    """把 [最低总分, 最高总分] 等分为若干档，返回前几档的上限"""
+    span = max_score - min_score
+    return [min_score + span * i / bands for i in range(1, bands)]
+
+
+def build_questionnaire(questions, mtime: float = 0.0) -> Questionnaire:
+    """校验问卷并预先计算总分范围与分档"""
+    questions = validate_questions(questions)
+    min_score = sum(min(q["scores"].values()) for q in questions)
+    max_score = sum(max(q["scores"].values()) for q in questions)
+    return Questionnaire(
+        questions=questions,
+        min_score=min_score,
+        max_score=max_score,
+        band_edges=compute_band_edges(min_score, max_score),
+        mtime=mtime
+    )
+
+
+_lock = threading.Lock()
+_cache: Dict[Path, Questionnaire] = {}
+_failed_mtime: Dict[Path, float] = {}  # 校验失败的文件版本，文件再次修改前不重复解析
+
+
+def get_questionnaire(path: Optional[Path] = None) -> Questionnaire:
+    """获取问卷，进程内只解析一次，文件修改后自动重新加载
+
+    重新加载失败时继续使用上一次成功加载的版本。
+
+    Raises:
+        QuestionnaireError: 文件无法读取或格式不正确，且没有可用的旧版本
+    """
+    path = Path(path or RISK_QUESTION_PATH)
+    try:
+        mtime = path.stat().st_mtime
+    except OSError as e:
+        cached = _cache.get(path)
+        if cached is not None:
+            return cached
+        raise QuestionnaireError(f"无法读取问卷文件 {path}: {e}") from e
+
+    cached = _cache.get(path)
+    if cached is not None and (cached.mtime == mtime or _failed_mtime.get(path) == mtime):
+        return cached
+
+    with _lock:
+        cached = _cache.get(path)
+        if cached is not None and cached.mtime == mtime:
+            return cached
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                questionnaire = build_questionnaire(json.load(f), mtime)
+        except (OSError, ValueError) as e:
+            _failed_mtime[path] = mtime
+            if cached is not None:
+                print(f"❌ 重新加载问卷失败，继续使用旧版本: {str(e)}")
+                return cached
+            if isinstance(e, QuestionnaireError):
+                raise
+            raise QuestionnaireError(f"无法解析问卷文件 {path}: {e}") from e
+        _cache[path] = questionnaire
+        print(f"已加载风险评估问卷: {path}（{len(questionnaire.questions)} 题，"
+              f"总分 {questionnaire.min_score}-{questionnaire.max_score}）")
+        return questionnaire
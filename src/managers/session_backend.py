@@ -0,0 +1,274 @@
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse, unquote
+from pathlib import Path
+import socket
+import sqlite3
+import threading
+import time
+from src.config.session_config import SESSION_BACKEND_TTL, SESSION_BACKEND_TIMEOUT
+
+class SessionBackend:
+    """跨进程共享的会话存储后端
+
+    每个会话保存为 (version, data)。写入必须通过 compare_and_swap 完成：只有当
+    后端中的版本号等于调用方读到的版本号时才会写入成功，从而允许任意 worker
+    处理任意一轮对话而无需粘性路由。
+    """
+
+    def load(self, session_id: str) -> Optional[Tuple[int, bytes]]:
+        """读取会话，返回 (版本号, 数据)，不存在时返回 None"""
+        raise NotImplementedError
+
+    def get_version(self, session_id: str) -> int:
+        """读取会话的当前版本号，不存在时返回 0"""
+        raise NotImplementedError
+
+    def compare_and_swap(self, session_id: str, expected_version: int, data: bytes) -> Optional[int]:
+        """版本号匹配时写入数据，成功返回新版本号，冲突返回 None
+
+        expected_version 为 0 表示会话尚不存在。
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        """删除会话"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """关闭连接"""
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """基于 SQLite（WAL 模式）的会话后端，适用于同一台机器上的多个 worker"""
+
+    def __init__(self, path: str, timeout: float = SESSION_BACKEND_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, "
+            "version INTEGER NOT NULL, "
+            "data BLOB NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 连接不能跨线程共享，每个线程各自持有一个连接
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id: str) -> Optional[Tuple[int, bytes]]:
+        row = self._connection().execute(
+            "SELECT version, data FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], bytes(row[1])
+
+    def get_version(self, session_id: str) -> int:
+        row = self._connection().execute(
+            "SELECT version FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def compare_and_swap(self, session_id: str, expected_version: int, data: bytes) -> Optional[int]:
+        conn = self._connection()
+        new_version = expected_version + 1
+        if expected_version == 0:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, version, data, updated_at) VALUES (?, ?, ?, ?)",
+                (session_id, new_version, data, time.time())
+            )
+        else:
+            cursor = conn.execute(
+                "UPDATE sessions SET version = ?, data = ?, updated_at = ? WHERE session_id = ? AND version = ?",
+                (new_version, data, time.time(), session_id, expected_version)
+            )
+        return new_version if cursor.rowcount == 1 else None
+
+    def delete(self, session_id: str) -> None:
+        self._connection().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class RedisError(Exception):
+    """Redis 服务端返回的错误"""
+
+
+class _RespConnection:
+    """最小化的 RESP 协议客户端，只依赖标准库"""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.reader = self.sock.makefile("rb")
+
+    def execute(self, *args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode("utf-8")
+            elif isinstance(arg, int):
+                arg = str(arg).encode("ascii")
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        self.sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _read_reply(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Redis 连接已关闭")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"+":
+            return payload.decode("utf-8")
+        if prefix == b"-":
+            raise RedisError(payload.decode("utf-8"))
+        if prefix == b":":
+            return int(payload)
+        if prefix == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise RedisError(f"无法解析的 RESP 响应: {line!r}")
+
+    def close(self) -> None:
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisSessionBackend(SessionBackend):
+    """基于 Redis 协议的会话后端
+
+    只使用 GET/MGET/SET/DEL/WATCH/UNWATCH/MULTI/EXEC 等基础命令，任何兼容
+    RESP 协议的服务（包括本地替身服务）都可以满足。会话数据与版本号分别保存在
+    两个键中，读取版本号时无需传输整个会话。
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        prefix: str = "glad:session:",
+        ttl: int = SESSION_BACKEND_TTL,
+        timeout: float = SESSION_BACKEND_TIMEOUT
+    ):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.prefix = prefix
+        self.ttl = ttl
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> _RespConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _RespConnection(self.host, self.port, self.timeout)
+            if self.password:
+                conn.execute("AUTH", self.password)
+            if self.db:
+                conn.execute("SELECT", self.db)
+            self._local.conn = conn
+        return conn
+
+    def _execute(self, *args):
+        try:
+            return self._connection().execute(*args)
+        except (ConnectionError, OSError):
+            # 连接断开时重连一次
+            self.close()
+            return self._connection().execute(*args)
+
+    def _keys(self, session_id: str) -> Tuple[str, str]:
+        key = self.prefix + session_id
+        return key, key + ":version"
+
+    def load(self, session_id: str) -> Optional[Tuple[int, bytes]]:
+        data_key, version_key = self._keys(session_id)
+        version, data = self._execute("MGET", version_key, data_key)
+        if version is None or data is None:
+            return None
+        return int(version), data
+
+    def get_version(self, session_id: str) -> int:
+        version = self._execute("GET", self._keys(session_id)[1])
+        return int(version) if version is not None else 0
+
+    def compare_and_swap(self, session_id: str, expected_version: int, data: bytes) -> Optional[int]:
+        data_key, version_key = self._keys(session_id)
+        new_version = expected_version + 1
+        expire_args: List = ["EX", self.ttl] if self.ttl else []
+        conn = self._connection()
+        try:
+            conn.execute("WATCH", version_key)
+            current = conn.execute("GET", version_key)
+            if (int(current) if current is not None else 0) != expected_version:
+                conn.execute("UNWATCH")
+                return None
+            conn.execute("MULTI")
+            conn.execute("SET", data_key, data, *expire_args)
+            conn.execute("SET", version_key, new_version, *expire_args)
+            # EXEC 返回 None 表示版本键在事务提交前被其他 worker 修改
+            result = conn.execute("EXEC")
+            return new_version if result is not None else None
+        except Exception:
+            # 连接可能停留在 WATCH/MULTI 中，直接丢弃，下次重新建立
+            self.close()
+            raise
+
+    def delete(self, session_id: str) -> None:
+        self._execute("DEL", *self._keys(session_id))
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def create_session_backend(url: str) -> Optional[SessionBackend]:
+    """根据 URL 创建会话后端
+
+    支持 sqlite:///path/to/sessions.db 和 redis://[:password@]host:port/db，
+    URL 为空时返回 None（仅使用进程内存储）。
+    """
+    if not url:
+        return None
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        # sqlite:///relative.db 为相对路径，sqlite:////abs/path.db 为绝对路径
+        return SQLiteSessionBackend(unquote(parsed.path[1:]))
+    if parsed.scheme == "redis":
+        db = parsed.path.lstrip("/")
+        return RedisSessionBackend(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=unquote(parsed.password) if parsed.password else None
+        )
+    raise ValueError(f"不支持的会话后端: {url}")
@@ -0,0 +1,606 @@
+from typing import Dict, List, Optional
+from dataclasses import dataclass, field
+from collections import OrderedDict
+from pathlib import Path
+import copy
+import json
+import re
+import threading
+import time
+import zlib
+from src.managers.state_manager import StateManager, ConversationState
+from src.managers.conversation_manager import ConversationManager
+from src.managers.session_backend import SessionBackend, create_session_backend
+from src.config.config_manager import ConfigManager
+from src.utils import binary_codec
+from src.utils.event_log import EventLog
+from src.config.session_config import (
+    SESSION_MAX_COUNT,
+    SESSION_IDLE_TTL,
+    SESSION_MAX_BYTES,
+    SESSION_MAX_TOTAL_BYTES,
+    SESSION_SPILL_DIR,
+    SESSION_MAX_TRANSCRIPT,
+    SESSION_BACKEND_URL,
+    EVENT_LOG_DIR,
+    EVENT_LOG_SHARDS,
+    EVENT_SNAPSHOT_INTERVAL,
+    EVENT_LOG_FSYNC,
+    BACKGROUND_DRAIN_TIMEOUT
+)
+
+# 二进制编码的 schema 版本，字段顺序变化时需要递增
+SESSION_SCHEMA_VERSION = 3  # 2: 增加事件序号；3: 增加风险评估答题进度
+SESSION_COMPRESS_THRESHOLD = 4096  # 编码后超过该字节数时压缩
+
+# 估算会话内存占用时使用的常量
+_BASE_BYTES = 4096        # 配置、状态数据、收集阶段等固定结构的近似大小
+_MESSAGE_OVERHEAD = 160   # 每条消息字典本身的近似开销
+_STATE_ENTRY_BYTES = 64   # 每条状态历史记录的近似大小
+
+def _message_bytes(message: Dict) -> int:
+    """估算单条消息占用的字节数（中文按 UTF-8 三字节计）"""
+    return _MESSAGE_OVERHEAD + 3 * len(str(message.get("content", "")))
+
+@dataclass
+class Session:
+    """单个用户会话"""
+    session_id: str
+    config_manager: ConfigManager
+    state_manager: StateManager
+    conversation_manager: ConversationManager
+    last_access: float = 0.0
+    approx_bytes: int = 0
+    version: int = 0  # 共享后端中的版本号，0 表示尚未写入
+    transcript: List[Dict] = field(default_factory=list)  # 界面展示的对话记录
+    _transcript_bytes: int = field(default=0, repr=False)
+    dirty: bool = field(default=False, repr=False)  # 本地修改尚未成功写回共享后端
+    event_seq: int = 0  # 已写入事件日志的最后一轮序号
+    snapshot_seq: int = field(default=0, repr=False)  # 最近一次快照对应的事件序号
+
+    @classmethod
+    def create(cls, session_id: str) -> "Session":
+        """创建新的会话"""
+        config_manager = ConfigManager()
+        state_manager = StateManager()
+        return cls._assemble(session_id, config_manager, state_manager)
+
+    @classmethod
+    def _assemble(cls, session_id: str, config_manager: ConfigManager, state_manager: StateManager) -> "Session":
+        conversation_manager = ConversationManager(
+            config_manager=config_manager,
+            state_manager=state_manager
+        )
+        return cls(
+            session_id=session_id,
+            config_manager=config_manager,
+            state_manager=state_manager,
+            conversation_manager=conversation_manager,
+            last_access=time.time()
+        )
+
+    def to_dict(self) -> Dict:
+        """将会话转换为字典格式"""
+        return {
+            "session_id": self.session_id,
+            "version": self.version,
+            "event_seq": self.event_seq,
+            "config": self.config_manager.to_dict(),
+            "state": self.state_manager.to_dict(),
+            "collection_stages": copy.deepcopy(self.conversation_manager.collection_stages),
+            "risk_assessment": self.conversation_manager.risk_assessment.get_progress(),
+            "transcript": list(self.transcript)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Session":
+        """从字典格式恢复会话"""
+        session = cls._assemble(
+            data["session_id"],
+            ConfigManager.from_dict(data.get("config", {})),
+            StateManager.from_dict(data.get("state", {}))
+        )
+        for stage, values in data.get("collection_stages", {}).items():
+            if stage in session.conversation_manager.collection_stages:
+                session.conversation_manager.collection_stages[stage].update(values)
+        session.conversation_manager.risk_assessment.restore_progress(data.get("risk_assessment", {}))
+        for message in data.get("transcript", []):
+            session.add_to_transcript(message)
+        session.version = data.get("version", 0)
+        session.event_seq = data.get("event_seq", 0)
+        return session
+
+    def to_bytes(self) -> bytes:
+        """编码为紧凑的二进制格式，体积较大时自动压缩"""
+        return binary_codec.pack(binary_codec.KIND_SESSION, SESSION_SCHEMA_VERSION, [
+            self.session_id,
+            self.version,
+            self.config_manager.to_bytes(),
+            self.state_manager.to_bytes(),
+            self.conversation_manager.collection_stages,
+            self.transcript,
+            self.event_seq,
+            self.conversation_manager.risk_assessment.get_progress()
+        ], compress_threshold=SESSION_COMPRESS_THRESHOLD)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Session":
+        """从二进制格式恢复会话，兼容旧版的压缩 JSON 格式"""
+        if not binary_codec.is_packed(data):
+            return cls.from_dict(json.loads(zlib.decompress(data).decode("utf-8")))
+        schema_version, values = binary_codec.unpack(data, binary_codec.KIND_SESSION)
+        if schema_version not in (1, 2, SESSION_SCHEMA_VERSION):
+            raise binary_codec.SchemaVersionError(f"不支持的会话 schema 版本: {schema_version}")
+        if schema_version < 2:
+            values.append(0)
+        if schema_version < 3:
+            values.append({})
+        session_id, version, config_data, state_data, stages, transcript, event_seq, risk_progress = values
+        session = cls._assemble(
+            session_id,
+            ConfigManager.from_bytes(config_data),
+            StateManager.from_bytes(state_data)
+        )
+        session.version = version
+        session.event_seq = event_seq
+        for stage, stage_values in stages.items():
+            if stage in session.conversation_manager.collection_stages:
+                session.conversation_manager.collection_stages[stage].update(stage_values)
+        session.conversation_manager.risk_assessment.restore_progress(risk_progress)
+        for message in transcript:
+            session.add_to_transcript(message)
+        return session
+
+    def apply_event(self, event: Dict) -> None:
+        """重放事件日志中的一轮对话"""
+        delta = event.get("config_delta") or {}
+        config = self.config_manager
+        config.update_core_investment(**delta.get("core_investment", {}))
+        config.update_risk_profile(**delta.get("risk_profile", {}))
+        config.update_portfolio(**delta.get("portfolio", {}))
+        user_info = delta.get("user_info", {})
+        config.update_user_info("personal", **user_info.get("personal", {}))
+        config.update_user_info("financial", **user_info.get("financial", {}))
+
+        state = self.state_manager
+        if event.get("state"):
+            state.current_state = ConversationState(event["state"])
+        state.add_to_history({
+            "role": "user",
+            "content": event.get("user_input", ""),
+            "state": event.get("state"),
+            "extracted_info": (event.get("analysis") or {}).get("extracted_info", {})
+        })
+        state.add_to_history({
+            "role": "assistant",
+            "content": event.get("reply", ""),
+            "state": event.get("state")
+        })
+        state.info_collection_progress.update(event.get("info_collection_progress") or {})
+        if event.get("risk_assessment"):
+            self.conversation_manager.risk_assessment.restore_progress(event["risk_assessment"])
+        stages = self.conversation_manager.collection_stages
+        for stage, values in (event.get("collection_stages") or {}).items():
+            if stage in stages:
+                stages[stage].update(values)
+        if event.get("state_data"):
+            state.restore_state_data(event["state_data"])
+        self.add_to_transcript({"role": "user", "content": event.get("user_input", "")})
+        if event.get("reply"):
+            self.add_to_transcript({"role": "assistant", "content": event["reply"]})
+        self.event_seq = event.get("seq", self.event_seq + 1)
+
+    def add_to_transcript(self, message: Dict) -> None:
+        """添加界面展示的消息，超出上限时丢弃最早的消息"""
+        self.transcript.append(message)
+        self._transcript_bytes += _message_bytes(message)
+        while len(self.transcript) > SESSION_MAX_TRANSCRIPT:
+            self._transcript_bytes -= _message_bytes(self.transcript.pop(0))
+
+    def trim_transcript(self, keep: int) -> None:
+        """只保留最近 keep 条展示消息"""
+        while len(self.transcript) > keep:
+            self._transcript_bytes -= _message_bytes(self.transcript.pop(0))
+
+    def measure(self) -> int:
+        """估算会话占用的内存字节数
+
+        不做序列化：展示记录的大小随增删增量维护，对话历史受 max_history 限制，
+        状态历史只按条数估算。
+        """
+        context = self.state_manager.context
+        self.approx_bytes = (
+            _BASE_BYTES +
+            self._transcript_bytes +
+            sum(_message_bytes(message) for message in context.history) +
+            _STATE_ENTRY_BYTES * len(context.state_history)
+        )
+        return self.approx_bytes
+
+
+class SessionStore:
+    """带 LRU/TTL 淘汰与内存上限的会话注册表
+
+    内存中最多保留 max_sessions 个会话，空闲超过 idle_ttl 秒或总内存超限的会话
+    会按最近最少使用顺序淘汰并落盘，下次访问时自动恢复。get() 会固定（pin）
+    会话直到对应的 release()，正在处理中的会话不会被淘汰。淘汰时在锁内选出会话，
+    等待后台记账、写回和落盘在锁外进行，不阻塞其他会话；淘汰完成之前再次访问
+    同一会话会等待其完成。
+
+    配置了事件日志（EVENT_LOG_DIR）时，每轮对话都会追加到日志，并每隔
+    snapshot_interval 轮保存一次快照；内存、磁盘和共享后端中都找不到的会话
+    可以通过最新快照加上之后的事件恢复。
+
+    配置了共享后端（SESSION_BACKEND_URL）时，内存中的会话只是后端的缓存：每轮
+    对话开始时校验版本号，结束时以 compare-and-swap 写回，多个 worker 进程可以
+    处理同一会话的任意一轮对话。
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = SESSION_MAX_COUNT,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        max_session_bytes: int = SESSION_MAX_BYTES,
+        max_total_bytes: int = SESSION_MAX_TOTAL_BYTES,
+        spill_dir: str = SESSION_SPILL_DIR,
+        backend: Optional[SessionBackend] = None,
+        event_log: Optional[EventLog] = None,
+        snapshot_interval: int = EVENT_SNAPSHOT_INTERVAL
+    ):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_session_bytes = max_session_bytes
+        self.max_total_bytes = max_total_bytes
+        self.spill_dir = Path(spill_dir)
+        self.backend = backend if backend is not None else create_session_backend(SESSION_BACKEND_URL)
+        if event_log is None and EVENT_LOG_DIR:
+            event_log = EventLog(EVENT_LOG_DIR, shards=EVENT_LOG_SHARDS, fsync=EVENT_LOG_FSYNC)
+        self.event_log = event_log
+        self.snapshot_interval = snapshot_interval
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._total_bytes = 0
+        self._pins: Dict[str, int] = {}  # 正在使用中的会话引用计数
+        self._evicting: Dict[str, threading.Event] = {}  # 已移出内存、尚未落盘的会话
+        self._lock = threading.RLock()
+        self.stats = {
+            'hits': 0,         # 内存命中次数
+            'created': 0,      # 新建会话次数
+            'rehydrated': 0,   # 从磁盘恢复次数
+            'evicted': 0,      # 淘汰落盘次数
+            'trimmed': 0,      # 因超出单会话上限而裁剪的次数
+            'stale': 0,        # 缓存版本落后于共享后端的次数
+            'conflicts': 0     # 写回共享后端时的版本冲突次数
+        }
+
+    def get(self, session_id: str) -> Session:
+        """获取并固定会话，不存在时从磁盘恢复或新建
+
+        每次 get() 都必须有对应的 release()，否则会话不会被淘汰。
+        """
+        return self._get(session_id, pin=True)
+
+    def reload(self, session_id: str) -> Session:
+        """重新获取会话（不改变固定计数），用于 commit() 冲突后加载最新版本"""
+        return self._get(session_id, pin=False)
+
+    def _get(self, session_id: str, pin: bool) -> Session:
+        while True:
+            with self._lock:
+                pending = self._evicting.get(session_id)
+                if pending is None:
+                    victims = self._select_expired(keep=session_id)
+                    session = self._get_locked(session_id, pin)
+                    victims += self._select_over_limit()
+                    break
+            # 该会话正在淘汰落盘，等待完成后再加载
+            pending.wait()
+        self._finish_evictions(victims)
+        return session
+
+    def _get_locked(self, session_id: str, pin: bool) -> Session:
+        session = self._sessions.get(session_id)
+        if session is not None and self._is_stale(session):
+            # 其他 worker 已经处理过该会话的新一轮对话，丢弃本地缓存
+            self._drop(session_id)
+            self.stats['stale'] += 1
+            session = None
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+            self.stats['hits'] += 1
+        else:
+            session = self._load(session_id)
+            if session is None:
+                session = self._restore_from_event_log(session_id)
+            if session is None:
+                session = Session.create(session_id)
+                self.stats['created'] += 1
+            self._bind_event_log(session)
+            self._sessions[session_id] = session
+            self._total_bytes += session.measure()
+        session.last_access = time.time()
+        if pin:
+            self._pins[session_id] = self._pins.get(session_id, 0) + 1
+        return session
+
+    def commit(self, session_id: str) -> bool:
+        """一轮对话结束后重新估算会话大小、执行内存限制并写回共享后端
+
+        Returns:
+            写回共享后端时发生版本冲突则返回 False，此时本地缓存被丢弃，
+            调用方可以通过 reload() 获取最新版本后重试。后端暂时不可用时
+            会话被标记为未写回，之后的 commit() 或淘汰时会再次尝试。
+        """
+        session = self._sessions.get(session_id)
+        if session is not None:
+            # 等待回复之后的后台记账完成，再估算大小并写回
+            session.conversation_manager.flush_background()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return False
+            self._total_bytes -= session.approx_bytes
+            session.measure()
+            if session.approx_bytes > self.max_session_bytes:
+                self._trim_session(session)
+            self._total_bytes += session.approx_bytes
+            session.last_access = time.time()
+            self._maybe_snapshot(session)
+            saved = self._save(session)
+            victims = self._select_over_limit()
+        self._finish_evictions(victims)
+        return saved
+
+    def release(self, session_id: str) -> None:
+        """解除 get() 对会话的固定"""
+        with self._lock:
+            count = self._pins.get(session_id, 0) - 1
+            if count > 0:
+                self._pins[session_id] = count
+            else:
+                self._pins.pop(session_id, None)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_access = time.time()
+            victims = self._select_over_limit()
+        self._finish_evictions(victims)
+
+    def evict(self, session_id: str) -> bool:
+        """将指定会话淘汰到磁盘"""
+        with self._lock:
+            session = self._begin_eviction(session_id)
+        if session is None:
+            return False
+        self._finish_evictions([session])
+        return True
+
+    def evict_expired(self) -> int:
+        """淘汰所有空闲超时的会话"""
+        with self._lock:
+            victims = self._select_expired()
+        self._finish_evictions(victims)
+        return len(victims)
+
+    def flush(self) -> None:
+        """将内存中的所有会话落盘（进程退出前调用，不考虑固定状态）"""
+        with self._lock:
+            victims = [self._begin_eviction(session_id) for session_id in list(self._sessions)]
+        self._finish_evictions(victims)
+
+    def get_stats(self) -> Dict:
+        """获取存储统计信息"""
+        with self._lock:
+            return {
+                **self.stats,
+                'sessions': len(self._sessions),
+                'pinned': len(self._pins),
+                'total_bytes': self._total_bytes
+            }
+
+    def _select_expired(self, keep: Optional[str] = None) -> List[Session]:
+        """选出空闲超时的会话并移出内存（需持有锁），keep 为正在获取的会话"""
+        deadline = time.time() - self.idle_ttl
+        expired = [
+            session_id for session_id, session in self._sessions.items()
+            if session.last_access < deadline and session_id not in self._pins and session_id != keep
+        ]
+        return [self._begin_eviction(session_id) for session_id in expired]
+
+    def _select_over_limit(self) -> List[Session]:
+        """按 LRU 顺序选出未固定的会话并移出内存，直到数量和内存都在限制内（需持有锁）"""
+        victims = []
+        while len(self._sessions) > self.max_sessions or self._total_bytes > self.max_total_bytes:
+            oldest_id = next(
+                (session_id for session_id in self._sessions if session_id not in self._pins),
+                None
+            )
+            if oldest_id is None:
+                break  # 剩余会话都在使用中
+            victims.append(self._begin_eviction(oldest_id))
+        return victims
+
+    def _begin_eviction(self, session_id: str) -> Optional[Session]:
+        """把会话移出内存并登记为正在淘汰（需持有锁），落盘由 _finish_evictions 完成"""
+        session = self._drop(session_id)
+        if session is not None:
+            self._evicting[session_id] = threading.Event()
+        return session
+
+    def _finish_evictions(self, sessions: List[Optional[Session]]) -> None:
+        """在锁外等待后台记账并写回/落盘，完成后唤醒等待该会话的 get()"""
+        for session in sessions:
+            if session is None:
+                continue
+            try:
+                session.conversation_manager.flush_background(BACKGROUND_DRAIN_TIMEOUT)
+                if self.backend is not None and session.dirty:
+                    # 上次写回失败，淘汰前再试一次
+                    self._save(session)
+                if self.backend is None or session.dirty:
+                    # 使用共享后端时会话已在每轮结束时写回，只有写回失败时才落盘
+                    self._spill(session)
+            finally:
+                with self._lock:
+                    self.stats['evicted'] += 1
+                    self._evicting.pop(session.session_id).set()
+
+    def _drop(self, session_id: str) -> Optional[Session]:
+        """从内存中移除会话"""
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._total_bytes -= session.approx_bytes
+        return session
+
+    def _bind_event_log(self, session: Session) -> None:
+        """让会话的每轮对话写入事件日志"""
+        if self.event_log is None:
+            return
+
+        def record(event: Dict) -> None:
+            session.event_seq += 1
+            self.event_log.append(session.session_id, session.event_seq, event)
+
+        session.conversation_manager.event_recorder = record
+
+    def _maybe_snapshot(self, session: Session) -> None:
+        """距上次快照超过 snapshot_interval 轮时保存快照"""
+        if self.event_log is None or session.event_seq - session.snapshot_seq < self.snapshot_interval:
+            return
+        try:
+            self.event_log.write_snapshot(session.session_id, session.event_seq, session.to_bytes())
+            session.snapshot_seq = session.event_seq
+        except Exception as e:
+            print(f"❌ 保存会话快照失败 ({session.session_id}): {str(e)}")
+
+    def _restore_from_event_log(self, session_id: str) -> Optional[Session]:
+        """从最新快照和之后的事件恢复会话"""
+        if self.event_log is None:
+            return None
+        try:
+            snapshot = self.event_log.load_snapshot(session_id)
+            if snapshot is not None:
+                seq, offset, data = snapshot
+                session = Session.from_bytes(data)
+                session.snapshot_seq = seq
+            else:
+                seq, offset, session = 0, 0, None
+            replayed = 0
+            for event in self.event_log.replay(session_id, after_seq=seq, offset=offset):
+                if session is None:
+                    session = Session.create(session_id)
+                session.apply_event(event)
+                replayed += 1
+            if session is not None:
+                print(f"从事件日志恢复会话 {session_id}：快照序号 {seq}，重放 {replayed} 轮")
+                self.stats['rehydrated'] += 1
+            return session
+        except Exception as e:
+            print(f"❌ 从事件日志恢复会话失败 ({session_id}): {str(e)}")
+            return None
+
+    def _is_stale(self, session: Session) -> bool:
+        """检查本地缓存的会话是否落后于共享后端"""
+        if self.backend is None or session.session_id in self._pins:
+            # 使用中的会话不丢弃，过期的修改会在 commit() 时以冲突的形式暴露
+            return False
+        try:
+            return self.backend.get_version(session.session_id) != session.version
+        except Exception as e:
+            print(f"❌ 读取共享后端版本号失败 ({session.session_id})，继续使用本地缓存: {str(e)}")
+            return False
+
+    def _load(self, session_id: str) -> Optional[Session]:
+        """从共享后端或本地磁盘加载会话"""
+        spilled = self._rehydrate(session_id)
+        if self.backend is None:
+            return spilled
+        if spilled is not None:
+            # 之前写回失败而落盘的会话：版本号仍与后端一致时补写回去
+            spilled.dirty = True
+            try:
+                if self.backend.get_version(session_id) == spilled.version:
+                    return spilled
+                print(f"警告: 会话 {session_id} 的落盘版本已落后于共享后端，丢弃落盘数据")
+                self.stats['conflicts'] += 1
+            except Exception as e:
+                print(f"❌ 读取共享后端版本号失败 ({session_id})，使用落盘数据: {str(e)}")
+                return spilled
+        try:
+            loaded = self.backend.load(session_id)
+            if loaded is None:
+                return None
+            version, data = loaded
+            session = Session.from_bytes(data)
+            session.version = version
+            self.stats['rehydrated'] += 1
+            return session
+        except Exception as e:
+            print(f"❌ 从共享后端加载会话失败 ({session_id}): {str(e)}")
+            return None
+
+    def _save(self, session: Session) -> bool:
+        """以 compare-and-swap 方式将会话写回共享后端"""
+        if self.backend is None:
+            return True
+        try:
+            new_version = self.backend.compare_and_swap(
+                session.session_id, session.version, session.to_bytes()
+            )
+        except Exception as e:
+            print(f"❌ 会话写回共享后端失败 ({session.session_id})，稍后重试: {str(e)}")
+            session.dirty = True
+            return True
+        if new_version is None:
+            print(f"警告: 会话 {session.session_id} 已被其他 worker 更新，丢弃本轮的本地修改")
+            self._drop(session.session_id)
+            session.dirty = False
+            self.stats['conflicts'] += 1
+            return False
+        session.version = new_version
+        session.dirty = False
+        return True
+
+    def _trim_session(self, session: Session) -> None:
+        """裁剪超出单会话上限的历史数据"""
+        context = session.state_manager.context
+        while session.approx_bytes > self.max_session_bytes:
+            if len(context.state_history) > 1:
+                context.state_history = context.state_history[len(context.state_history) // 2:]
+            elif len(session.transcript) > 2:
+                session.trim_transcript(len(session.transcript) // 2)
+            elif len(context.history) > 2:
+                context.history = context.history[2:]
+            else:
+                break
+            session.measure()
+        self.stats['trimmed'] += 1
+
+    def _spill_path(self, session_id: str) -> Path:
+        safe_id = re.sub(r'[^A-Za-z0-9_-]', '_', session_id)
+        if safe_id != session_id:
+            safe_id += "-" + format(zlib.crc32(session_id.encode("utf-8")), "08x")
+        return self.spill_dir / f"{safe_id}.session"
+
+    def _spill(self, session: Session) -> None:
+        """将会话写入磁盘"""
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            path = self._spill_path(session.session_id)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(session.to_bytes())
+            tmp_path.replace(path)
+        except Exception as e:
+            print(f"❌ 会话落盘失败 ({session.session_id}): {str(e)}")
+
+    def _rehydrate(self, session_id: str) -> Optional[Session]:
+        """从磁盘恢复会话"""
+        path = self._spill_path(session_id)
+        if not path.exists():
+            return None
+        try:
+            session = Session.from_bytes(path.read_bytes())
+            path.unlink()
+            self.stats['rehydrated'] += 1
+            return session
+        except Exception as e:
+            print(f"❌ 会话恢复失败 ({session_id}): {str(e)}")
+            return None
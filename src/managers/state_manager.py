@@ -2,6 +2,10 @@ from enum import Enum
 from typing import Dict, List, Optional
 from dataclasses import dataclass, field
 import json
+from src.utils import binary_codec
+
+# 二进制编码的 schema 版本，字段顺序变化时需要递增
+STATE_SCHEMA_VERSION = 1
 
 class ConversationState(Enum):
     """对话状态"""
@@ -11,7 +15,7 @@ class ConversationState(Enum):
     RISK_ASSESSMENT = "RISK_ASSESSMENT" # 风险评估状态
     PORTFOLIO_PLANNING = "PORTFOLIO_PLANNING" # 投资组合规划状态
 
-@dataclass
+@dataclass(slots=True)
 class ConversationContext:
     """对话上下文"""
     current_focus: Optional[str] = None  # 当前关注点
@@ -205,4 +209,83 @@ class StateManager:
     
     def get_state_history(self) -> List[str]:
         """获取状态历史"""
-        return self.context.state_history.copy() 
+        return self.context.state_history.copy()
+
+    def export_state_data(self) -> dict:
+        """可序列化的状态数据（previous_state 转为字符串）"""
+        state_data = dict(self.state_data)
+        if state_data['previous_state'] is not None:
+            state_data['previous_state'] = state_data['previous_state'].value
+        return state_data
+
+    def restore_state_data(self, state_data: dict) -> None:
+        """恢复 export_state_data 导出的状态数据"""
+        state_data = dict(state_data)
+        if state_data.get('previous_state') is not None:
+            state_data['previous_state'] = ConversationState(state_data['previous_state'])
+        self.state_data.update(state_data)
+
+    def to_dict(self) -> dict:
+        """将状态转换为字典格式"""
+        return {
+            "current_state": self.current_state.value,
+            "context": {
+                "current_focus": self.context.current_focus,
+                "history": list(self.context.history),
+                "max_history": self.context.max_history,
+                "consecutive_questions": self.context.consecutive_questions,
+                "state_history": list(self.context.state_history)
+            },
+            "info_collection_progress": dict(self.info_collection_progress),
+            "state_data": self.export_state_data()
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StateManager":
+        """从字典格式恢复状态"""
+        manager = cls()
+        manager.current_state = ConversationState(data.get("current_state", ConversationState.INITIALIZING.value))
+        context = data.get("context", {})
+        manager.context = ConversationContext(
+            current_focus=context.get("current_focus"),
+            history=list(context.get("history", [])),
+            max_history=context.get("max_history", 10),
+            consecutive_questions=context.get("consecutive_questions", 0),
+            state_history=list(context.get("state_history", []))
+        )
+        manager.info_collection_progress.update(data.get("info_collection_progress", {}))
+        manager.restore_state_data(data.get("state_data", {}))
+        return manager
+
+    def to_bytes(self) -> bytes:
+        """编码为紧凑的二进制格式"""
+        context = self.context
+        state_data = self.export_state_data()
+        return binary_codec.pack(binary_codec.KIND_STATE, STATE_SCHEMA_VERSION, [
+            self.current_state.value,
+            [
+                context.current_focus,
+                context.history,
+                context.max_history,
+                context.consecutive_questions,
+                context.state_history
+            ],
+            self.info_collection_progress,
+            state_data
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "StateManager":
+        """从二进制格式恢复状态"""
+        schema_version, values = binary_codec.unpack(data, binary_codec.KIND_STATE)
+        if schema_version != STATE_SCHEMA_VERSION:
+            raise binary_codec.SchemaVersionError(f"不支持的状态 schema 版本: {schema_version}")
+        current_state, context, progress, state_data = values
+        manager = cls()
+        manager.current_state = ConversationState(current_state)
+        manager.context = ConversationContext(*context)
+        manager.info_collection_progress = progress
+        if state_data.get('previous_state') is not None:
+            state_data['previous_state'] = ConversationState(state_data['previous_state'])
+        manager.state_data = state_data
+        return manager
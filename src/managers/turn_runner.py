@@ -0,0 +1,118 @@
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import threading
+import time
+from src.config.session_config import TURN_DEDUP_WINDOW
+
+# run() 的执行结果
+TURN_COMPLETED = "completed"
+TURN_SUPERSEDED = "superseded"
+TURN_DUPLICATE = "duplicate"
+
+
+class Turn:
+    """一轮正在执行的对话"""
+
+    __slots__ = ("session_id", "text", "started_at", "task", "loop", "superseded")
+
+    def __init__(self, session_id: str, text: str):
+        self.session_id = session_id
+        self.text = text
+        self.started_at = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.superseded = False
+
+    def cancel(self) -> None:
+        """标记为已被取代，并在其所在的事件循环中取消任务"""
+        self.superseded = True
+        if self.task is None or self.loop is None:
+            return
+        try:
+            # 旧的一轮可能运行在另一个线程（另一次 Streamlit 运行）的事件循环中
+            self.loop.call_soon_threadsafe(self.task.cancel)
+        except RuntimeError:
+            # 事件循环已关闭，任务也已结束
+            pass
+
+
+_current_turn: ContextVar[Optional[Turn]] = ContextVar("current_turn", default=None)
+
+
+def current_turn_superseded() -> bool:
+    """当前这一轮是否已被同一会话中更新的一轮取代
+
+    取消只会在下一个 await 点生效，写入配置等副作用之前应检查该标志，
+    避免被取代的一轮把过时的结果写回会话。
+    """
+    turn = _current_turn.get()
+    return turn is not None and turn.superseded
+
+
+class TurnRunner:
+    """按会话跟踪正在执行的对话轮次
+
+    同一会话中开始新的一轮时，取消仍在进行的旧一轮。上一轮仍在执行、开始不到
+    dedup_window 秒时再次提交的相同内容视为重复提交（例如连点发送）直接忽略；
+    上一轮已经结束后的相同内容（例如问卷中连续两题都选 A）照常处理。可以跨线程共享。
+    """
+
+    def __init__(self, dedup_window: float = TURN_DEDUP_WINDOW):
+        self.dedup_window = dedup_window
+        self._lock = threading.Lock()
+        self._active: Dict[str, Turn] = {}
+        self.stats = {'completed': 0, 'superseded': 0, 'duplicates': 0}
+
+    async def run(
+        self,
+        session_id: str,
+        text: str,
+        turn_fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[str, Any]:
+        """执行一轮对话，返回 (TURN_* 状态, turn_fn 的返回值)"""
+        turn = Turn(session_id, text)
+        with self._lock:
+            previous = self._active.get(session_id)
+            if (
+                previous is not None
+                and previous.text == text
+                and turn.started_at - previous.started_at < self.dedup_window
+            ):
+                self.stats['duplicates'] += 1
+                print(f"忽略重复提交的消息 ({session_id})")
+                return TURN_DUPLICATE, None
+            self._active[session_id] = turn
+
+        if previous is not None:
+            print(f"会话 {session_id} 开始新的一轮，取消尚未完成的上一轮")
+            previous.cancel()
+
+        # 任务创建时复制当前上下文，因此先设置 _current_turn
+        token = _current_turn.set(turn)
+        try:
+            turn.loop = asyncio.get_running_loop()
+            turn.task = asyncio.ensure_future(turn_fn())
+        finally:
+            _current_turn.reset(token)
+        if turn.superseded:
+            # 在创建任务之前就已经被更新的一轮取代
+            turn.task.cancel()
+
+        try:
+            result = await turn.task
+            if turn.superseded:
+                # 取消请求到达时这一轮已经执行完毕，结果同样作废
+                self.stats['superseded'] += 1
+                return TURN_SUPERSEDED, None
+            self.stats['completed'] += 1
+            return TURN_COMPLETED, result
+        except asyncio.CancelledError:
+            if not turn.superseded:
+                raise
+            self.stats['superseded'] += 1
+            return TURN_SUPERSEDED, None
+        finally:
+            with self._lock:
+                if self._active.get(session_id) is turn:
+                    del self._active[session_id]
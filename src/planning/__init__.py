@@ -0,0 +1 @@
+"""规划计算模块"""
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""资产类别解析与收益/协方差假设"""
+from typing import Dict, List, Optional, Pattern, Sequence, Tuple
+import re
+import numpy as np
+from src.config.asset_config import ASSET_CLASSES, ASSET_CORRELATIONS, ASSET_ENGLISH_ALIASES, DEFAULT_ASSET_CLASS
+
+
+def _alias_pattern(alias: str) -> Optional[Pattern]:
+    """英文别名按整词匹配（允许复数），避免 "us" 匹配到 "bonus"；中文别名按子串匹配"""
+    if not alias.isascii():
+        return None
+    word = re.escape(" ".join(alias.lower().replace("_", " ").split()))
+    return re.compile(rf'(?<![a-z]){word}(?:s|es)?(?![a-z])')
+
+
+def _normalize(name: str) -> str:
+    return " ".join((name or "").lower().replace("_", " ").replace("-", " ").split())
+
+
+# 别名按长度从长到短匹配，避免 "股票基金" 被 "基金" 先匹配、"us stock" 被 "stock" 先匹配
+_ALIASES = sorted(
+    {
+        (alias.lower(), key)
+        for key, spec in ASSET_CLASSES.items()
+        for alias in spec["aliases"] + [spec["name"], key] + ASSET_ENGLISH_ALIASES.get(key, [])
+    },
+    key=lambda item: (-len(item[0]), item[0])
+)
+_MATCHERS = [(alias, _alias_pattern(alias), key) for alias, key in _ALIASES]
+
+
+def resolve_asset_class(name: str, default: Optional[str] = DEFAULT_ASSET_CLASS) -> Optional[str]:
+    """把用户描述的资产名称映射到资产类别
+
+    无法识别时返回 default（默认按混合型基金处理，并打印提示）；default 为 None 时
+    返回 None，用于找出无法识别的资产。
+    """
+    normalized = _normalize(name)
+    for alias, pattern, key in _MATCHERS:
+        if pattern.search(normalized) if pattern is not None else alias in normalized:
+            return key
+    if default is not None:
+        print(f"❌ 无法识别的资产名称「{name}」，按{ASSET_CLASSES[default]['name']}的假设处理")
+    return default
+
+
+def unresolved_assets(assets: Sequence[str]) -> List[str]:
+    """无法识别、按默认类别处理的资产名称"""
+    return [asset for asset in assets or [] if resolve_asset_class(asset, default=None) is None]
+
+
+def asset_keys() -> List[str]:
+    """所有资产类别，顺序固定"""
+    return list(ASSET_CLASSES)
+
+
+def capital_market_assumptions(keys: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """返回 (年化收益率, 年化波动率, 相关系数矩阵)，顺序与 keys 一致"""
+    keys = list(keys or asset_keys())
+    mu = np.array([ASSET_CLASSES[k]["expected_return"] for k in keys])
+    sigma = np.array([ASSET_CLASSES[k]["volatility"] for k in keys])
+    corr = np.eye(len(keys))
+    for i, a in enumerate(keys):
+        for j, b in enumerate(keys):
+            if i != j:
+                corr[i, j] = ASSET_CORRELATIONS.get((a, b), ASSET_CORRELATIONS.get((b, a), 0.0))
+    return mu, sigma, corr
+
+
+def covariance_matrix(keys: Optional[Sequence[str]] = None) -> np.ndarray:
+    """年化协方差矩阵"""
+    _, sigma, corr = capital_market_assumptions(keys)
+    return corr * np.outer(sigma, sigma)
+
+
+def portfolio_allocation(assets: Sequence[str], weights: Sequence[float]) -> Dict[str, float]:
+    """把用户的资产配置合并为 {资产类别: 权重}，权重归一化为和为 1
+
+    权重既可以是小数（0.6）也可以是百分数（60）。
+    """
+    if not assets or not weights or len(assets) != len(weights):
+        raise ValueError("资产与权重的数量不一致")
+    allocation: Dict[str, float] = {}
+    for asset, weight in zip(assets, weights):
+        key = resolve_asset_class(asset)
+        allocation[key] = allocation.get(key, 0.0) + float(weight)
+    total = sum(allocation.values())
+    if total <= 0:
+        raise ValueError("资产权重之和必须大于 0")
+    return {key: weight / total for key, weight in allocation.items()}
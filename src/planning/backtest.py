@@ -0,0 +1,264 @@
+"""用户当前资产配置的历史回测
+
+数据集为各资产类别的历史月度收益率，保存为 月份 × 资产 的 float32 .npy 矩阵（以内存
+映射方式加载），资产的起始月份不同时，上市前的月份为 NaN。元数据（资产类别、起始月份、
+数据来源）保存在同名 .json 文件中。数据集由 CSV 生成：
+
+    python -m src.planning.backtest build returns.csv --source "数据来源说明"
+
+CSV 第一列为月份（YYYY-MM），其余各列的列名为资产类别（见 asset_config.ASSET_CLASSES），
+值为当月收益率（0.012 表示 1.2%）；指定 --levels 时值为指数点位，自动换算为收益率。
+
+回测按月再平衡到目标权重，用 sliding_window_view 一次性取出所有起始月份的滚动窗口，
+统计各窗口的年化收益率分布、窗口内最大回撤以及最差的 N 年结果。
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+import argparse
+import csv
+import json
+import threading
+import time
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from src.config.asset_config import ASSET_CLASSES, BACKTEST_DATA_DIR
+from src.planning.assets import resolve_asset_class
+
+BACKTEST_DATASET_VERSION = 1
+
+# 数据集覆盖的权重低于该比例时不做回测（未覆盖的资产会被忽略并重新归一化）
+MIN_COVERAGE = 0.8
+
+
+def dataset_paths(directory: Optional[Path] = None):
+    directory = Path(directory or BACKTEST_DATA_DIR)
+    return directory / "monthly_returns.npy", directory / "monthly_returns.json"
+
+
+def _month_index(month: str) -> int:
+    year, mon = month.strip()[:7].split("-")
+    return int(year) * 12 + int(mon) - 1
+
+
+def _month_label(index: int) -> str:
+    return f"{index // 12}-{index % 12 + 1:02d}"
+
+
+def build_dataset(csv_path: Path, directory: Optional[Path] = None, levels: bool = False, source: str = "") -> Dict:
+    """把 CSV 转换为回测数据集，返回元数据"""
+    with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    if len(rows) < 3:
+        raise ValueError("CSV 至少需要表头和两行数据")
+    header, rows = rows[0], sorted(rows[1:], key=lambda row: _month_index(row[0]))
+    keys = [column.strip() for column in header[1:]]
+    unknown = [key for key in keys if key not in ASSET_CLASSES]
+    if unknown:
+        raise ValueError(f"未知的资产类别: {unknown}")
+
+    months = [_month_index(row[0]) for row in rows]
+    if months != list(range(months[0], months[0] + len(months))):
+        raise ValueError("月份不连续或有重复")
+    values = np.array(
+        [[float(cell) if cell.strip() else np.nan for cell in row[1:]] for row in rows],
+        dtype=np.float64
+    )
+    if levels:
+        values = values[1:] / values[:-1] - 1.0
+        months = months[1:]
+    if np.any(values <= -1.0):
+        raise ValueError("月度收益率不能低于 -100%")
+
+    npy_path, meta_path = dataset_paths(directory)
+    npy_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = npy_path.with_name(npy_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, values.astype(np.float32))
+    tmp_path.replace(npy_path)
+    meta = {
+        "version": BACKTEST_DATASET_VERSION,
+        "keys": keys,
+        "start": _month_label(months[0]),
+        "months": len(months),
+        "source": source
+    }
+    meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    return meta
+
+
+class BacktestDataset:
+    """内存映射的历史月度收益率"""
+
+    def __init__(self, directory: Optional[Path] = None):
+        npy_path, meta_path = dataset_paths(directory)
+        self.meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if self.meta.get("version") != BACKTEST_DATASET_VERSION:
+            raise ValueError(f"不支持的数据集版本: {self.meta.get('version')}")
+        self.returns = np.load(npy_path, mmap_mode="r")
+        self.keys: List[str] = list(self.meta["keys"])
+        self.start = _month_index(self.meta["start"])
+        self.source = self.meta.get("source", "")
+
+    def portfolio_returns(self, allocation: Dict[str, float]):
+        """按月再平衡的组合月度收益率
+
+        Returns:
+            (收益率序列, 第一个月的月份序号, 数据集覆盖的权重比例)；覆盖不足时收益率为 None
+        """
+        weights = np.zeros(len(self.keys))
+        for key, weight in allocation.items():
+            if key in self.keys:
+                weights[self.keys.index(key)] += weight
+        coverage = float(weights.sum() / sum(allocation.values()))
+        if coverage < MIN_COVERAGE:
+            return None, self.start, coverage
+        used = weights > 0
+        columns = np.asarray(self.returns[:, used], dtype=np.float64)
+        # 只使用所有相关资产都有数据的月份
+        valid = np.flatnonzero(~np.isnan(columns).any(axis=1))
+        if len(valid) == 0:
+            return None, self.start, coverage
+        first, last = valid[0], valid[-1] + 1
+        series = columns[first:last] @ (weights[used] / weights[used].sum())
+        if np.isnan(series).any():
+            return None, self.start, coverage
+        return series, self.start + int(first), coverage
+
+
+@dataclass(slots=True)
+class BacktestResult:
+    """所有滚动窗口的回测统计"""
+    window_years: int
+    windows: int                 # 滚动窗口个数（起始月份数）
+    first_start: str             # 第一个窗口的起始月份
+    last_start: str              # 最后一个窗口的起始月份
+    cagr_percentiles: Dict[int, float]
+    worst_cagr: float
+    worst_start: str             # 最差窗口的起始月份
+    best_cagr: float
+    median_max_drawdown: float   # 各窗口内最大回撤的中位数
+    worst_max_drawdown: float
+    loss_probability: float      # 窗口期末亏损的比例
+    coverage: float              # 数据集覆盖的权重比例
+    source: str = ""
+
+
+def rolling_backtest(
+    monthly_returns: np.ndarray,
+    window_years: int,
+    start_month: int = 0,
+    percentiles=(5, 25, 50, 75, 95)
+) -> Optional[BacktestResult]:
+    """对所有起始月份同时做滚动窗口回测，数据不足一个窗口时返回 None"""
+    window = int(window_years) * 12
+    if window <= 0 or len(monthly_returns) < window:
+        return None
+    # 对数资产值：log_wealth[t] 为第 t 个月末的累计对数收益，log_wealth[0] = 0
+    log_wealth = np.concatenate([[0.0], np.cumsum(np.log1p(monthly_returns))])
+    # 每个窗口为 window + 1 个点（含起点），视图不复制数据
+    windows = sliding_window_view(log_wealth, window + 1)
+    growth = windows[:, -1] - windows[:, 0]
+    cagr = np.expm1(growth / window_years)
+    drawdown = -np.expm1((windows - np.maximum.accumulate(windows, axis=1)).min(axis=1))
+    worst = int(np.argmin(cagr))
+    return BacktestResult(
+        window_years=int(window_years),
+        windows=len(cagr),
+        first_start=_month_label(start_month),
+        last_start=_month_label(start_month + len(cagr) - 1),
+        cagr_percentiles={int(q): float(v) for q, v in zip(percentiles, np.percentile(cagr, percentiles))},
+        worst_cagr=float(cagr[worst]),
+        worst_start=_month_label(start_month + worst),
+        best_cagr=float(cagr.max()),
+        median_max_drawdown=float(np.median(drawdown)),
+        worst_max_drawdown=float(drawdown.max()),
+        loss_probability=float(np.count_nonzero(growth < 0) / len(growth)),
+        coverage=1.0
+    )
+
+
+def backtest_portfolio(
+    allocation: Dict[str, float],
+    years: float,
+    dataset: Optional["BacktestDataset"] = None
+) -> Optional[BacktestResult]:
+    """回测资产配置在 years 年滚动窗口中的表现，数据集不可用或数据不足时返回 None"""
+    dataset = dataset or get_backtest_dataset()
+    if dataset is None:
+        return None
+    series, start, coverage = dataset.portfolio_returns(allocation)
+    if series is None:
+        return None
+    result = rolling_backtest(series, max(1, int(round(years))), start)
+    if result is not None:
+        result.coverage = coverage
+        result.source = dataset.source
+    return result
+
+
+_lock = threading.Lock()
+_dataset: Optional[BacktestDataset] = None
+_loaded = False
+
+
+def get_backtest_dataset(directory: Optional[Path] = None) -> Optional[BacktestDataset]:
+    """获取数据集：进程内只加载一次，没有数据集时返回 None"""
+    global _dataset, _loaded
+    if _loaded:
+        return _dataset
+    with _lock:
+        if not _loaded:
+            try:
+                _dataset = BacktestDataset(directory)
+                print(f"已加载历史回测数据集: {_dataset.meta['start']} 起 {_dataset.meta['months']} 个月")
+            except FileNotFoundError:
+                print("未找到历史回测数据集，跳过历史回测")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"❌ 读取历史回测数据集失败: {str(e)}")
+            _loaded = True
+        return _dataset
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="历史回测数据集")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="由 CSV 生成数据集")
+    build.add_argument("csv", help="月度收益率（或指数点位）CSV")
+    build.add_argument("-d", "--directory", help="输出目录，默认为 BACKTEST_DATA_DIR")
+    build.add_argument("--levels", action="store_true", help="CSV 中的值为指数点位")
+    build.add_argument("--source", default="", help="数据来源说明，会展示在回测结果中")
+    run = subparsers.add_parser("run", help="回测一个资产配置")
+    run.add_argument("allocation", help="资产配置，例如 '股票:0.6,债券:0.4'")
+    run.add_argument("-y", "--years", type=float, default=10)
+    run.add_argument("-d", "--directory", help="数据集目录，默认为 BACKTEST_DATA_DIR")
+    args = parser.parse_args()
+
+    directory = Path(args.directory) if args.directory else None
+    if args.command == "build":
+        meta = build_dataset(Path(args.csv), directory, args.levels, args.source)
+        print(f"数据集已生成: {', '.join(meta['keys'])}，{meta['start']} 起 {meta['months']} 个月")
+        return
+
+    allocation: Dict[str, float] = {}
+    for item in args.allocation.split(","):
+        name, weight = item.split(":")
+        key = resolve_asset_class(name)
+        allocation[key] = allocation.get(key, 0.0) + float(weight)
+    dataset = BacktestDataset(directory)
+    started = time.perf_counter()
+    result = backtest_portfolio(allocation, args.years, dataset)
+    elapsed = (time.perf_counter() - started) * 1000
+    if result is None:
+        print("数据集未覆盖该配置或数据不足")
+        return
+    print(f"{result.windows} 个 {result.window_years} 年滚动窗口（{result.first_start} 至 {result.last_start} 起始），"
+          f"耗时 {elapsed:.1f} 毫秒")
+    print("年化收益率分位: " + "，".join(f"{q}% {v:.2%}" for q, v in result.cagr_percentiles.items()))
+    print(f"最差 {result.worst_cagr:.2%}（{result.worst_start} 起），最好 {result.best_cagr:.2%}")
+    print(f"窗口内最大回撤：中位数 {result.median_max_drawdown:.1%}，最差 {result.worst_max_drawdown:.1%}")
+    print(f"期末亏损的窗口占比 {result.loss_probability:.1%}")
+
+
+if __name__ == "__main__":
+    main()
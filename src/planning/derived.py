@@ -0,0 +1,176 @@
+"""会话级的派生结果缓存
+
+可行性分析、目标达成概率模拟、历史回测、推荐配置等派生结果都只依赖 ConfigManager 中的少数
+字段。这里用一张小的依赖图描述 字段 -> 派生结果（派生结果之间也可以相互依赖），
+每个结果按其输入的精确取值缓存：输入不变时直接返回缓存，用户修改某个字段后只有
+依赖该字段的结果会重新计算；改回原值时仍然命中缓存。
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from src.planning.assets import portfolio_allocation
+from src.planning.backtest import backtest_portfolio
+from src.planning.feasibility import assess_feasibility
+from src.planning.frontier import get_frontier_table
+from src.planning.monte_carlo import simulate_goal
+from src.planning.probability_grid import success_probability
+
+# 每个派生结果保留的缓存条数
+DERIVED_CACHE_SIZE = 8
+
+CORE_FIELDS = ("core_investment.target_value", "core_investment.years", "core_investment.initial_investment")
+PORTFOLIO_FIELDS = ("portfolio.assets", "portfolio.weights")
+
+# _handle_modification 使用的字段名 -> ConfigManager 字段
+MODIFIABLE_FIELDS = {
+    "target_value": ("core_investment.target_value",),
+    "years": ("core_investment.years",),
+    "initial_investment": ("core_investment.initial_investment",),
+    "portfolio": PORTFOLIO_FIELDS,
+    "risk_profile": ("risk_profile.tolerance",)
+}
+
+
+@dataclass(slots=True)
+class DerivedNode:
+    """依赖图中的一个派生结果"""
+    name: str
+    fields: Tuple[str, ...]                       # 依赖的 ConfigManager 字段
+    compute: Callable[..., Any]                   # 参数依次为 fields 的取值与 nodes 的结果
+    nodes: Tuple[str, ...] = ()                   # 依赖的其他派生结果
+    cache: "OrderedDict[Tuple, Any]" = field(default_factory=OrderedDict)
+
+
+def _allocation(assets, weights):
+    try:
+        return portfolio_allocation(list(assets or []), list(weights or []))
+    except ValueError:
+        return None
+
+
+def _feasibility(target_value, years, initial_investment):
+    if target_value is None or years is None or initial_investment is None or years <= 0:
+        return None
+    return assess_feasibility(initial_investment, target_value, years)
+
+
+def _projection(target_value, years, initial_investment, allocation):
+    if allocation is None or target_value is None or not years or not initial_investment:
+        return None
+    return simulate_goal(initial_investment, target_value, years, allocation)
+
+
+def _backtest(years, allocation):
+    if allocation is None or not years:
+        return None
+    return backtest_portfolio(allocation, years)
+
+
+def _recommendation(tolerance, years):
+    if not tolerance or not years:
+        return None
+    return get_frontier_table().lookup(tolerance, years)
+
+
+def _recommendation_probability(tolerance, target_value, years, initial_investment):
+    if not tolerance or target_value is None or not years or not initial_investment:
+        return None
+    return success_probability(tolerance, initial_investment, target_value, years)
+
+
+def default_nodes() -> List[DerivedNode]:
+    """规划相关的派生结果"""
+    return [
+        DerivedNode("allocation", PORTFOLIO_FIELDS, _allocation),
+        DerivedNode("feasibility", CORE_FIELDS, _feasibility),
+        DerivedNode("projection", CORE_FIELDS, _projection, nodes=("allocation",)),
+        DerivedNode("backtest", ("core_investment.years",), _backtest, nodes=("allocation",)),
+        DerivedNode("recommendation", ("risk_profile.tolerance", "core_investment.years"), _recommendation),
+        DerivedNode(
+            "recommendation_probability",
+            ("risk_profile.tolerance",) + CORE_FIELDS,
+            _recommendation_probability
+        )
+    ]
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class DerivedResults:
+    """按精确输入缓存的派生结果"""
+
+    def __init__(self, config_manager, nodes: Optional[Sequence[DerivedNode]] = None,
+                 cache_size: int = DERIVED_CACHE_SIZE):
+        self.config_manager = config_manager
+        self.nodes: Dict[str, DerivedNode] = {node.name: node for node in (nodes or default_nodes())}
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def _field_value(self, path: str):
+        section, name = path.split(".")
+        return _freeze(getattr(getattr(self.config_manager, section), name))
+
+    def _key(self, node: DerivedNode) -> Tuple:
+        return (
+            tuple(self._field_value(path) for path in node.fields)
+            + tuple(self._key(self.nodes[name]) for name in node.nodes)
+        )
+
+    def get(self, name: str) -> Any:
+        """取派生结果，输入未变化时直接返回缓存"""
+        node = self.nodes[name]
+        key = self._key(node)
+        if key in node.cache:
+            node.cache.move_to_end(key)
+            self.hits += 1
+            return node.cache[key]
+        self.misses += 1
+        args = [self._field_value(path) for path in node.fields]
+        args += [self.get(upstream) for upstream in node.nodes]
+        value = node.compute(*args)
+        node.cache[key] = value
+        if len(node.cache) > self.cache_size:
+            node.cache.popitem(last=False)
+        return value
+
+    def peek(self, name: str) -> Tuple[bool, Any]:
+        """不计算，只查询当前输入下是否已有缓存，返回 (是否命中, 结果)"""
+        node = self.nodes[name]
+        key = self._key(node)
+        if key in node.cache:
+            return True, node.cache[key]
+        return False, None
+
+    def affected(self, fields: Sequence[str]) -> List[str]:
+        """依赖这些字段（直接或经由其他派生结果）的派生结果，按依赖图中的顺序"""
+        changed = set(fields)
+        result = []
+        for node in self._ordered():
+            if changed.intersection(node.fields) or any(name in result for name in node.nodes):
+                result.append(node.name)
+        return result
+
+    def affected_by_modification(self, field_name: str) -> List[str]:
+        """_handle_modification 修改某个字段后需要重新计算的派生结果"""
+        return self.affected(MODIFIABLE_FIELDS.get(field_name, ()))
+
+    def _ordered(self) -> List[DerivedNode]:
+        """按依赖关系排序（上游在前）"""
+        ordered, seen = [], set()
+
+        def visit(node: DerivedNode):
+            if node.name in seen:
+                return
+            seen.add(node.name)
+            for name in node.nodes:
+                visit(self.nodes[name])
+            ordered.append(node)
+
+        for node in self.nodes.values():
+            visit(node)
+        return ordered
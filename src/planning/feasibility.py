@@ -0,0 +1,152 @@
+"""投资目标可行性的解析计算
+
+只依赖核心投资信息（目标金额、年限、初始资金），用确定性公式给出：
+    - 实现目标所需的年化收益率（CAGR）
+    - 在假设收益率下每月需要追加的投入
+    - 在假设收益率下达到目标所需的年数
+所有函数都接受标量或 NumPy 数组（按广播规则计算），可以一次评估一组假设情景。
+"""
+from dataclasses import dataclass
+from typing import Optional
+import re
+import numpy as np
+from src.config.asset_config import PLANNING_DEFAULT_RETURN
+
+# 所需年化收益率的分档：(上限, 评价)
+FEASIBILITY_LEVELS = [
+    (0.03, "比较容易实现"),
+    (0.06, "较为现实"),
+    (0.10, "有一定挑战"),
+    (float("inf"), "难度很大")
+]
+
+_UNITS = {"亿": 1e8, "千万": 1e7, "百万": 1e6, "万": 1e4, "千": 1e3, "元": 1.0, "": 1.0}
+_AMOUNT = r'(\d+(?:\.\d+)?)\s*(亿|千万|百万|万|千|元)?'
+_FEASIBILITY_QUESTION = re.compile(
+    r'(?P<years>\d+(?:\.\d+)?)\s*年.*?从\s*' + _AMOUNT + r'.*?(?:到|变成|达到|涨到)\s*' + _AMOUNT
+)
+_FEASIBILITY_ASK = re.compile(r'(现实|可能|可行|能不能|能否|可不可以|做得到|能实现|靠谱)')
+
+
+def required_cagr(initial_investment, target_value, years):
+    """实现目标所需的年化收益率，初始资金为 0 时为 inf"""
+    initial = np.asarray(initial_investment, dtype=np.float64)
+    target = np.asarray(target_value, dtype=np.float64)
+    years = np.asarray(years, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(initial > 0, (target / initial) ** (1.0 / years) - 1.0, np.inf)
+
+
+def _monthly_rate(annual_return):
+    return (1.0 + np.asarray(annual_return, dtype=np.float64)) ** (1.0 / 12.0) - 1.0
+
+
+def required_monthly_contribution(initial_investment, target_value, years, annual_return=PLANNING_DEFAULT_RETURN):
+    """在假设收益率下，每月末需要追加多少投入才能实现目标（不需要追加时为 0）"""
+    rate = _monthly_rate(annual_return)
+    months = np.asarray(years, dtype=np.float64) * 12.0
+    growth = (1.0 + rate) ** months
+    shortfall = np.asarray(target_value, dtype=np.float64) - np.asarray(initial_investment, dtype=np.float64) * growth
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = np.where(rate != 0, (growth - 1.0) / rate, months)
+        return np.maximum(shortfall / annuity, 0.0)
+
+
+def years_to_target(initial_investment, target_value, annual_return=PLANNING_DEFAULT_RETURN, monthly_contribution=0.0):
+    """在假设收益率和每月追加投入下，达到目标需要的年数（无法达到时为 inf）
+
+    收益率不为正时资金不会增长，目标高于初始资金即视为无法达到。
+    """
+    rate = _monthly_rate(annual_return)
+    initial = np.asarray(initial_investment, dtype=np.float64)
+    target = np.asarray(target_value, dtype=np.float64)
+    contribution = np.asarray(monthly_contribution, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # (1+r)^n = (T + C/r) / (P + C/r)
+        offset = np.where(rate != 0, contribution / rate, 0.0)
+        ratio = (target + offset) / (initial + offset)
+        months = np.where(rate > 0, np.log(ratio) / np.log1p(rate), np.inf)
+        months = np.where(target <= initial, 0.0, months)
+        months = np.where(np.isfinite(months) & (months >= 0), months, np.inf)
+    return months / 12.0
+
+
+def feasibility_level(cagr: float) -> str:
+    """根据所需年化收益率给出评价"""
+    for upper, label in FEASIBILITY_LEVELS:
+        if cagr <= upper:
+            return label
+    return FEASIBILITY_LEVELS[-1][1]
+
+
+@dataclass(slots=True)
+class FeasibilityResult:
+    """单个目标的可行性计算结果"""
+    initial_investment: float
+    target_value: float
+    years: float
+    assumed_return: float
+    required_cagr: float
+    monthly_contribution: float  # 按假设收益率每月需要追加的投入
+    years_needed: float          # 按假设收益率、不追加投入时达到目标的年数
+    level: str
+
+
+def assess_feasibility(
+    initial_investment: float,
+    target_value: float,
+    years: float,
+    assumed_return: float = PLANNING_DEFAULT_RETURN
+) -> FeasibilityResult:
+    """计算单个目标的可行性"""
+    cagr = float(required_cagr(initial_investment, target_value, years))
+    return FeasibilityResult(
+        initial_investment=initial_investment,
+        target_value=target_value,
+        years=years,
+        assumed_return=assumed_return,
+        required_cagr=cagr,
+        monthly_contribution=float(required_monthly_contribution(initial_investment, target_value, years, assumed_return)),
+        years_needed=float(years_to_target(initial_investment, target_value, assumed_return)),
+        level=feasibility_level(cagr)
+    )
+
+
+def assess_core_investment(core, assumed_return: float = PLANNING_DEFAULT_RETURN) -> Optional[FeasibilityResult]:
+    """对 CoreInvestment 计算可行性，核心信息不完整时返回 None"""
+    if core.target_value is None or core.years is None or core.initial_investment is None or core.years <= 0:
+        return None
+    return assess_feasibility(core.initial_investment, core.target_value, core.years, assumed_return)
+
+
+def scenario_grid(initial_investment, target_value, years_grid, return_grid):
+    """评估 年限 × 假设收益率 的情景网格
+
+    Returns:
+        (所需年化收益率[年限], 每月需追加投入[年限, 收益率])
+    """
+    years = np.asarray(years_grid, dtype=np.float64)
+    returns = np.asarray(return_grid, dtype=np.float64)
+    return (
+        required_cagr(initial_investment, target_value, years),
+        required_monthly_contribution(initial_investment, target_value, years[:, None], returns[None, :])
+    )
+
+
+def _parse_amount(number: str, unit: Optional[str]) -> float:
+    return float(number) * _UNITS[unit or ""]
+
+
+def parse_feasibility_question(text: str) -> Optional[FeasibilityResult]:
+    """识别 "5年从100万到500万现实吗" 这类问题并直接计算，不是此类问题时返回 None"""
+    if not _FEASIBILITY_ASK.search(text):
+        return None
+    match = _FEASIBILITY_QUESTION.search(text)
+    if not match:
+        return None
+    years = float(match.group("years"))
+    initial = _parse_amount(match.group(2), match.group(3))
+    target = _parse_amount(match.group(4), match.group(5))
+    if years <= 0 or initial <= 0 or target <= 0:
+        return None
+    return assess_feasibility(initial, target, years)
@@ -0,0 +1,246 @@
+"""有效前沿与各风险类型的推荐配置表
+
+离线计算：
+    - 均值-方差有效前沿（只做多，权重和为 1），对一组风险厌恶系数批量求解
+    - 风险平价组合，并与现金混合得到不同风险水平的组合
+然后按 风险承受能力类型 × 投资年限 选出波动率不超过上限、预期收益最高的组合，
+保存为 .npz 表。运行时只需查表并在相邻年限之间线性插值；表中记录了资本市场
+假设的指纹，假设变化后自动重建。
+
+命令行重建：
+    python -m src.planning.frontier
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+import argparse
+import hashlib
+import threading
+import numpy as np
+from src.config.asset_config import PLANNING_TABLE_DIR, assumptions_fingerprint
+from src.planning.assets import asset_keys, capital_market_assumptions, covariance_matrix
+from src.managers.risk_questionnaire import RISK_TOLERANCE_LABELS
+
+FRONTIER_TABLE_VERSION = 1
+
+# 各风险类型允许的组合年化波动率上限（投资年限足够长时）
+TOLERANCE_VOLATILITY = {
+    "保守型": 0.04,
+    "稳健型": 0.08,
+    "进取型": 0.13,
+    "激进型": 0.19
+}
+
+# 表中的投资年限（年），查询时在相邻年限之间插值
+HORIZONS = [1, 3, 5, 7, 10, 15, 20, 30]
+
+METHODS = ["mean_variance", "risk_parity"]
+
+_FRONTIER_POINTS = 200
+_OPTIMIZER_ITERATIONS = 3000
+
+
+def horizon_factor(years):
+    """投资年限较短时收紧波动率上限：1 年为 46%，10 年及以上为 100%"""
+    return np.clip(0.4 + 0.06 * np.asarray(years, dtype=np.float64), 0.0, 1.0)
+
+
+def _project_to_simplex(v: np.ndarray) -> np.ndarray:
+    """把每一行投影到 {w >= 0, sum(w) = 1}"""
+    n = v.shape[-1]
+    u = -np.sort(-v, axis=-1)
+    css = np.cumsum(u, axis=-1) - 1.0
+    index = np.arange(1, n + 1)
+    cond = u - css / index > 0
+    rho = n - 1 - np.argmax(cond[..., ::-1], axis=-1)
+    theta = np.take_along_axis(css, rho[..., None], axis=-1) / (rho[..., None] + 1)
+    return np.maximum(v - theta, 0.0)
+
+
+def mean_variance_frontier(mu: np.ndarray, cov: np.ndarray, points: int = _FRONTIER_POINTS) -> np.ndarray:
+    """只做多的均值-方差有效前沿
+
+    对一组风险厌恶系数 λ 同时求解 max μ'w - λ/2 · w'Σw（投影梯度法），返回
+    points × 资产数 的权重矩阵，按波动率从低到高排列。
+    """
+    risk_aversion = np.geomspace(0.05, 500.0, points)[:, None]
+    step = 1.0 / (risk_aversion * np.linalg.eigvalsh(cov).max())
+    weights = np.full((points, len(mu)), 1.0 / len(mu))
+    for _ in range(_OPTIMIZER_ITERATIONS):
+        gradient = mu - risk_aversion * (weights @ cov)
+        weights = _project_to_simplex(weights + step * gradient)
+    return weights[::-1]
+
+
+def risk_parity_weights(cov: np.ndarray, iterations: int = 500) -> np.ndarray:
+    """各资产风险贡献相等的组合"""
+    weights = 1.0 / np.sqrt(np.diag(cov))
+    weights /= weights.sum()
+    for _ in range(iterations):
+        contribution = weights * (cov @ weights)
+        weights = weights * np.sqrt(contribution.mean() / contribution)
+        weights /= weights.sum()
+    return weights
+
+
+def _risk_parity_mixes(cov: np.ndarray, keys: Sequence[str], points: int = _FRONTIER_POINTS) -> np.ndarray:
+    """风险平价组合（不含现金）与现金按不同比例混合，按波动率从低到高排列"""
+    cash = np.array([1.0 if key == "cash" else 0.0 for key in keys])
+    risky = cash == 0
+    parity = np.zeros(len(keys))
+    parity[risky] = risk_parity_weights(cov[np.ix_(risky, risky)])
+    share = np.linspace(0.0, 1.0, points)[:, None]
+    return share * parity + (1.0 - share) * cash
+
+
+def _pick(candidates: np.ndarray, mu: np.ndarray, cov: np.ndarray, volatility_cap: float) -> np.ndarray:
+    """在波动率不超过上限的候选组合中选预期收益最高的，都超过时选波动率最低的"""
+    volatility = np.sqrt(np.einsum("ij,jk,ik->i", candidates, cov, candidates))
+    returns = candidates @ mu
+    allowed = volatility <= volatility_cap
+    if not allowed.any():
+        return candidates[np.argmin(volatility)]
+    return candidates[np.flatnonzero(allowed)[np.argmax(returns[allowed])]]
+
+
+def build_frontier_table(path: Optional[Path] = None) -> "FrontierTable":
+    """计算并保存推荐配置表"""
+    keys = asset_keys()
+    mu, _, _ = capital_market_assumptions(keys)
+    cov = covariance_matrix(keys)
+    candidates = {
+        "mean_variance": mean_variance_frontier(mu, cov),
+        "risk_parity": _risk_parity_mixes(cov, keys)
+    }
+    weights = np.zeros((len(METHODS), len(RISK_TOLERANCE_LABELS), len(HORIZONS), len(keys)))
+    for m, method in enumerate(METHODS):
+        for t, tolerance in enumerate(RISK_TOLERANCE_LABELS):
+            for h, horizon in enumerate(HORIZONS):
+                cap = TOLERANCE_VOLATILITY[tolerance] * float(horizon_factor(horizon))
+                weights[m, t, h] = _pick(candidates[method], mu, cov, cap)
+
+    table = FrontierTable(
+        keys=keys,
+        horizons=np.array(HORIZONS, dtype=np.float64),
+        weights=weights,
+        expected_return=weights @ mu,
+        volatility=np.sqrt(np.einsum("...i,ij,...j->...", weights, cov, weights)),
+        fingerprint=assumptions_fingerprint()
+    )
+    table.save(path or default_table_path())
+    return table
+
+
+def default_table_path() -> Path:
+    return Path(PLANNING_TABLE_DIR) / "frontier.npz"
+
+
+@dataclass(slots=True)
+class FrontierTable:
+    """推荐配置表：权重的维度为 方法 × 风险类型 × 年限 × 资产"""
+    keys: List[str]
+    horizons: np.ndarray
+    weights: np.ndarray
+    expected_return: np.ndarray
+    volatility: np.ndarray
+    fingerprint: str
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                version=FRONTIER_TABLE_VERSION,
+                keys=np.array(self.keys),
+                horizons=self.horizons,
+                weights=self.weights,
+                expected_return=self.expected_return,
+                volatility=self.volatility,
+                fingerprint=self.fingerprint
+            )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "FrontierTable":
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != FRONTIER_TABLE_VERSION:
+                raise ValueError(f"不支持的配置表版本: {int(data['version'])}")
+            return cls(
+                keys=[str(k) for k in data["keys"]],
+                horizons=data["horizons"],
+                weights=data["weights"],
+                expected_return=data["expected_return"],
+                volatility=data["volatility"],
+                fingerprint=str(data["fingerprint"])
+            )
+
+    def content_digest(self) -> str:
+        """表内容的摘要：重新生成配置表后（即使资本市场假设不变）依赖它的预计算结果需要重建"""
+        digest = hashlib.sha256()
+        digest.update("|".join(self.keys).encode("utf-8"))
+        digest.update(np.ascontiguousarray(self.horizons, dtype=np.float64).tobytes())
+        digest.update(np.ascontiguousarray(self.weights, dtype=np.float64).tobytes())
+        return digest.hexdigest()[:16]
+
+    def lookup(self, tolerance: str, years: float, method: str = "mean_variance") -> Dict[str, float]:
+        """查询推荐配置，年限在表中相邻两档之间线性插值"""
+        if tolerance not in RISK_TOLERANCE_LABELS:
+            raise ValueError(f"未知的风险承受能力类型: {tolerance}")
+        grid = self.weights[METHODS.index(method), RISK_TOLERANCE_LABELS.index(tolerance)]
+        years = float(np.clip(years, self.horizons[0], self.horizons[-1]))
+        upper = min(int(np.searchsorted(self.horizons, years)), len(self.horizons) - 1)
+        lower = max(upper - 1, 0)
+        span = self.horizons[upper] - self.horizons[lower]
+        ratio = (years - self.horizons[lower]) / span if span else 0.0
+        weights = grid[lower] * (1 - ratio) + grid[upper] * ratio
+        # 忽略不足 0.5% 的零头，其余重新归一化
+        weights = np.where(weights >= 0.005, weights, 0.0)
+        weights /= weights.sum()
+        return {key: float(w) for key, w in zip(self.keys, weights) if w > 0}
+
+
+_lock = threading.Lock()
+_table: Optional[FrontierTable] = None
+
+
+def get_frontier_table(path: Optional[Path] = None) -> FrontierTable:
+    """获取推荐配置表：进程内只加载一次，文件不存在或资本市场假设变化时重建"""
+    global _table
+    if _table is not None:
+        return _table
+    with _lock:
+        if _table is not None:
+            return _table
+        fingerprint = assumptions_fingerprint()
+        path = Path(path or default_table_path())
+        table = None
+        if path.exists():
+            try:
+                table = FrontierTable.load(path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"❌ 读取推荐配置表失败，重新计算: {str(e)}")
+        if table is None or table.fingerprint != fingerprint or table.keys != asset_keys():
+            print("资本市场假设已变化或配置表不存在，重新计算有效前沿...")
+            table = build_frontier_table(path)
+        _table = table
+        return table
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="重建各风险类型的推荐配置表")
+    parser.add_argument("-o", "--output", help="输出文件，默认为 PLANNING_TABLE_DIR/frontier.npz")
+    args = parser.parse_args()
+    table = build_frontier_table(Path(args.output) if args.output else None)
+    for t, tolerance in enumerate(RISK_TOLERANCE_LABELS):
+        print(f"\n{tolerance}:")
+        for h, horizon in enumerate(table.horizons):
+            weights = table.weights[0, t, h]
+            allocation = "，".join(f"{k} {w:.0%}" for k, w in zip(table.keys, weights) if w >= 0.005)
+            print(f"  {horizon:>4.0f} 年  收益 {table.expected_return[0, t, h]:.2%}  "
+                  f"波动 {table.volatility[0, t, h]:.2%}  {allocation}")
+
+
+if __name__ == "__main__":
+    main()
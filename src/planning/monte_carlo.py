@@ -0,0 +1,192 @@
+"""目标达成概率的蒙特卡洛模拟
+
+按资产类别模拟相关的年度对数收益率（每年末按目标权重再平衡），得到每条路径
+每年末的资产值，统计期末达到目标金额的比例以及各年的百分位区间。路径按块生成并
+按块统计（达成数精确计数，百分位用每年的对数直方图估计），内存占用为
+chunk_size × 年数 × 资产数，与总路径数无关；使用对偶变量减少随机数生成量与估计
+方差。随机数发生器使用固定种子，相同输入得到相同结果。
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence
+import math
+import numpy as np
+from src.config.asset_config import (
+    PLANNING_SIMULATION_PATHS,
+    PLANNING_SIMULATION_CHUNK,
+    PLANNING_RANDOM_SEED
+)
+from src.planning.assets import capital_market_assumptions
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+_HISTOGRAM_BINS = 4096
+
+
+@dataclass(slots=True)
+class SimulationResult:
+    """模拟结果"""
+    success_probability: float  # 期末资产不低于目标金额的概率
+    years: int
+    paths: int
+    percentiles: Dict[int, List[float]] = field(default_factory=dict)  # 百分位 -> 第 0..years 年末的资产值
+    expected_return: float = 0.0  # 组合的年化预期收益率（算术）
+    volatility: float = 0.0       # 组合的年化波动率
+
+    def final_percentile(self, q: int) -> float:
+        """期末资产的百分位值"""
+        return self.percentiles[q][-1]
+
+
+def _lognormal_params(mu: np.ndarray, sigma: np.ndarray):
+    """把算术收益率/波动率换算为对数收益率的均值与标准差"""
+    log_var = np.log1p((sigma / (1 + mu)) ** 2)
+    return np.log1p(mu) - 0.5 * log_var, np.sqrt(log_var)
+
+
+def iter_wealth_chunks(
+    initial_investment: float,
+    years: int,
+    allocation: Dict[str, float],
+    annual_contribution: float = 0.0,
+    paths: int = PLANNING_SIMULATION_PATHS,
+    chunk_size: int = PLANNING_SIMULATION_CHUNK,
+    seed: Optional[int] = PLANNING_RANDOM_SEED
+) -> Iterator[np.ndarray]:
+    """按块模拟路径，每块返回 years × n 的 float32 矩阵（第 1..years 年末的资产值）"""
+    n_years = max(1, int(years))
+    keys = [key for key, weight in allocation.items() if weight > 0]
+    if not keys:
+        raise ValueError("资产配置为空")
+    weights = np.array([allocation[key] for key in keys])
+    weights = weights / weights.sum()
+
+    mu, sigma, corr = capital_market_assumptions(keys)
+    log_mu, log_sigma = _lognormal_params(mu, sigma)
+    chol = np.linalg.cholesky(corr * np.outer(log_sigma, log_sigma))
+
+    rng = np.random.default_rng(seed)
+    # 随机数、收益率与资产值都用 float32：统计概率与百分位的精度足够，速度与内存约为 float64 的一半
+    chol_t = chol.T.astype(np.float32)
+    log_mu = log_mu.astype(np.float32)
+    weights32 = weights.astype(np.float32)
+
+    for start in range(0, paths, chunk_size):
+        n = min(chunk_size, paths - start)
+        # 对偶变量：每组随机数同时生成 z 与 -z 两条路径，随机数生成量减半且方差更小
+        half = (n + 1) // 2
+        shocks = rng.standard_normal((half, n_years, len(keys)), dtype=np.float32)
+        log_returns = shocks @ chol_t
+        log_returns = np.concatenate([log_mu + log_returns, log_mu - log_returns])[:n]
+        # 年末再平衡：组合的年度总收益为各资产总收益的加权和
+        gross = np.exp(log_returns) @ weights32
+        if annual_contribution:
+            chunk = np.empty((n_years, n), dtype=np.float32)
+            wealth = np.full(n, initial_investment, dtype=np.float32)
+            for year in range(n_years):
+                wealth = wealth * gross[:, year] + annual_contribution
+                chunk[year] = wealth
+        else:
+            # 按 年 × 路径 存放，统计时按行连续读取
+            chunk = np.ascontiguousarray(np.cumprod(gross, axis=1).T) * np.float32(initial_investment)
+        yield chunk
+
+
+class _LogHistogram:
+    """每年一组对数资产值的直方图，按块累加后估计百分位，内存与路径数无关
+
+    各年的取值范围按组合收益的对数正态近似取 ±8 个标准差，范围外的值计入两端的桶。
+    桶内按均匀分布插值，百分位的相对误差约为桶宽的几分之一（默认 4096 个桶时小于 0.1%）。
+    """
+
+    def __init__(self, initial_investment: float, n_years: int, allocation: Dict[str, float],
+                 annual_contribution: float, bins: int = _HISTOGRAM_BINS):
+        expected_return, volatility = portfolio_moments(allocation)
+        log_mean, log_std = _lognormal_params(np.array([expected_return]), np.array([volatility]))
+        t = np.arange(1, n_years + 1, dtype=np.float64)
+        spread = 8.0 * float(log_std[0]) * np.sqrt(t) + 1e-6
+        base = max(initial_investment, annual_contribution, 1e-9)
+        # 追加投入只会让资产增加：下界按不追加计算，上界把累计投入计入本金
+        self.lower = np.log(base) + float(log_mean[0]) * t - spread
+        upper = np.log(base + annual_contribution * t) + float(log_mean[0]) * t + spread
+        self.width = (upper - self.lower) / bins
+        self.bins = bins
+        self.counts = np.zeros((n_years, bins), dtype=np.int64)
+        self._offsets = (np.arange(n_years) * bins)[:, None]
+
+    def add(self, chunk: np.ndarray) -> None:
+        with np.errstate(divide="ignore"):
+            log_wealth = np.log(np.maximum(chunk, np.float32(1e-30)))
+        index = ((log_wealth - self.lower[:, None]) / self.width[:, None]).astype(np.int64)
+        np.clip(index, 0, self.bins - 1, out=index)
+        self.counts += np.bincount(
+            (index + self._offsets).ravel(), minlength=self.counts.size
+        ).reshape(self.counts.shape)
+
+    def percentiles(self, qs: Sequence[int]) -> np.ndarray:
+        """返回 len(qs) × n_years 的百分位值"""
+        cumulative = np.cumsum(self.counts, axis=1)
+        total = cumulative[:, -1]
+        result = np.empty((len(qs), len(total)))
+        for i, q in enumerate(qs):
+            rank = q / 100 * total
+            for year in range(len(total)):
+                b = min(int(np.searchsorted(cumulative[year], rank[year], side="left")), self.bins - 1)
+                before = cumulative[year, b - 1] if b else 0
+                inside = self.counts[year, b]
+                fraction = (rank[year] - before) / inside if inside else 0.5
+                result[i, year] = np.exp(self.lower[year] + (b + fraction) * self.width[year])
+        return result
+
+
+def portfolio_moments(allocation: Dict[str, float]):
+    """组合的年化预期收益率与波动率"""
+    keys = [key for key, weight in allocation.items() if weight > 0]
+    weights = np.array([allocation[key] for key in keys])
+    weights = weights / weights.sum()
+    mu, sigma, corr = capital_market_assumptions(keys)
+    cov = corr * np.outer(sigma, sigma)
+    return float(weights @ mu), float(math.sqrt(weights @ cov @ weights))
+
+
+def simulate_goal(
+    initial_investment: float,
+    target_value: float,
+    years: float,
+    allocation: Dict[str, float],
+    annual_contribution: float = 0.0,
+    paths: int = PLANNING_SIMULATION_PATHS,
+    chunk_size: int = PLANNING_SIMULATION_CHUNK,
+    seed: Optional[int] = PLANNING_RANDOM_SEED,
+    percentiles: Sequence[int] = DEFAULT_PERCENTILES
+) -> SimulationResult:
+    """模拟投资组合在 years 年内达到 target_value 的概率
+
+    Args:
+        initial_investment: 初始资金
+        target_value: 目标金额
+        years: 投资年限，按四舍五入取整年模拟
+        allocation: {资产类别: 权重}，权重之和为 1（见 portfolio_allocation）
+        annual_contribution: 每年末追加的投入
+        paths: 模拟路径数
+        chunk_size: 每块模拟的路径数
+        seed: 随机种子，None 表示不固定
+        percentiles: 需要统计的百分位
+    """
+    n_years = max(1, int(round(years)))
+    # 按块统计达成数与各年的直方图，不保留完整的 年 × 路径 矩阵
+    successes = 0
+    histogram = _LogHistogram(initial_investment, n_years, allocation, annual_contribution)
+    for chunk in iter_wealth_chunks(
+        initial_investment, n_years, allocation, annual_contribution, paths, chunk_size, seed
+    ):
+        successes += int(np.count_nonzero(chunk[-1] >= target_value))
+        histogram.add(chunk)
+    bands = histogram.percentiles(percentiles)
+    expected_return, volatility = portfolio_moments(allocation)
+    return SimulationResult(
+        success_probability=float(successes / paths),
+        years=n_years,
+        paths=paths,
+        percentiles={int(q): [float(initial_investment)] + band.tolist() for q, band in zip(percentiles, bands)},
+        expected_return=expected_return,
+        volatility=volatility
+    )
@@ -0,0 +1,258 @@
+"""目标达成概率的预计算网格
+
+维度为 风险类型 × 投资年限 × 目标倍数（target_value / initial_investment），
+每个风险类型使用推荐配置表（见 frontier）中对应年限的配置。网格离线用蒙特卡洛
+模拟生成：同一次模拟的期末资产分布可以一次性给出所有目标倍数的达成概率。
+
+网格保存为 .npy 文件并以内存映射方式加载，查询在年限与对数目标倍数两个方向上
+做双线性插值，耗时为微秒级；超出网格范围的查询退回到实时模拟。元数据（坐标轴、
+资本市场假设指纹、推荐配置表的内容摘要、与完整模拟对比的误差）保存在同名 .json
+文件中。
+
+生成网格需要数秒，只在离线时进行，对话中不会生成。网格文件不存在，或者与当前的
+资本市场假设、推荐配置表不一致时，查询退回到实时模拟，重新生成后自动加载新文件。
+
+命令行重建并评估误差：
+    python -m src.planning.probability_grid
+"""
+from pathlib import Path
+from typing import Dict, Optional
+import argparse
+import json
+import re
+import threading
+import time
+import numpy as np
+from src.config.asset_config import PLANNING_TABLE_DIR, PLANNING_RANDOM_SEED, assumptions_fingerprint
+from src.managers.risk_questionnaire import RISK_TOLERANCE_LABELS
+from src.planning.frontier import get_frontier_table
+from src.planning.monte_carlo import simulate_goal, iter_wealth_chunks
+
+PROBABILITY_GRID_VERSION = 2
+
+GRID_YEARS = np.arange(1, 41, dtype=np.float64)                 # 1-40 年
+GRID_LOG_RATIOS = np.linspace(np.log(0.5), np.log(20.0), 97)     # 目标倍数 0.5-20，按对数均匀分布
+GRID_PATHS = 40000                                               # 每个 (风险类型, 年限) 的模拟路径数
+
+_WHAT_IF_YEARS = re.compile(r'(?:如果|假如|要是|改成|换成|延长到|缩短到|改为)\D*?(\d+(?:\.\d+)?)\s*年')
+
+
+def grid_paths(directory: Optional[Path] = None):
+    directory = Path(directory or PLANNING_TABLE_DIR)
+    return directory / "success_grid.npy", directory / "success_grid.json"
+
+
+def build_probability_grid(directory: Optional[Path] = None, paths: int = GRID_PATHS) -> Dict:
+    """用蒙特卡洛模拟生成网格并保存，返回元数据"""
+    table = get_frontier_table()
+    ratios = np.exp(GRID_LOG_RATIOS).astype(np.float32)
+    grid = np.empty((len(RISK_TOLERANCE_LABELS), len(GRID_YEARS), len(ratios)), dtype=np.float32)
+    started = time.perf_counter()
+    for t, tolerance in enumerate(RISK_TOLERANCE_LABELS):
+        for y, years in enumerate(GRID_YEARS):
+            allocation = table.lookup(tolerance, years)
+            # 按块统计期末倍数不低于 ratio 的路径数
+            reached = np.zeros(len(ratios), dtype=np.int64)
+            for chunk in iter_wealth_chunks(
+                1.0, int(years), allocation, paths=paths, seed=PLANNING_RANDOM_SEED + t * 1000 + y
+            ):
+                final = np.sort(chunk[-1])
+                reached += len(final) - np.searchsorted(final, ratios, side="left")
+            grid[t, y] = reached / paths
+
+    npy_path, meta_path = grid_paths(directory)
+    npy_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = npy_path.with_name(npy_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, grid)
+    tmp_path.replace(npy_path)
+    meta = {
+        "version": PROBABILITY_GRID_VERSION,
+        "tolerances": RISK_TOLERANCE_LABELS,
+        "years": GRID_YEARS.tolist(),
+        "log_ratios": GRID_LOG_RATIOS.tolist(),
+        "paths": paths,
+        "fingerprint": assumptions_fingerprint(),
+        "frontier_fingerprint": table.content_digest(),
+        "build_seconds": round(time.perf_counter() - started, 2)
+    }
+    meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    return meta
+
+
+class ProbabilityGrid:
+    """内存映射的达成概率网格"""
+
+    def __init__(self, directory: Optional[Path] = None):
+        npy_path, meta_path = grid_paths(directory)
+        self.meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if self.meta.get("version") != PROBABILITY_GRID_VERSION:
+            raise ValueError(f"不支持的网格版本: {self.meta.get('version')}")
+        self.grid = np.load(npy_path, mmap_mode="r")
+        self.tolerances = list(self.meta["tolerances"])
+        self.years = np.asarray(self.meta["years"])
+        self.log_ratios = np.asarray(self.meta["log_ratios"])
+        self.fingerprint = self.meta["fingerprint"]
+        self.frontier_fingerprint = self.meta["frontier_fingerprint"]
+
+    def stale_reason(self, table) -> Optional[str]:
+        """与当前的资本市场假设或推荐配置表不一致时返回原因"""
+        if self.fingerprint != assumptions_fingerprint():
+            return "资本市场假设已变化"
+        if self.frontier_fingerprint != table.content_digest():
+            return "推荐配置表已重新生成"
+        return None
+
+    def covers(self, years: float, ratio: float) -> bool:
+        """查询点是否在网格范围内"""
+        if ratio <= 0:
+            return False
+        log_ratio = np.log(ratio)
+        return bool(
+            self.years[0] <= years <= self.years[-1]
+            and self.log_ratios[0] <= log_ratio <= self.log_ratios[-1]
+        )
+
+    @staticmethod
+    def _bracket(axis: np.ndarray, value: float):
+        upper = min(max(int(np.searchsorted(axis, value)), 1), len(axis) - 1)
+        lower = upper - 1
+        return lower, upper, (value - axis[lower]) / (axis[upper] - axis[lower])
+
+    def lookup(self, tolerance: str, years: float, ratio: float) -> Optional[float]:
+        """双线性插值查询达成概率，超出网格范围时返回 None"""
+        if tolerance not in self.tolerances or not self.covers(years, ratio):
+            return None
+        plane = self.grid[self.tolerances.index(tolerance)]
+        y0, y1, fy = self._bracket(self.years, years)
+        r0, r1, fr = self._bracket(self.log_ratios, float(np.log(ratio)))
+        value = (
+            plane[y0, r0] * (1 - fy) * (1 - fr) + plane[y0, r1] * (1 - fy) * fr
+            + plane[y1, r0] * fy * (1 - fr) + plane[y1, r1] * fy * fr
+        )
+        return float(value)
+
+
+_lock = threading.Lock()
+# 元数据文件 -> (文件修改时间, 校验时的配置表, 网格或 None)
+_loaded: Dict[Path, tuple] = {}
+
+
+def get_probability_grid(directory: Optional[Path] = None) -> Optional[ProbabilityGrid]:
+    """获取可用的网格，不存在或已过期时返回 None（调用方改用实时模拟）
+
+    只读取文件，不生成网格。结果按元数据文件的修改时间缓存，离线重新生成后自动
+    加载；推荐配置表在进程内重建后重新校验。
+    """
+    meta_path = grid_paths(directory)[1]
+    try:
+        mtime = meta_path.stat().st_mtime_ns
+    except OSError:
+        mtime = None
+    table = get_frontier_table()
+    cached = _loaded.get(meta_path)
+    if cached is not None and cached[0] == mtime and cached[1] is table:
+        return cached[2]
+    with _lock:
+        cached = _loaded.get(meta_path)
+        if cached is not None and cached[0] == mtime and cached[1] is table:
+            return cached[2]
+        grid = None
+        if mtime is None:
+            print("达成概率网格不存在，改用实时模拟（运行 python -m src.planning.probability_grid 生成）")
+        else:
+            try:
+                grid = ProbabilityGrid(directory)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"❌ 读取达成概率网格失败，改用实时模拟: {str(e)}")
+            if grid is not None:
+                reason = grid.stale_reason(table)
+                if reason:
+                    print(f"{reason}，达成概率网格已过期，改用实时模拟（运行 python -m src.planning.probability_grid 重新生成）")
+                    grid = None
+        _loaded[meta_path] = (mtime, table, grid)
+        return grid
+
+
+def success_probability(
+    tolerance: str,
+    initial_investment: float,
+    target_value: float,
+    years: float,
+    grid: Optional[ProbabilityGrid] = None
+) -> float:
+    """推荐配置下达成目标的概率：网格范围内查表，范围外或网格不可用时实时模拟"""
+    ratio = target_value / initial_investment if initial_investment > 0 else float("inf")
+    if grid is None:
+        try:
+            grid = get_probability_grid()
+        except Exception as e:
+            print(f"❌ 加载达成概率网格失败，改用实时模拟: {str(e)}")
+    if grid is not None:
+        probability = grid.lookup(tolerance, years, ratio)
+        if probability is not None:
+            return probability
+    allocation = get_frontier_table().lookup(tolerance, years)
+    return simulate_goal(initial_investment, target_value, years, allocation).success_probability
+
+
+def parse_what_if_years(text: str) -> Optional[float]:
+    """识别 "如果改成15年呢" 这类调整投资年限的假设问题，返回新的年限"""
+    match = _WHAT_IF_YEARS.search(text)
+    if not match:
+        return None
+    years = float(match.group(1))
+    return years if years > 0 else None
+
+
+def measure_error(grid: ProbabilityGrid, samples: int = 40, paths: int = 100000, seed: int = 7) -> Dict:
+    """在网格节点之间随机取点，与实时模拟（网格不可用时的结果）比较，返回误差统计
+
+    年限与目标倍数都取节点之间的值，误差同时包含两个方向的插值误差；实时模拟按
+    四舍五入后的整年计算，配置按实际年限查表。
+    """
+    rng = np.random.default_rng(seed)
+    table = get_frontier_table()
+    errors = []
+    for _ in range(samples):
+        tolerance = RISK_TOLERANCE_LABELS[rng.integers(len(RISK_TOLERANCE_LABELS))]
+        years = float(rng.uniform(grid.years[0], grid.years[-1]))
+        ratio = float(np.exp(rng.uniform(grid.log_ratios[0], grid.log_ratios[-1])))
+        expected = simulate_goal(
+            1.0, ratio, years, table.lookup(tolerance, years), paths=paths, seed=int(rng.integers(1 << 31))
+        ).success_probability
+        errors.append(abs(grid.lookup(tolerance, years, ratio) - expected))
+    errors = np.asarray(errors)
+    return {
+        "samples": samples,
+        "mean_abs_error": float(errors.mean()),
+        "max_abs_error": float(errors.max())
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="重建目标达成概率网格，并与完整模拟对比误差")
+    parser.add_argument("-d", "--directory", help="输出目录，默认为 PLANNING_TABLE_DIR")
+    parser.add_argument("--samples", type=int, default=40, help="误差评估的抽样点数，0 表示不评估")
+    args = parser.parse_args()
+    directory = Path(args.directory) if args.directory else None
+
+    meta = build_probability_grid(directory)
+    print(f"网格已生成，耗时 {meta['build_seconds']} 秒")
+    grid = ProbabilityGrid(directory)
+
+    started = time.perf_counter()
+    for _ in range(10000):
+        grid.lookup("稳健型", 8.5, 1.8)
+    print(f"单次查询耗时 {(time.perf_counter() - started) / 10000 * 1e6:.1f} 微秒")
+
+    if args.samples:
+        error = measure_error(grid, args.samples)
+        print(f"与完整模拟对比（{error['samples']} 个点）：平均绝对误差 {error['mean_abs_error']:.4f}，"
+              f"最大绝对误差 {error['max_abs_error']:.4f}")
+        meta["error"] = error
+        grid_paths(directory)[1].write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""LLM 调用结果的类型化模型
+
+analyze_input、状态检测和修改意图检测的 JSON 结果在这里做一次校验与类型转换，
+之后的代码直接访问属性，不再逐层 .get() 和重复检查：
+    - 金额统一为元（"500万"、"1.5亿"、"3,000,000" -> float），年限统一为年（"6个月" -> 0.5）
+    - 资产权重接受小数、百分数和 "50%"，负数按 0 处理，去掉权重为 0 的资产后归一化
+    - null、空字符串和无法识别的值一律丢弃，整段都为空时该段为 None
+提取出的各段信息复用 config_manager 中的数据类（CoreInvestment、PersonalInfo 等）。
+"""
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, Optional, Tuple
+import re
+from src.config.config_manager import CoreInvestment, PersonalInfo, FinancialInfo, Portfolio
+from src.managers.state_manager import ConversationState
+
+INTENTS = ("provide_info", "ask_question", "chat", "other")
+MODIFIABLE_FIELDS = ("target_value", "years", "initial_investment", "portfolio")
+
+_UNITS = {"亿": 1e8, "千万": 1e7, "百万": 1e6, "万": 1e4, "w": 1e4, "千": 1e3, "k": 1e3, "元": 1.0, "": 1.0}
+_AMOUNT = re.compile(r'^(-?\d+(?:\.\d+)?)\s*(亿|千万|百万|万|w|千|k|元)?(?:元|人民币)?$', re.IGNORECASE)
+_YEARS = re.compile(r'^(\d+(?:\.\d+)?)\s*(年|个月|月)?(?:左右|以上|以内)?$')
+_PERCENT = re.compile(r'^(-?\d+(?:\.\d+)?)\s*(%|％)?$')
+_TRUE = ("true", "yes", "是", "1")
+_FALSE = ("false", "no", "否", "0")
+
+
+def to_amount(value: Any) -> Optional[float]:
+    """金额转为元，无法识别或为负数时返回 None"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        amount = float(value)
+    elif isinstance(value, str):
+        match = _AMOUNT.match(re.sub(r'[,，\s]', '', value))
+        if not match:
+            return None
+        amount = float(match.group(1)) * _UNITS[(match.group(2) or "").lower()]
+    else:
+        return None
+    return amount if amount >= 0 and amount == amount else None
+
+
+def to_years(value: Any) -> Optional[float]:
+    """年限转为年，不在 (0, 100] 内时返回 None"""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        years = float(value)
+    elif isinstance(value, str):
+        match = _YEARS.match(value.strip())
+        if not match:
+            return None
+        years = float(match.group(1)) / (12 if match.group(2) in ("个月", "月") else 1)
+    else:
+        return None
+    return years if 0 < years <= 100 else None
+
+
+def to_text(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    text = str(value).strip()
+    return text if text and text.lower() not in ("null", "none") else None
+
+
+def to_bool(value: Any, default: bool) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in _TRUE:
+            return True
+        if lowered in _FALSE:
+            return False
+    return default
+
+
+def to_confidence(value: Any) -> float:
+    """置信度限制在 [0, 1]，百分数按比例换算"""
+    if isinstance(value, str):
+        match = _PERCENT.match(value.strip())
+        value = float(match.group(1)) / (100 if match.group(2) else 1) if match else None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return 0.0
+    value = float(value)
+    if value > 1:
+        value /= 100
+    return min(max(value, 0.0), 1.0)
+
+
+def _to_weight(value: Any) -> Tuple[Optional[float], bool]:
+    """返回 (权重, 是否带 % 号)"""
+    if isinstance(value, bool):
+        return None, False
+    if isinstance(value, (int, float)):
+        return float(value), False
+    if isinstance(value, str):
+        match = _PERCENT.match(value.strip())
+        if match:
+            return float(match.group(1)) / (100 if match.group(2) else 1), bool(match.group(2))
+    return None, False
+
+
+def to_portfolio(value: Any) -> Optional[Portfolio]:
+    """校验资产配置：资产与权重一一对应，权重归一化，无效时返回 None"""
+    if isinstance(value, Portfolio):
+        value = {"assets": value.assets, "weights": value.weights}
+    if not isinstance(value, dict):
+        return None
+    assets, weights = value.get("assets"), value.get("weights")
+    if not isinstance(assets, list) or not isinstance(weights, list) or not assets:
+        return None
+    if len(assets) != len(weights):
+        print(f"❌ 资产与权重数量不一致: {assets} / {weights}")
+        return None
+    parsed = [(to_text(asset), *_to_weight(weight)) for asset, weight in zip(assets, weights)]
+    if any(asset is None or weight is None for asset, weight, _ in parsed):
+        return None
+    # 不带 % 号的权重中有大于 1 的，按百分数处理（[60, 40]）
+    scale = 100.0 if any(weight > 1 for _, weight, percent in parsed if not percent) else 1.0
+    parsed = [(asset, max(weight if percent else weight / scale, 0.0)) for asset, weight, percent in parsed]
+    parsed = [(asset, weight) for asset, weight in parsed if weight > 0]
+    total = sum(weight for _, weight in parsed)
+    if total <= 0:
+        return None
+    if abs(total - 1.0) > 0.01:  # 允许1%的误差
+        print(f"权重总和 ({total}) 不等于1，进行归一化")
+        parsed = [(asset, weight / total) for asset, weight in parsed]
+    return Portfolio(assets=[asset for asset, _ in parsed], weights=[weight for _, weight in parsed])
+
+
+def _section(cls, data: Any, convert: Dict[str, Any]):
+    """按字段类型转换一段信息，全部为空时返回 None"""
+    if not isinstance(data, dict):
+        return None
+    values = {}
+    for name in cls.__dataclass_fields__:
+        value = convert[name](data.get(name))
+        if value is not None:
+            values[name] = value
+    return cls(**values) if values else None
+
+
+_CORE_CONVERT = {"target_value": to_amount, "years": to_years, "initial_investment": to_amount}
+_PERSONAL_CONVERT = {name: to_text for name in PersonalInfo.__dataclass_fields__}
+_FINANCIAL_CONVERT = {name: to_amount for name in FinancialInfo.__dataclass_fields__}
+
+
+def non_null(section) -> Dict[str, Any]:
+    """数据类中不为 None 的字段"""
+    if section is None:
+        return {}
+    return {f.name: getattr(section, f.name) for f in fields(section) if getattr(section, f.name) is not None}
+
+
+@dataclass(slots=True)
+class QuestionInfo:
+    type: Optional[str] = None
+    requires_immediate_response: bool = False
+    can_collect_info: bool = True
+    original_question: Optional[str] = None
+
+
+@dataclass(slots=True)
+class AnalysisResult:
+    """analyze_input 的结果"""
+    intent: Optional[str] = None          # provide_info/ask_question/chat/other，None 表示未分析
+    emotion: str = "neutral"
+    patience_level: Optional[str] = None
+    core_investment: Optional[CoreInvestment] = None
+    personal_info: Optional[PersonalInfo] = None
+    financial_info: Optional[FinancialInfo] = None
+    portfolio: Optional[Portfolio] = None
+    question_info: QuestionInfo = field(default_factory=QuestionInfo)
+    reasoning: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "AnalysisResult":
+        intent = to_text(data.get("intent"))
+        extracted = data.get("extracted_info")
+        if not isinstance(extracted, dict):
+            extracted = {}
+        question = data.get("question_info")
+        if not isinstance(question, dict):
+            question = {}
+        reasoning = data.get("reasoning")
+        return cls(
+            intent=intent if intent in INTENTS else "other",
+            emotion=to_text(data.get("emotion")) or "neutral",
+            patience_level=to_text(data.get("patience_level")),
+            core_investment=_section(CoreInvestment, extracted.get("core_investment"), _CORE_CONVERT),
+            personal_info=_section(PersonalInfo, extracted.get("personal_info"), _PERSONAL_CONVERT),
+            financial_info=_section(FinancialInfo, extracted.get("financial_info"), _FINANCIAL_CONVERT),
+            portfolio=to_portfolio(extracted.get("portfolio")),
+            question_info=QuestionInfo(
+                type=to_text(question.get("type")),
+                requires_immediate_response=to_bool(question.get("requires_immediate_response"), False),
+                can_collect_info=to_bool(question.get("can_collect_info"), True),
+                original_question=to_text(question.get("original_question"))
+            ),
+            reasoning={
+                key: text for key, value in reasoning.items() if (text := to_text(value)) is not None
+            } if isinstance(reasoning, dict) else {}
+        )
+
+    def extracted_info(self) -> Dict:
+        """提取到的信息（只含非空的段和字段），用于对话历史与事件日志"""
+        info = {}
+        for name in ("core_investment", "personal_info", "financial_info"):
+            values = non_null(getattr(self, name))
+            if values:
+                info[name] = values
+        if self.portfolio is not None:
+            info["portfolio"] = {"assets": self.portfolio.assets, "weights": self.portfolio.weights}
+        return info
+
+    def to_dict(self) -> Dict:
+        return {
+            "intent": self.intent,
+            "emotion": self.emotion,
+            "patience_level": self.patience_level,
+            "extracted_info": self.extracted_info(),
+            "question_info": non_null(self.question_info),
+            "reasoning": self.reasoning
+        }
+
+
+@dataclass(slots=True)
+class StateDetectionResult:
+    """状态检测的结果"""
+    target_state: Optional[ConversationState] = None
+    confidence: float = 0.0
+    reasoning: str = ""
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "StateDetectionResult":
+        state = to_text(data.get("target_state"))
+        return cls(
+            target_state=ConversationState(state.upper()) if state and state.upper() in ConversationState.__members__ else None,
+            confidence=to_confidence(data.get("confidence")),
+            reasoning=to_text(data.get("reasoning")) or ""
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "target_state": self.target_state.value if self.target_state else None,
+            "confidence": self.confidence,
+            "reasoning": self.reasoning
+        }
+
+
+@dataclass(slots=True)
+class ModificationResult:
+    """修改意图检测的结果，new_value 已按字段转换（金额、年限为 float，资产配置为 Portfolio）"""
+    has_modification_intent: bool = False
+    target_field: Optional[str] = None
+    new_value: Any = None
+    confidence: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ModificationResult":
+        target_field = to_text(data.get("target_field"))
+        raw_value = data.get("new_value")
+        if target_field in ("target_value", "initial_investment"):
+            new_value = to_amount(raw_value)
+        elif target_field == "years":
+            new_value = to_years(raw_value)
+        elif target_field == "portfolio":
+            new_value = to_portfolio(raw_value)
+        else:
+            new_value = raw_value
+        has_intent = to_bool(data.get("has_modification_intent"), False)
+        if has_intent and target_field in MODIFIABLE_FIELDS and new_value is None:
+            print(f"❌ 修改的新值无法识别: {target_field}={raw_value!r}")
+            has_intent = False
+        return cls(
+            has_modification_intent=has_intent,
+            target_field=target_field,
+            new_value=new_value,
+            confidence=to_confidence(data.get("confidence"))
+        )
+
+    def to_dict(self) -> Dict:
+        value = self.new_value
+        if isinstance(value, Portfolio):
+            value = {"assets": value.assets, "weights": value.weights}
+        return {
+            "has_modification_intent": self.has_modification_intent,
+            "target_field": self.target_field,
+            "new_value": value,
+            "confidence": self.confidence
+        }
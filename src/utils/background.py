@@ -0,0 +1,153 @@
+"""进程内的后台任务队列
+
+回复生成后，对话历史的追加、事件日志的写入等记账工作交给后台线程完成，回复可以
+立即返回给用户。Streamlit 每次运行都在新的事件循环中执行（asyncio.run），事件循环
+结束时其中的任务会被取消，因此后台任务运行在进程级的线程中，而不是调用方的事件循环里。
+
+一致性：
+    - 任务按 key（通常是会话）分片到固定的线程，同一 key 的任务严格按提交顺序执行
+    - 读取或序列化会话之前调用 flush(key) / wait_for(key)，等待该会话的任务全部完成
+      （ConversationManager.chat 开始新的一轮之前、SessionStore 写回或淘汰会话之前）
+
+队列满（排队任务数达到 max_pending）时按 overflow 处理：
+    - inline：在调用方线程中执行（先等待同一 key 之前的任务完成，保持顺序）
+    - drop：丢弃标记为 droppable 的任务（例如指标统计），其余任务仍在调用方执行
+进程退出时 shutdown() 停止接收新任务，并在 drain_timeout 内等待已排队的任务完成。
+"""
+from typing import Any, Callable, Dict, Hashable, List, Optional
+import asyncio
+import atexit
+import queue
+import threading
+import time
+from src.config.session_config import (
+    BACKGROUND_WORKERS, BACKGROUND_MAX_PENDING, BACKGROUND_OVERFLOW, BACKGROUND_DRAIN_TIMEOUT
+)
+
+OVERFLOW_POLICIES = ("inline", "drop")
+
+
+class BackgroundQueue:
+    def __init__(
+        self,
+        workers: int = BACKGROUND_WORKERS,
+        max_pending: int = BACKGROUND_MAX_PENDING,
+        overflow: str = BACKGROUND_OVERFLOW
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知的队列溢出策略: {overflow}")
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.overflow = overflow
+        self._shards: List[queue.SimpleQueue] = [queue.SimpleQueue() for _ in range(self.workers)]
+        self._threads: List[threading.Thread] = []
+        self._cond = threading.Condition()
+        self._pending: Dict[Hashable, int] = {}
+        self._total = 0
+        self._closed = False
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'inline': 0, 'dropped': 0}
+
+    def submit(self, key: Hashable, fn: Callable, *args: Any, droppable: bool = False) -> bool:
+        """提交任务，返回 False 表示任务因队列已满被丢弃"""
+        with self._cond:
+            if self._closed or self._total >= self.max_pending:
+                if droppable and self.overflow == "drop" and not self._closed:
+                    self.stats['dropped'] += 1
+                    return False
+                inline = True
+            else:
+                inline = False
+                self._pending[key] = self._pending.get(key, 0) + 1
+                self._total += 1
+                self.stats['submitted'] += 1
+                if not self._threads:
+                    self._start()
+        if inline:
+            # 先等待同一 key 之前排队的任务，保持顺序
+            self.flush(key)
+            ok = self._run(fn, args)
+            with self._cond:
+                self.stats['inline'] += 1
+                self.stats['completed' if ok else 'failed'] += 1
+            return True
+        self._shards[hash(key) % self.workers].put((key, fn, args))
+        return True
+
+    def pending(self, key: Optional[Hashable] = None) -> int:
+        """key 的排队任务数，key 为 None 时返回全部排队任务数"""
+        with self._cond:
+            return self._total if key is None else self._pending.get(key, 0)
+
+    def flush(self, key: Hashable, timeout: Optional[float] = None) -> bool:
+        """等待 key 的任务全部完成，超时返回 False"""
+        with self._cond:
+            return self._cond.wait_for(lambda: key not in self._pending, timeout)
+
+    async def wait_for(self, key: Hashable, timeout: Optional[float] = None) -> bool:
+        """flush 的异步版本，没有排队任务时不切换线程"""
+        if self.pending(key) == 0:
+            return True
+        return await asyncio.to_thread(self.flush, key, timeout)
+
+    def shutdown(self, timeout: float = BACKGROUND_DRAIN_TIMEOUT) -> bool:
+        """停止接收新任务（之后提交的任务在调用方执行），等待已排队的任务完成"""
+        with self._cond:
+            if self._closed:
+                return self._total == 0
+            self._closed = True
+            threads = list(self._threads)
+        for shard in self._shards[:len(threads)]:
+            shard.put(None)
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        with self._cond:
+            if self._total:
+                print(f"❌ 后台任务未能在 {timeout} 秒内完成，剩余 {self._total} 个")
+            return self._total == 0
+
+    def _start(self) -> None:
+        for index, shard in enumerate(self._shards):
+            thread = threading.Thread(target=self._worker, args=(shard,), name=f"background-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _worker(self, shard: queue.SimpleQueue) -> None:
+        while True:
+            item = shard.get()
+            if item is None:
+                return
+            key, fn, args = item
+            ok = self._run(fn, args)
+            with self._cond:
+                self.stats['completed' if ok else 'failed'] += 1
+                count = self._pending[key] - 1
+                if count:
+                    self._pending[key] = count
+                else:
+                    del self._pending[key]
+                self._total -= 1
+                self._cond.notify_all()
+
+    def _run(self, fn: Callable, args: tuple) -> bool:
+        try:
+            fn(*args)
+            return True
+        except Exception as e:
+            print(f"❌ 后台任务执行失败 ({getattr(fn, '__name__', fn)}): {str(e)}")
+            return False
+
+
+_queue_lock = threading.Lock()
+_queue: Optional[BackgroundQueue] = None
+
+
+def get_background_queue() -> BackgroundQueue:
+    """进程内共享的后台任务队列，进程退出时自动清空"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = BackgroundQueue()
+                atexit.register(_queue.shutdown)
+    return _queue
@@ -0,0 +1,233 @@
+"""紧凑二进制编码
+
+用于会话状态的持久化与跨进程传输。格式由固定头部和带类型标记的值组成：
+
+    头部: magic(2字节 b"GL") | kind(1字节) | flags(1字节) | schema_version(2字节)
+    值:   tag(1字节) + 按类型 struct 打包的内容
+
+值部分优先使用 msgpack（C 扩展，速度快）编码；未安装 msgpack 或数值超出其
+表示范围时，退回到本模块内置的 struct 打包编码，两者通过头部标志位区分。
+
+支持 None/bool/int/float/str/bytes/list/dict，可以精确往返（int 与 float 类型
+保持不变，dict 的键可以是任意支持的类型）。tuple 按 list 编码。
+"""
+from typing import Any, List, Tuple
+import struct
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # msgpack 为可选依赖
+    msgpack = None
+
+MAGIC = b"GL"
+
+# 数据种类
+KIND_CONFIG = 1
+KIND_STATE = 2
+KIND_SESSION = 3
+KIND_EVENT = 4
+
+# 头部标志位
+FLAG_ZLIB = 0x01
+FLAG_MSGPACK = 0x02
+
+_HEADER = struct.Struct("<2sBBH")
+_I32 = struct.Struct("<i")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+_LEN = struct.Struct("<I")
+
+# 值类型标记
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT32 = 3
+_INT64 = 4
+_FLOAT = 5
+_STR = 6
+_LIST = 7
+_DICT = 8
+_BYTES = 9
+_BIGINT = 10
+
+_TAG_NONE = bytes([_NONE])
+_TAG_FALSE = bytes([_FALSE])
+_TAG_TRUE = bytes([_TRUE])
+_TAG_INT32 = bytes([_INT32])
+_TAG_INT64 = bytes([_INT64])
+_TAG_FLOAT = bytes([_FLOAT])
+_TAG_STR = bytes([_STR])
+_TAG_LIST = bytes([_LIST])
+_TAG_DICT = bytes([_DICT])
+_TAG_BYTES = bytes([_BYTES])
+_TAG_BIGINT = bytes([_BIGINT])
+
+
+class CodecError(ValueError):
+    """二进制数据无法解码"""
+
+
+class SchemaVersionError(CodecError):
+    """数据的 schema 版本不受支持"""
+
+
+def _encode(obj: Any, out: List[bytes]) -> None:
+    kind = type(obj)
+    if obj is None:
+        out.append(_TAG_NONE)
+    elif kind is bool:
+        out.append(_TAG_TRUE if obj else _TAG_FALSE)
+    elif kind is int:
+        if -0x80000000 <= obj <= 0x7FFFFFFF:
+            out.append(_TAG_INT32)
+            out.append(_I32.pack(obj))
+        elif -0x8000000000000000 <= obj <= 0x7FFFFFFFFFFFFFFF:
+            out.append(_TAG_INT64)
+            out.append(_I64.pack(obj))
+        else:
+            data = str(obj).encode("ascii")
+            out.append(_TAG_BIGINT)
+            out.append(_LEN.pack(len(data)))
+            out.append(data)
+    elif kind is float:
+        out.append(_TAG_FLOAT)
+        out.append(_F64.pack(obj))
+    elif kind is str:
+        data = obj.encode("utf-8")
+        out.append(_TAG_STR)
+        out.append(_LEN.pack(len(data)))
+        out.append(data)
+    elif kind is list or kind is tuple:
+        out.append(_TAG_LIST)
+        out.append(_LEN.pack(len(obj)))
+        for item in obj:
+            _encode(item, out)
+    elif kind is dict:
+        out.append(_TAG_DICT)
+        out.append(_LEN.pack(len(obj)))
+        for key, value in obj.items():
+            _encode(key, out)
+            _encode(value, out)
+    elif kind is bytes:
+        out.append(_TAG_BYTES)
+        out.append(_LEN.pack(len(obj)))
+        out.append(obj)
+    else:
+        raise TypeError(f"不支持编码的类型: {kind.__name__}")
+
+
+def _decode(data: bytes, offset: int) -> Tuple[Any, int]:
+    tag = data[offset]
+    offset += 1
+    if tag == _NONE:
+        return None, offset
+    if tag == _FALSE:
+        return False, offset
+    if tag == _TRUE:
+        return True, offset
+    if tag == _INT32:
+        return _I32.unpack_from(data, offset)[0], offset + 4
+    if tag == _INT64:
+        return _I64.unpack_from(data, offset)[0], offset + 8
+    if tag == _FLOAT:
+        return _F64.unpack_from(data, offset)[0], offset + 8
+    if tag == _STR:
+        length = _LEN.unpack_from(data, offset)[0]
+        offset += 4
+        return data[offset:offset + length].decode("utf-8"), offset + length
+    if tag == _LIST:
+        length = _LEN.unpack_from(data, offset)[0]
+        offset += 4
+        items = []
+        for _ in range(length):
+            item, offset = _decode(data, offset)
+            items.append(item)
+        return items, offset
+    if tag == _DICT:
+        length = _LEN.unpack_from(data, offset)[0]
+        offset += 4
+        result = {}
+        for _ in range(length):
+            key, offset = _decode(data, offset)
+            result[key], offset = _decode(data, offset)
+        return result, offset
+    if tag == _BYTES:
+        length = _LEN.unpack_from(data, offset)[0]
+        offset += 4
+        return bytes(data[offset:offset + length]), offset + length
+    if tag == _BIGINT:
+        length = _LEN.unpack_from(data, offset)[0]
+        offset += 4
+        return int(data[offset:offset + length].decode("ascii")), offset + length
+    raise CodecError(f"未知的类型标记: {tag}")
+
+
+def encode_value(obj: Any) -> bytes:
+    """编码单个值（不带头部）"""
+    out: List[bytes] = []
+    _encode(obj, out)
+    return b"".join(out)
+
+
+def decode_value(data: bytes) -> Any:
+    """解码单个值（不带头部）"""
+    try:
+        value, offset = _decode(data, 0)
+    except (IndexError, struct.error, UnicodeDecodeError) as e:
+        raise CodecError(f"数据已损坏: {e}") from e
+    if offset != len(data):
+        raise CodecError(f"数据末尾有 {len(data) - offset} 个多余字节")
+    return value
+
+
+def pack(kind: int, schema_version: int, obj: Any, compress_threshold: int = 0) -> bytes:
+    """编码值并加上头部
+
+    Args:
+        kind: 数据种类（KIND_*）
+        schema_version: 数据结构的版本号
+        obj: 要编码的值
+        compress_threshold: 编码后超过该字节数时使用 zlib 压缩，0 表示不压缩
+    """
+    flags = 0
+    payload = None
+    if msgpack is not None:
+        try:
+            payload = msgpack.packb(obj, use_bin_type=True)
+            flags |= FLAG_MSGPACK
+        except (OverflowError, TypeError):
+            payload = None
+    if payload is None:
+        payload = encode_value(obj)
+    if compress_threshold and len(payload) > compress_threshold:
+        payload = zlib.compress(payload, 1)
+        flags |= FLAG_ZLIB
+    return _HEADER.pack(MAGIC, kind, flags, schema_version) + payload
+
+
+def unpack(data: bytes, kind: int) -> Tuple[int, Any]:
+    """校验头部并解码，返回 (schema_version, 值)"""
+    if len(data) < _HEADER.size:
+        raise CodecError("数据长度不足")
+    magic, data_kind, flags, schema_version = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise CodecError("不是有效的二进制会话数据")
+    if data_kind != kind:
+        raise CodecError(f"数据种类不匹配: 期望 {kind}，实际 {data_kind}")
+    payload = data[_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    if flags & FLAG_MSGPACK:
+        if msgpack is None:
+            raise CodecError("数据使用 msgpack 编码，但当前环境未安装 msgpack")
+        try:
+            return schema_version, msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        except (ValueError, msgpack.UnpackException) as e:
+            raise CodecError(f"数据已损坏: {e}") from e
+    return schema_version, decode_value(payload)
+
+
+def is_packed(data: bytes) -> bool:
+    """判断数据是否为本模块编码的格式"""
+    return data[:len(MAGIC)] == MAGIC
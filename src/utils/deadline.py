@@ -0,0 +1,64 @@
+"""单轮对话的时间预算
+
+一轮对话可能串行调用多次 LLM，每次调用又可能重试。Deadline 表示整轮对话的
+截止时间，通过 contextvar 向下传递：LLMUtils.call_llm 会把每次请求的超时和
+重试等待限制在剩余时间之内，不会在预算耗尽后再发起新的请求。
+"""
+from contextvars import ContextVar
+from typing import Optional
+import asyncio
+import time
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """本轮对话的时间预算已耗尽"""
+
+
+class Deadline:
+    """基于单调时钟的截止时间"""
+
+    __slots__ = ("expires_at", "budget")
+
+    def __init__(self, expires_at: float, budget: Optional[float] = None):
+        self.expires_at = expires_at
+        self.budget = budget  # 创建时给定的总预算（秒），直接指定截止时间时为 None
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        """从现在起 seconds 秒后到期"""
+        return cls(time.monotonic() + seconds, budget=seconds)
+
+    def remaining(self) -> float:
+        """剩余秒数，已到期时为 0"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float) -> float:
+        """单次操作可用的超时：不超过 cap，也不超过剩余时间
+
+        Raises:
+            DeadlineExceeded: 剩余时间已耗尽
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("本轮对话的时间预算已耗尽")
+        return min(cap, remaining)
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+
+def get_current_deadline() -> Optional[Deadline]:
+    """当前上下文中的截止时间，没有设置时返回 None"""
+    return _current_deadline.get()
+
+
+def set_current_deadline(deadline: Optional[Deadline]):
+    """设置当前上下文的截止时间，返回用于 reset_current_deadline 的 token"""
+    return _current_deadline.set(deadline)
+
+
+def reset_current_deadline(token) -> None:
+    _current_deadline.reset(token)
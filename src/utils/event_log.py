@@ -0,0 +1,199 @@
+"""对话事件日志
+
+每轮对话记录为一条事件，按会话 ID 哈希写入若干分片日志文件。日志只追加，
+每条记录的格式为：
+
+    length(4字节) | crc32(4字节) | payload(binary_codec 编码的事件字典)
+
+日志文件可以直接 mmap 后离线扫描，末尾写了一半的记录会被忽略。另外按会话
+定期保存完整快照，快照中记录了保存时分片文件的偏移量，恢复会话时只需读取
+快照并重放该偏移量之后的事件。
+
+每个会话还有一个索引文件，依次记录 (事件序号, 记录偏移量)。重放时按索引直接读取
+该会话的记录，不需要扫描分片中其他会话的事件，耗时与该会话快照之后的事件数成正比。
+索引缺失或与日志不一致时退回到扫描分片。
+"""
+from typing import Dict, Iterator, Optional, Tuple
+from pathlib import Path
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from src.utils import binary_codec
+
+EVENT_SCHEMA_VERSION = 1
+
+_RECORD_HEADER = struct.Struct("<II")
+_SNAPSHOT_HEADER = struct.Struct("<QQ")  # 事件序号, 分片文件偏移量
+_INDEX_ENTRY = struct.Struct("<QQ")  # 事件序号, 记录偏移量
+
+
+def diff_dicts(before: Dict, after: Dict) -> Dict:
+    """计算嵌套字典的差异，只保留发生变化的叶子节点"""
+    delta = {}
+    for key, value in after.items():
+        old_value = before.get(key)
+        if isinstance(value, dict) and isinstance(old_value, dict):
+            nested = diff_dicts(old_value, value)
+            if nested:
+                delta[key] = nested
+        elif value != old_value:
+            delta[key] = value
+    return delta
+
+
+def iter_records(path: str, offset: int = 0) -> Iterator[Tuple[int, Dict]]:
+    """通过 mmap 扫描日志文件，逐条返回 (记录偏移量, 事件字典)
+
+    可用于离线分析。遇到长度或校验和不正确的记录（通常是写了一半的末尾记录）
+    时停止扫描。
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= offset:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            position = offset
+            while True:
+                record = _read_record(view, position, size)
+                if record is None:
+                    if position + _RECORD_HEADER.size <= size:
+                        print(f"警告: 事件日志 {path} 在偏移量 {position} 处校验失败，停止扫描")
+                    break
+                end, event = record
+                yield position, event
+                position = end
+
+
+def _read_record(view, position: int, size: int) -> Optional[Tuple[int, Dict]]:
+    """读取 position 处的一条记录，返回 (记录结束偏移量, 事件字典)，记录不完整或校验失败时返回 None"""
+    if position + _RECORD_HEADER.size > size:
+        return None
+    length, checksum = _RECORD_HEADER.unpack_from(view, position)
+    start = position + _RECORD_HEADER.size
+    end = start + length
+    if end > size:
+        return None
+    payload = view[start:end]
+    if zlib.crc32(payload) != checksum:
+        return None
+    _, event = binary_codec.unpack(payload, binary_codec.KIND_EVENT)
+    return end, event
+
+
+class EventLog:
+    """按分片追加写入的对话事件日志，附带会话快照"""
+
+    def __init__(self, log_dir: str, shards: int = 16, fsync: bool = False):
+        self.log_dir = Path(log_dir)
+        self.snapshot_dir = self.log_dir / "snapshots"
+        self.index_dir = self.log_dir / "index"
+        self.shards = shards
+        self.fsync = fsync
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+
+    def shard_of(self, session_id: str) -> int:
+        """会话所在的分片编号"""
+        return zlib.crc32(session_id.encode("utf-8")) % self.shards
+
+    def shard_path(self, shard: int) -> Path:
+        return self.log_dir / f"events-{shard:03d}.log"
+
+    @staticmethod
+    def _safe_id(session_id: str) -> str:
+        safe_id = re.sub(r'[^A-Za-z0-9_-]', '_', session_id)
+        if safe_id != session_id:
+            safe_id += "-" + format(zlib.crc32(session_id.encode("utf-8")), "08x")
+        return safe_id
+
+    def _snapshot_path(self, session_id: str) -> Path:
+        return self.snapshot_dir / f"{self._safe_id(session_id)}.snap"
+
+    def _index_path(self, session_id: str) -> Path:
+        return self.index_dir / f"{self._safe_id(session_id)}.idx"
+
+    def append(self, session_id: str, seq: int, event: Dict) -> None:
+        """追加一条事件"""
+        record = dict(event, session_id=session_id, seq=seq, ts=time.time())
+        payload = binary_codec.pack(binary_codec.KIND_EVENT, EVENT_SCHEMA_VERSION, record)
+        data = _RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        shard = self.shard_of(session_id)
+        with self._locks[shard]:
+            # 追加模式下单次 write 写入整条记录，多个进程并发追加也不会交错
+            with open(self.shard_path(shard), "ab") as f:
+                f.write(data)
+                f.flush()
+                offset = f.tell() - len(data)
+                if self.fsync:
+                    os.fsync(f.fileno())
+            # 索引在记录写入之后追加，重放时会核对记录的会话和序号
+            with open(self._index_path(session_id), "ab") as f:
+                f.write(_INDEX_ENTRY.pack(seq, offset))
+
+    def write_snapshot(self, session_id: str, seq: int, data: bytes) -> None:
+        """保存会话快照，seq 为快照包含的最后一条事件序号"""
+        shard = self.shard_of(session_id)
+        with self._locks[shard]:
+            path = self.shard_path(shard)
+            offset = path.stat().st_size if path.exists() else 0
+        snapshot_path = self._snapshot_path(session_id)
+        tmp_path = snapshot_path.with_suffix(".tmp")
+        tmp_path.write_bytes(_SNAPSHOT_HEADER.pack(seq, offset) + data)
+        tmp_path.replace(snapshot_path)
+
+    def load_snapshot(self, session_id: str) -> Optional[Tuple[int, int, bytes]]:
+        """读取会话快照，返回 (事件序号, 分片偏移量, 快照数据)"""
+        path = self._snapshot_path(session_id)
+        if not path.exists():
+            return None
+        data = path.read_bytes()
+        seq, offset = _SNAPSHOT_HEADER.unpack_from(data)
+        return seq, offset, data[_SNAPSHOT_HEADER.size:]
+
+    def replay(self, session_id: str, after_seq: int = 0, offset: int = 0) -> Iterator[Dict]:
+        """按顺序返回会话在 after_seq 之后的事件
+
+        优先按会话索引读取，索引不可用时从分片的 offset 处开始扫描。
+        """
+        path = self.shard_path(self.shard_of(session_id))
+        if not path.exists():
+            return
+        events = self._replay_indexed(session_id, path, after_seq)
+        if events is None:
+            events = (
+                event for _, event in iter_records(str(path), offset)
+                if event.get("session_id") == session_id and event.get("seq", 0) > after_seq
+            )
+        yield from events
+
+    def _replay_indexed(self, session_id: str, path: Path, after_seq: int) -> Optional[list]:
+        """按索引读取会话的事件，索引缺失或与日志不一致时返回 None"""
+        index_path = self._index_path(session_id)
+        if not index_path.exists():
+            return None
+        index = index_path.read_bytes()
+        # 末尾写了一半的索引项忽略
+        entries = [
+            _INDEX_ENTRY.unpack_from(index, position)
+            for position in range(0, len(index) - _INDEX_ENTRY.size + 1, _INDEX_ENTRY.size)
+        ]
+        entries = [(seq, record_offset) for seq, record_offset in entries if seq > after_seq]
+        if not entries:
+            return []
+        events = []
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                for seq, record_offset in entries:
+                    record = _read_record(view, record_offset, size)
+                    if record is None or record[1].get("session_id") != session_id \
+                            or record[1].get("seq") != seq:
+                        print(f"警告: 会话 {session_id} 的事件索引与日志不一致，改为扫描分片")
+                        return None
+                    events.append(record[1])
+        return events
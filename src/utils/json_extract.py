@@ -0,0 +1,176 @@
+"""从 LLM 回复文本中提取 JSON 对象
+
+LLM 的回复经常不是干净的 JSON：前后带说明文字（文字里也可能有花括号）、包在 ```json
+代码块里、一次输出多个对象、带尾逗号、照抄 prompt 模板里的 // 注释、用中文全角标点
+或 Python 的 None/True/False。提取按以下顺序进行，找到第一个符合 schema 的对象即返回：
+
+    1. 代码块内的文本优先，其次是整段文本
+    2. 从每个 "{" 开始用 json.JSONDecoder.raw_decode 严格解码（允许字符串中的换行）
+    3. 严格解码没有结果时，对每个候选对象做有限的修复后再解码：只修改字符串之外的
+       部分（全角标点、尾逗号、// 注释、Python 字面量、中文引号），不改动字符串内容
+
+schema 只检查调用方依赖的字段，用于跳过说明文字中的示例对象或外层包装对象。
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+import json
+import re
+
+_decoder = json.JSONDecoder(strict=False)
+
+_OBJECT_START = re.compile(r'[{｛]')
+
+# 字符串之外的全角标点
+_FULLWIDTH = {"：": ":", "，": ",", "｛": "{", "｝": "}", "［": "[", "］": "]"}
+_LITERALS = {"None": "null", "True": "true", "False": "false"}
+_OPEN_QUOTES = {'"': '"', "“": "”"}
+_NUMBER = (int, float)
+
+
+@dataclass(slots=True)
+class JsonSchema:
+    """提取结果需要满足的最小结构"""
+    name: str
+    required: Tuple[str, ...] = ()                      # 必须存在的字段
+    any_of: Tuple[str, ...] = ()                        # 至少存在其中一个字段
+    types: Dict[str, tuple] = field(default_factory=dict)  # 字段存在且非 null 时的类型
+
+    def validate(self, obj: Dict) -> bool:
+        for key in self.required:
+            if key not in obj:
+                return False
+        if self.any_of:
+            for key in self.any_of:
+                if key in obj:
+                    break
+            else:
+                return False
+        for key, types in self.types.items():
+            value = obj.get(key)
+            if value is not None and not isinstance(value, types):
+                return False
+        return True
+
+
+ANALYSIS_SCHEMA = JsonSchema(
+    "analysis",
+    any_of=("intent", "extracted_info"),
+    types={"intent": (str,), "extracted_info": (dict,), "question_info": (dict,), "reasoning": (dict,)}
+)
+STATE_DETECTION_SCHEMA = JsonSchema(
+    "state_detection",
+    required=("target_state",),
+    types={"target_state": (str,), "confidence": _NUMBER}
+)
+MODIFICATION_SCHEMA = JsonSchema(
+    "modification",
+    required=("has_modification_intent",),
+    types={"has_modification_intent": (bool,), "target_field": (str,), "confidence": _NUMBER}
+)
+
+
+def extract_json(text: Optional[str], schema: Optional[JsonSchema] = None) -> Optional[Dict]:
+    """提取第一个（符合 schema 的）JSON 对象，没有时返回 None"""
+    if not text:
+        return None
+    # 代码块按位置扫描，不复制文本
+    fence = text.find("```")
+    while fence >= 0:
+        end = text.find("```", fence + 3)
+        if end < 0:
+            break
+        result = _scan(text, schema, fence + 3, end)
+        if result is not None:
+            return result
+        fence = text.find("```", end + 3)
+    return _scan(text, schema, 0, len(text))
+
+
+def _accept(obj, schema: Optional[JsonSchema]) -> bool:
+    return isinstance(obj, dict) and (schema is None or schema.validate(obj))
+
+
+def _scan(text: str, schema: Optional[JsonSchema], start: int, end: int) -> Optional[Dict]:
+    pos = text.find("{", start, end)
+    while pos >= 0:
+        try:
+            obj, _ = _decoder.raw_decode(text, pos)
+        except ValueError:
+            pass
+        else:
+            if _accept(obj, schema):
+                return obj
+        pos = text.find("{", pos + 1, end)
+
+    # 严格解码没有结果，逐个候选修复后再试
+    for match in _OBJECT_START.finditer(text, start, end):
+        fragment = _repair(text, match.start())
+        if fragment is None:
+            continue
+        try:
+            obj, _ = _decoder.raw_decode(fragment)
+        except ValueError:
+            continue
+        if _accept(obj, schema):
+            return obj
+    return None
+
+
+def _strip_trailing_comma(out: list) -> None:
+    i = len(out) - 1
+    while i >= 0 and out[i].isspace():
+        i -= 1
+    if i >= 0 and out[i] == ",":
+        del out[i]
+
+
+def _repair(text: str, start: int) -> Optional[str]:
+    """从 start 处的 "{" 开始修复一个对象，返回修复后的对象文本，对象不完整时返回 None"""
+    out = []
+    depth = 0
+    closer = None       # 当前字符串的结束引号，None 表示不在字符串中
+    i, n = start, len(text)
+    while i < n:
+        char = text[i]
+        if closer is not None:
+            if char == "\\" and i + 1 < n:
+                out.append(text[i:i + 2])
+                i += 2
+                continue
+            if char == '"' or char == closer:
+                out.append('"')
+                closer = None
+            else:
+                out.append(char)
+            i += 1
+            continue
+
+        char = _FULLWIDTH.get(char, char)
+        if char in _OPEN_QUOTES:
+            out.append('"')
+            closer = _OPEN_QUOTES[char]
+        elif char == "{" or char == "[":
+            depth += 1
+            out.append(char)
+        elif char == "}" or char == "]":
+            _strip_trailing_comma(out)
+            out.append(char)
+            depth -= 1
+            if depth == 0:
+                return "".join(out)
+        elif char == "/" and text.startswith("//", i):
+            end = text.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        elif char.isalpha():
+            end = i
+            while end < n and (text[end].isalnum() or text[end] == "_"):
+                end += 1
+            word = text[i:end]
+            out.append(_LITERALS.get(word, word))
+            i = end
+            continue
+        else:
+            out.append(char)
+        i += 1
+    return None
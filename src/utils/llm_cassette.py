@@ -0,0 +1,139 @@
+"""LLM 调用的录制与回放
+
+录制模式下 LLMUtils.call_llm 照常请求 API，并把每个 请求/响应 对追加到磁带文件；
+回放模式下不发送请求，按规范化请求的哈希从磁带中取出响应，可以选择按录制时的
+耗时等待。用于复现延迟问题、对比流水线改动：回放时 LLM 部分的耗时固定（或为 0），
+CPU 侧的性能变化不会被 LLM 的波动掩盖。
+
+磁带文件每行一条 JSON 记录：
+    {"key": 请求哈希, "request": 请求体, "response": {"text", "finish_reason"}, "elapsed": 秒}
+加载时按 key 建立索引。同一请求录制了多次时按录制顺序依次回放，用完后重复最后一条。
+"""
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import re
+import threading
+from src.config.api_config import LLM_CASSETTE_MODE, LLM_CASSETTE_PATH, LLM_CASSETTE_REPLAY_TIMING
+
+CASSETTE_MODES = ("off", "record", "replay")
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class CassetteMissError(Exception):
+    """回放模式下磁带中没有对应的请求"""
+
+
+def request_key(data: Dict) -> str:
+    """规范化请求并计算哈希：忽略消息内容中空白的差异与请求字段的顺序"""
+    normalized = {
+        "model": data.get("model"),
+        "temperature": round(float(data.get("temperature") or 0.0), 4),
+        "max_tokens": data.get("max_tokens"),
+        "messages": [
+            {"role": message.get("role"), "content": _WHITESPACE.sub(" ", message.get("content", "")).strip()}
+            for message in data.get("messages", [])
+        ]
+    }
+    payload = json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """一个磁带文件"""
+
+    def __init__(self, path: str, mode: str = "replay", replay_timing: bool = False):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"未知的磁带模式: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.replay_timing = replay_timing
+        self._index: Dict[str, List[Dict]] = defaultdict(list)
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if mode == "replay":
+            self._load()
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"❌ 磁带第 {line_no} 行格式错误，已跳过")
+                    continue
+                self._index[entry["key"]].append(entry)
+        print(f"已加载 LLM 磁带: {self.path}（{sum(len(v) for v in self._index.values())} 条记录）")
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._index.values())
+
+    def record(self, data: Dict, response: Dict, elapsed: float) -> None:
+        """追加一条记录"""
+        entry = {
+            "key": request_key(data),
+            "request": data,
+            "response": response,
+            "elapsed": round(elapsed, 4)
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self._index[entry["key"]].append(entry)
+
+    def lookup(self, data: Dict) -> Dict:
+        """取出请求对应的记录，没有时抛出 CassetteMissError"""
+        key = request_key(data)
+        with self._lock:
+            entries = self._index.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMissError(f"磁带中没有该请求: {key[:12]}")
+            cursor = self._cursor.get(key, 0)
+            self._cursor[key] = cursor + 1
+            self.hits += 1
+            return entries[min(cursor, len(entries) - 1)]
+
+    async def replay(self, data: Dict, max_wait: Optional[float] = None) -> Dict:
+        """回放请求的响应，replay_timing 为真时按录制时的耗时等待（不超过 max_wait）"""
+        entry = self.lookup(data)
+        if self.replay_timing and entry.get("elapsed"):
+            delay = entry["elapsed"] if max_wait is None else min(entry["elapsed"], max_wait)
+            await asyncio.sleep(delay)
+        return dict(entry["response"])
+
+
+_cassette_lock = threading.Lock()
+_cassette: Optional[Cassette] = None
+_configured = False
+
+
+def get_cassette() -> Optional[Cassette]:
+    """按配置创建进程内共享的磁带，LLM_CASSETTE_MODE 为 off 时返回 None"""
+    global _cassette, _configured
+    if _configured:
+        return _cassette
+    with _cassette_lock:
+        if not _configured:
+            if LLM_CASSETTE_MODE != "off":
+                _cassette = Cassette(LLM_CASSETTE_PATH, LLM_CASSETTE_MODE, LLM_CASSETTE_REPLAY_TIMING)
+            _configured = True
+        return _cassette
+
+
+def set_cassette(cassette: Optional[Cassette]) -> None:
+    """替换进程内共享的磁带（压测或对比实验中切换录制/回放），None 表示关闭"""
+    global _cassette, _configured
+    with _cassette_lock:
+        _cassette = cassette
+        _configured = True
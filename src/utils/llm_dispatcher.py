@@ -0,0 +1,218 @@
+"""LLM 请求的优先级调度
+
+对话轮次中的 LLM 调用（输入分析、状态检测、修改意图检测、自由问答回复）与摘要、
+批量重评估、缓存预热等非紧急工作共用同一个服务商的并发额度。每次请求按优先级
+取得名额后再发送：
+    - interactive：用户正在等待的调用，默认优先级
+    - background：对话之外、结果稍后才用到的工作
+    - batch：批量任务，可以一直占满额度
+同时进行的请求不超过 max_concurrent，其中 interactive_reserve 个名额只留给交互请求，
+批量任务占满额度时交互请求也不需要等待正在进行的批量请求完成。
+
+名额空出时选择 等级 - 已等待时间 / aging 最小的等待者（等级越小越优先），同一优先级
+按先后顺序。等待越久，优先级越高，提升到交互等级的请求也可以使用保留名额，持续的
+交互请求不会让后台任务一直等下去。
+
+优先级可以在调用时传入，也可以用 set_current_priority 设置在上下文中，由调用链上的
+所有 LLM 调用继承（与 src.utils.deadline 相同）。等待者在各自的事件循环中等待，名额
+通过 call_soon_threadsafe 交给等待者，调度器可以被 Streamlit 的各个运行线程共享。
+"""
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional
+import asyncio
+import threading
+import time
+from ..config.api_config import LLM_MAX_CONCURRENT, LLM_INTERACTIVE_RESERVE, LLM_PRIORITY_AGING
+from .deadline import Deadline, DeadlineExceeded
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+PRIORITY_BATCH = "batch"
+
+# 优先级等级，越小越优先
+PRIORITIES = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 1, PRIORITY_BATCH: 2}
+
+
+class _Waiter:
+    __slots__ = ("priority", "enqueued", "loop", "future", "granted")
+
+    def __init__(self, priority: str):
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+        self.granted = False
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class LLMDispatcher:
+    def __init__(
+        self,
+        max_concurrent: int = LLM_MAX_CONCURRENT,
+        interactive_reserve: int = LLM_INTERACTIVE_RESERVE,
+        aging: float = LLM_PRIORITY_AGING
+    ):
+        # max_concurrent <= 0 表示不限制并发
+        self.max_concurrent = max_concurrent
+        self.interactive_reserve = min(max(0, interactive_reserve), max(0, max_concurrent - 1))
+        self.aging = aging
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[_Waiter]] = {priority: deque() for priority in PRIORITIES}
+        self._active = 0
+        self.stats = {
+            priority: {'granted': 0, 'queued': 0, 'aged': 0, 'wait_total_ms': 0.0, 'wait_max_ms': 0.0}
+            for priority in PRIORITIES
+        }
+
+    @asynccontextmanager
+    async def slot(self, priority: str = PRIORITY_INTERACTIVE, deadline: Optional[Deadline] = None):
+        """取得一个请求名额，等待超过 deadline 时抛出 DeadlineExceeded"""
+        await self.acquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: str = PRIORITY_INTERACTIVE, deadline: Optional[Deadline] = None) -> None:
+        if priority not in PRIORITIES:
+            raise ValueError(f"未知的 LLM 调用优先级: {priority}")
+        if self.max_concurrent <= 0:
+            return
+        waiter = _Waiter(priority)
+        with self._lock:
+            if not any(self._queues.values()) and self._has_capacity(PRIORITIES[priority]):
+                self._grant(waiter, aged=False)
+                return
+            self._queues[priority].append(waiter)
+            self.stats[priority]['queued'] += 1
+            # 排队的请求可能都用不了空出的名额（保留名额），新请求也参与分配
+            self._dispatch()
+            if waiter.granted:
+                return
+
+        try:
+            if deadline is None:
+                await asyncio.shield(waiter.future)
+            else:
+                await asyncio.wait_for(asyncio.shield(waiter.future), deadline.remaining())
+        except asyncio.TimeoutError:
+            with self._lock:
+                if not waiter.granted:
+                    self._queues[priority].remove(waiter)
+                    raise DeadlineExceeded("等待 LLM 请求名额时本轮对话的时间预算已耗尽")
+        except asyncio.CancelledError:
+            # 已经拿到的名额要还回去
+            with self._lock:
+                if waiter.granted:
+                    self._release_locked()
+                else:
+                    self._queues[priority].remove(waiter)
+            raise
+
+    def release(self) -> None:
+        if self.max_concurrent <= 0:
+            return
+        with self._lock:
+            self._release_locked()
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'active': self._active,
+                'max_concurrent': self.max_concurrent,
+                'queued': {priority: len(waiters) for priority, waiters in self._queues.items()}
+            }
+
+    def _has_capacity(self, rank: float) -> bool:
+        """rank 为老化后的等级，提升到交互等级时可以使用保留名额"""
+        limit = self.max_concurrent
+        if rank > PRIORITIES[PRIORITY_INTERACTIVE]:
+            limit -= self.interactive_reserve
+        return self._active < limit
+
+    def _grant(self, waiter: _Waiter, aged: bool) -> None:
+        waiter.granted = True
+        self._active += 1
+        stats = self.stats[waiter.priority]
+        waited = (time.monotonic() - waiter.enqueued) * 1000
+        stats['granted'] += 1
+        stats['wait_total_ms'] += waited
+        stats['wait_max_ms'] = max(stats['wait_max_ms'], waited)
+        if aged:
+            stats['aged'] += 1
+
+    def _release_locked(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._active < self.max_concurrent:
+            now = time.monotonic()
+            best, best_rank, highest = None, None, None
+            for priority, waiters in self._queues.items():
+                if not waiters:
+                    continue
+                if highest is None:
+                    highest = priority
+                # 同一优先级按先后顺序，队首等待最久，只需比较队首
+                rank = PRIORITIES[priority] - (now - waiters[0].enqueued) / self.aging if self.aging > 0 \
+                    else PRIORITIES[priority]
+                if not self._has_capacity(rank):
+                    continue
+                if best_rank is None or rank < best_rank:
+                    best, best_rank = priority, rank
+            if best is None:
+                return
+            waiter = self._queues[best].popleft()
+            self._grant(waiter, aged=best != highest)
+            try:
+                waiter.loop.call_soon_threadsafe(_wake, waiter.future)
+            except RuntimeError:
+                # 等待者的事件循环已关闭，名额还回去
+                self._active -= 1
+
+
+_current_priority: ContextVar[str] = ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+def get_current_priority() -> str:
+    """当前上下文中 LLM 调用的优先级，没有设置时为 interactive"""
+    return _current_priority.get()
+
+
+def set_current_priority(priority: str):
+    """设置当前上下文的 LLM 调用优先级，返回用于 reset_current_priority 的 token"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"未知的 LLM 调用优先级: {priority}")
+    return _current_priority.set(priority)
+
+
+def reset_current_priority(token) -> None:
+    _current_priority.reset(token)
+
+
+_dispatcher_lock = threading.Lock()
+_dispatcher: Optional[LLMDispatcher] = None
+
+
+def get_dispatcher() -> LLMDispatcher:
+    """进程内共享的 LLM 请求调度器"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = LLMDispatcher()
+    return _dispatcher
+
+
+def set_dispatcher(dispatcher: Optional[LLMDispatcher]) -> None:
+    """替换进程内共享的调度器（压测按参数配置额度时使用）"""
+    global _dispatcher
+    with _dispatcher_lock:
+        _dispatcher = dispatcher
@@ -1,5 +1,6 @@
 from typing import Dict, Optional, List
 import json
+import time
 import asyncio
 import aiohttp
 from ..config.api_config import (
@@ -12,6 +13,10 @@ from ..config.api_config import (
     MAX_RETRIES,
     RETRY_INTERVAL
 )
+from .deadline import Deadline, DeadlineExceeded, get_current_deadline
+from .llm_cassette import get_cassette
+from .llm_dispatcher import PRIORITIES, get_dispatcher, get_current_priority
+from .json_extract import JsonSchema, extract_json
 
 class LLMUtils:
     @staticmethod
@@ -19,9 +24,27 @@ class LLMUtils:
         prompt: str,
         temperature: float = DEFAULT_TEMPERATURE,
         system_prompt: str = None,
-        model: str = DEFAULT_MODEL
+        model: str = DEFAULT_MODEL,
+        deadline: Optional[Deadline] = None,
+        priority: Optional[str] = None
     ) -> Dict:
-        """调用语言模型"""
+        """调用语言模型
+
+        deadline 为空时使用当前上下文中的截止时间（见 src.utils.deadline）。
+        每次请求的超时不超过剩余时间，剩余时间不足时不再重试并抛出
+        DeadlineExceeded。
+        每次请求先按优先级（interactive/background/batch，见 src.utils.llm_dispatcher）
+        取得请求名额，priority 为空时使用当前上下文中的优先级；重试等待期间不占用名额。
+        配置了 LLM 磁带时（见 src.utils.llm_cassette），录制模式会记录每次成功的
+        请求，回放模式直接返回录制的响应，不发送请求。
+        """
+        if deadline is None:
+            deadline = get_current_deadline()
+        if priority is None:
+            priority = get_current_priority()
+        if priority not in PRIORITIES:
+            raise ValueError(f"未知的 LLM 调用优先级: {priority}")
+        dispatcher = get_dispatcher()
         headers = {
             "Authorization": f"Bearer {OPENAI_API_KEY}",
             "Content-Type": "application/json"
@@ -41,52 +64,56 @@ class LLMUtils:
             "max_tokens": MAX_TOKENS
         }
         
+        cassette = get_cassette()
+        if cassette is not None and cassette.mode == "replay":
+            return await cassette.replay(data, deadline.remaining() if deadline else None)
+        
         # 发送请求
         for attempt in range(MAX_RETRIES):
             try:
-                async with aiohttp.ClientSession() as session:
+                async with dispatcher.slot(priority, deadline), aiohttp.ClientSession() as session:
+                    # 排队等待名额的时间也计入本轮预算
+                    timeout = deadline.timeout(REQUEST_TIMEOUT) if deadline else REQUEST_TIMEOUT
+                    started = time.perf_counter()
                     async with session.post(
                         f"{OPENAI_API_BASE}/chat/completions",
                         headers=headers,
                         json=data,
-                        timeout=REQUEST_TIMEOUT
+                        timeout=aiohttp.ClientTimeout(total=timeout)
                     ) as response:
                         if response.status == 200:
                             result = await response.json()
-                            return {
+                            reply = {
                                 "text": result["choices"][0]["message"]["content"],
                                 "finish_reason": result["choices"][0]["finish_reason"]
                             }
+                            if cassette is not None and cassette.mode == "record":
+                                cassette.record(data, reply, time.perf_counter() - started)
+                            return reply
                         else:
                             error_text = await response.text()
                             print(f"API请求失败 (尝试 {attempt + 1}/{MAX_RETRIES}):")
                             print(f"状态码: {response.status}")
                             print(f"错误信息: {error_text}")
                             
+            except DeadlineExceeded:
+                raise
             except asyncio.TimeoutError:
                 print(f"请求超时 (尝试 {attempt + 1}/{MAX_RETRIES})")
             except Exception as e:
                 print(f"请求异常 (尝试 {attempt + 1}/{MAX_RETRIES}): {str(e)}")
             
             if attempt < MAX_RETRIES - 1:
+                if deadline and deadline.remaining() <= RETRY_INTERVAL:
+                    raise DeadlineExceeded("剩余时间不足以重试 LLM 调用")
                 await asyncio.sleep(RETRY_INTERVAL)
         
         raise Exception("LLM 调用失败，已达到最大重试次数")
     
     @staticmethod
-    def extract_json_from_response(response: str) -> Optional[Dict]:
-        """从响应中提取 JSON 数据"""
-        try:
-            # 查找 JSON 开始和结束的位置
-            start = response.find("{")
-            end = response.rfind("}") + 1
-            
-            if start >= 0 and end > start:
-                json_str = response[start:end]
-                return json.loads(json_str)
-            return None
-        except json.JSONDecodeError:
-            return None
+    def extract_json_from_response(response: str, schema: Optional[JsonSchema] = None) -> Optional[Dict]:
+        """从响应中提取 JSON 数据，指定 schema 时返回第一个符合 schema 的对象"""
+        return extract_json(response, schema)
     
     @staticmethod
     def validate_llm_response(response: Dict) -> bool:
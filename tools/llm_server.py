@@ -0,0 +1,369 @@
+"""本地 OpenAI 兼容的 LLM 替身服务
+
+实现 POST /chat/completions（以及 /v1/chat/completions），支持普通响应与 SSE 流式
+响应，用于在没有真实 LLM 的环境下离线、可重复地压测和调试整个应用：
+
+    python -m tools.llm_server --port 8399 --ttft lognormal:0.4,0.3 --tps 60
+    OPENAI_API_BASE=http://127.0.0.1:8399 streamlit run app.py
+
+回复内容按 prompt 匹配：
+    - 脚本文件（--script）中的规则优先，按顺序用正则匹配最后一条用户消息，
+      回复可以是字符串或 JSON 对象（会序列化为字符串），多条回复时依次轮换
+    - 否则使用内置的应答：状态检测、信息分析、修改意图三类 prompt 返回对应的 JSON
+      （从 prompt 中引用的用户输入里识别金额、年限、资产配置），其余返回固定的文本
+
+脚本文件格式：
+    {"rules": [{"pattern": "判断对话状态", "response": {"target_state": "FREE_CHAT", "confidence": 0.9}}]}
+
+延迟与故障注入：
+    --latency / --ttft 为分布，格式为 fixed:秒、uniform:下限,上限 或 lognormal:中位数,sigma
+    --tps 为每秒生成的 token 数（按字符计），非流式响应在首 token 之后一次性返回
+    --error-429 / --error-500 / --timeout-rate 为注入对应故障的概率
+GET /stats 返回各类 prompt 的请求数与注入的故障数。
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from aiohttp import web
+
+
+@dataclass(slots=True)
+class Distribution:
+    """延迟分布（秒）"""
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Distribution":
+        kind, _, params = spec.partition(":")
+        values = [float(v) for v in params.split(",") if v.strip()] if params else [float(kind)]
+        if not params:
+            return cls("fixed", values[0])
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"未知的分布类型: {kind}")
+        return cls(kind, values[0], values[1] if len(values) > 1 else 0.0)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "lognormal":
+            return self.a * rng.lognormvariate(0.0, self.b) if self.a > 0 else 0.0
+        return self.a
+
+
+@dataclass(slots=True)
+class ServerConfig:
+    latency: Distribution = field(default_factory=Distribution)  # 收到请求到开始处理的延迟
+    ttft: Distribution = field(default_factory=Distribution)     # 首 token 延迟
+    tokens_per_second: float = 0.0                                # 0 表示不模拟生成耗时
+    error_429: float = 0.0
+    error_500: float = 0.0
+    timeout_rate: float = 0.0
+    timeout_seconds: float = 120.0                                # 注入超时时挂起的时间
+    seed: Optional[int] = 0
+    rules: List[Dict] = field(default_factory=list)
+
+
+# ---------------------------------------------------------------- 内置应答
+
+_QUOTED_INPUT = re.compile(r'用户输入："(.*?)"', re.S)
+_AMOUNT = re.compile(r'(\d+(?:\.\d+)?)\s*(亿|千万|百万|万|千)')
+_YEARS = re.compile(r'(\d+(?:\.\d+)?)\s*年')
+_WEIGHT = re.compile(r'([一-龥A-Za-z]+?)\s*(?:占|比例)?\s*(\d+(?:\.\d+)?)\s*%')
+_UNITS = {"亿": 1e8, "千万": 1e7, "百万": 1e6, "万": 1e4, "千": 1e3}
+_INFO_HINT = re.compile(r'(\d|万|年|投资|本金|目标|存款|股票|基金|债券|配置|%)')
+_FAMILY = re.compile(r'(已婚|未婚|单身|离异|有[一两二三\d]个(孩子|子女))')
+_EMPLOYMENT = re.compile(r'(企业职员|公务员|教师|医生|工程师|自由职业|个体户|经商|退休|在企业上班|上班族)')
+_QUESTION_HINT = re.compile(r'(是什么|什么是|怎么|如何|为什么|吗|？|\?)')
+_MODIFY_HINT = re.compile(r'(修改|改成|改为|改一下|重新设置|更正)')
+
+
+def _user_input(prompt: str) -> str:
+    match = _QUOTED_INPUT.search(prompt)
+    return match.group(1) if match else prompt
+
+
+def _amounts(text: str) -> List[float]:
+    return [float(number) * _UNITS[unit] for number, unit in _AMOUNT.findall(text)]
+
+
+def _portfolio(text: str) -> Dict:
+    assets, weights = [], []
+    for name, percent in _WEIGHT.findall(text):
+        assets.append(name)
+        weights.append(float(percent) / 100)
+    return {"assets": assets, "weights": weights}
+
+
+def _state_detection(prompt: str) -> Dict:
+    text = _user_input(prompt)
+    collecting = "当前状态：COLLECTING_INFO" in prompt and not _QUESTION_HINT.search(text)
+    if collecting or _INFO_HINT.search(text):
+        return {"target_state": "COLLECTING_INFO", "confidence": 0.9, "reasoning": "包含个人投资信息"}
+    return {"target_state": "FREE_CHAT", "confidence": 0.8, "reasoning": "一般咨询"}
+
+
+def _known_info(prompt: str) -> Dict:
+    """prompt 中 "已知信息" 部分的核心投资信息（真实 LLM 通常会沿用这些值）"""
+    known = {"target_value": None, "years": None, "initial_investment": None}
+    for key, label in (("target_value", "目标金额"), ("initial_investment", "初始投资")):
+        match = re.search(label + r'：([\d.,]+)\s*(亿|千万|百万|万|千)?', prompt)
+        if match:
+            known[key] = float(match.group(1).replace(",", "")) * _UNITS.get(match.group(2), 1.0)
+    match = re.search(r'投资年限：(\d+(?:\.\d+)?)年', prompt)
+    if match:
+        known["years"] = float(match.group(1))
+    return known
+
+
+def _analysis(prompt: str) -> Dict:
+    text = _user_input(prompt)
+    amounts = _amounts(text)
+    years = _YEARS.search(text)
+    core = _known_info(prompt)
+    if years:
+        core["years"] = float(years.group(1))
+    # "从100万到500万" 或 "本金100万，目标500万"：较小的为初始资金，较大的为目标
+    if len(amounts) >= 2:
+        core["initial_investment"], core["target_value"] = min(amounts[:2]), max(amounts[:2])
+    elif len(amounts) == 1:
+        key = "initial_investment" if re.search(r'(本金|初始|现有|手上|存了)', text) else "target_value"
+        core[key] = amounts[0]
+    portfolio = _portfolio(text)
+    if re.search(r'(没有|无)(任何)?(投资|配置)', text):
+        portfolio = {"assets": ["cash"], "weights": [1.0]}
+    family = _FAMILY.search(text)
+    employment = _EMPLOYMENT.search(text)
+    personal = {
+        "family_status": family.group(0) if family else None,
+        "employment": employment.group(0) if employment else None
+    }
+    provides = (
+        any(v is not None for v in core.values())
+        or portfolio["assets"]
+        or any(v is not None for v in personal.values())
+    )
+    return {
+        "intent": "provide_info" if provides else "ask_question",
+        "emotion": "neutral",
+        "patience_level": "high",
+        "extracted_info": {
+            "core_investment": core,
+            "personal_info": personal,
+            "financial_info": {},
+            "portfolio": portfolio
+        },
+        "question_info": {
+            "type": "general" if provides else "general_inquiry",
+            "requires_immediate_response": not provides,
+            "can_collect_info": bool(provides)
+        },
+        "reasoning": {}
+    }
+
+
+def _modification(prompt: str) -> Dict:
+    text = _user_input(prompt)
+    if not _MODIFY_HINT.search(text):
+        return {"has_modification_intent": False, "target_field": "", "new_value": None, "confidence": 0.9}
+    portfolio = _portfolio(text)
+    amounts = _amounts(text)
+    years = _YEARS.search(text)
+    if portfolio["assets"]:
+        field_name, value = "portfolio", portfolio
+    elif years and not amounts:
+        field_name, value = "years", float(years.group(1))
+    elif amounts:
+        field_name = "initial_investment" if re.search(r'(本金|初始)', text) else "target_value"
+        value = amounts[0]
+    else:
+        return {"has_modification_intent": True, "target_field": "", "new_value": None, "confidence": 0.5}
+    return {"has_modification_intent": True, "target_field": field_name, "new_value": value, "confidence": 0.9}
+
+
+_FREE_CHAT_REPLY = (
+    "这是本地替身服务生成的示例回答：投资需要综合考虑收益、风险和流动性，"
+    "建议根据自身的投资期限和风险承受能力进行分散配置。投资有风险，入市需谨慎。"
+)
+
+# (名称, prompt 特征, 应答函数)，按顺序匹配
+BUILTIN_RESPONDERS: List[tuple] = [
+    ("state_detection", re.compile(r'判断对话状态'), _state_detection),
+    ("modification", re.compile(r'修改之前信息的意图'), _modification),
+    ("analysis", re.compile(r'分析用户输入并提取关键信息'), _analysis),
+    ("free_chat", re.compile(r''), lambda prompt: _FREE_CHAT_REPLY)
+]
+
+
+# ---------------------------------------------------------------- 服务
+
+class MockLLMServer:
+    """OpenAI 兼容的 /chat/completions 替身"""
+
+    def __init__(self, config: Optional[ServerConfig] = None):
+        self.config = config or ServerConfig()
+        self.rng = random.Random(self.config.seed)
+        self.rules = [
+            (re.compile(rule["pattern"]), rule.get("responses") or [rule.get("response", "")], rule.get("name"))
+            for rule in self.config.rules
+        ]
+        self._rule_cursor: Dict[int, int] = {}
+        self.stats: Dict[str, int] = {"requests": 0, "error_429": 0, "error_500": 0, "timeout": 0}
+        self._runner: Optional[web.AppRunner] = None
+        self.app = web.Application()
+        for path in ("/chat/completions", "/v1/chat/completions"):
+            self.app.router.add_post(path, self.handle_completion)
+        self.app.router.add_get("/stats", self.handle_stats)
+
+    def respond(self, prompt: str) -> tuple:
+        """返回 (prompt 类别, 回复文本)"""
+        for index, (pattern, responses, name) in enumerate(self.rules):
+            if pattern.search(prompt):
+                cursor = self._rule_cursor.get(index, 0)
+                self._rule_cursor[index] = cursor + 1
+                response = responses[cursor % len(responses)]
+                text = response if isinstance(response, str) else json.dumps(response, ensure_ascii=False)
+                return name or f"rule_{index}", text
+        for name, pattern, responder in BUILTIN_RESPONDERS:
+            if pattern.search(prompt):
+                result = responder(prompt)
+                return name, result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+        return "free_chat", _FREE_CHAT_REPLY
+
+    async def handle_completion(self, request: web.Request) -> web.StreamResponse:
+        self.stats["requests"] += 1
+        body = await request.json()
+        await asyncio.sleep(self.config.latency.sample(self.rng))
+
+        roll = self.rng.random()
+        if roll < self.config.error_429:
+            self.stats["error_429"] += 1
+            return web.json_response({"error": {"message": "Rate limit reached", "type": "rate_limit"}}, status=429)
+        roll -= self.config.error_429
+        if roll < self.config.error_500:
+            self.stats["error_500"] += 1
+            return web.json_response({"error": {"message": "Internal error", "type": "server_error"}}, status=500)
+        roll -= self.config.error_500
+        if roll < self.config.timeout_rate:
+            self.stats["timeout"] += 1
+            await asyncio.sleep(self.config.timeout_seconds)
+            raise web.HTTPGatewayTimeout()
+
+        messages = body.get("messages") or []
+        prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        kind, text = self.respond(prompt)
+        self.stats[kind] = self.stats.get(kind, 0) + 1
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "mock")
+        ttft = self.config.ttft.sample(self.rng)
+        tps = self.config.tokens_per_second
+        if not body.get("stream"):
+            await asyncio.sleep(ttft + (len(text) / tps if tps > 0 else 0.0))
+            return web.json_response({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt), "completion_tokens": len(text), "total_tokens": len(prompt) + len(text)}
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        await asyncio.sleep(ttft)
+        chunk_size = 4
+        for start in range(0, len(text), chunk_size):
+            piece = text[start:start + chunk_size]
+            delta = {"content": piece} if start else {"role": "assistant", "content": piece}
+            await response.write(self._sse(completion_id, model, delta, None))
+            if tps > 0:
+                await asyncio.sleep(len(piece) / tps)
+        await response.write(self._sse(completion_id, model, {}, "stop"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    @staticmethod
+    def _sse(completion_id: str, model: str, delta: Dict, finish_reason: Optional[str]) -> bytes:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return b"data: " + json.dumps(chunk, ensure_ascii=False).encode("utf-8") + b"\n\n"
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8399) -> str:
+        """在当前事件循环中启动服务，返回 API 地址（port 为 0 时随机选择端口）"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def config_from_args(args: argparse.Namespace) -> ServerConfig:
+    rules = []
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            rules = json.load(f).get("rules", [])
+    return ServerConfig(
+        latency=Distribution.parse(args.latency),
+        ttft=Distribution.parse(args.ttft),
+        tokens_per_second=args.tps,
+        error_429=args.error_429,
+        error_500=args.error_500,
+        timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds,
+        seed=args.seed,
+        rules=rules
+    )
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", default="0", help="处理前的延迟分布，例如 lognormal:0.2,0.5")
+    parser.add_argument("--ttft", default="0", help="首 token 延迟分布，例如 uniform:0.3,0.8")
+    parser.add_argument("--tps", type=float, default=0.0, help="每秒生成的 token 数，0 表示不模拟")
+    parser.add_argument("--error-429", type=float, default=0.0, help="返回 429 的概率")
+    parser.add_argument("--error-500", type=float, default=0.0, help="返回 500 的概率")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="挂起不响应的概率")
+    parser.add_argument("--timeout-seconds", type=float, default=120.0, help="注入超时时挂起的秒数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--script", help="脚本化回复的 JSON 文件")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容的 LLM 替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8399)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    server = MockLLMServer(config_from_args(args))
+
+    async def run():
+        url = await server.start(args.host, args.port)
+        print(f"LLM 替身服务已启动: {url}（设置 OPENAI_API_BASE={url}）")
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""本地 Redis 协议替身服务
+
+只实现会话后端用到的命令（PING/AUTH/SELECT/GET/MGET/SET/DEL/WATCH/UNWATCH/
+MULTI/EXEC/DISCARD），数据保存在内存中，用于在没有 Redis 的环境下测试
+RedisSessionBackend。
+
+用法：
+    python -m tools.resp_server --port 6390
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+class RespStandInServer:
+    """单线程 asyncio RESP 服务，所有命令天然串行执行"""
+
+    def __init__(self):
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.revisions: Dict[bytes, int] = {}  # 每个键的修改次数，用于 WATCH
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expire_at = item
+        if expire_at is not None and expire_at <= time.time():
+            self._delete(key)
+            return None
+        return value
+
+    def _set(self, key: bytes, value: bytes, expire_at: Optional[float] = None) -> None:
+        self.data[key] = (value, expire_at)
+        self.revisions[key] = self.revisions.get(key, 0) + 1
+
+    def _delete(self, key: bytes) -> bool:
+        existed = self.data.pop(key, None) is not None
+        self.revisions[key] = self.revisions.get(key, 0) + 1
+        return existed
+
+    def execute(self, args: List[bytes]):
+        command = args[0].upper()
+        if command == b"PING":
+            return "PONG"
+        if command in (b"AUTH", b"SELECT"):
+            return "OK"
+        if command == b"GET":
+            return self._get(args[1])
+        if command == b"MGET":
+            return [self._get(key) for key in args[1:]]
+        if command == b"SET":
+            expire_at = None
+            if len(args) >= 5 and args[3].upper() == b"EX":
+                expire_at = time.time() + int(args[4])
+            self._set(args[1], args[2], expire_at)
+            return "OK"
+        if command == b"DEL":
+            return sum(self._delete(key) for key in args[1:])
+        return RuntimeError(f"ERR unknown command '{command.decode()}'")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        watched: Dict[bytes, int] = {}
+        queued: Optional[List[List[bytes]]] = None
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                command = args[0].upper()
+                if command == b"MULTI":
+                    queued = []
+                    reply = "OK"
+                elif command == b"DISCARD":
+                    queued, watched = None, {}
+                    reply = "OK"
+                elif command == b"EXEC":
+                    if queued is None:
+                        reply = RuntimeError("ERR EXEC without MULTI")
+                    elif any(self.revisions.get(key, 0) != rev for key, rev in watched.items()):
+                        reply = None  # WATCH 的键已被修改，事务放弃
+                    else:
+                        reply = [self.execute(queued_args) for queued_args in queued]
+                    queued, watched = None, {}
+                elif queued is not None:
+                    queued.append(args)
+                    reply = "QUEUED"
+                elif command == b"WATCH":
+                    watched.update({key: self.revisions.get(key, 0) for key in args[1:]})
+                    reply = "OK"
+                elif command == b"UNWATCH":
+                    watched = {}
+                    reply = "OK"
+                else:
+                    reply = self.execute(args)
+                writer.write(self._encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def _encode(self, reply) -> bytes:
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, Exception):
+            return b"-" + str(reply).encode("utf-8") + b"\r\n"
+        if isinstance(reply, str):
+            return b"+" + reply.encode("utf-8") + b"\r\n"
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, bytes):
+            return b"$%d\r\n%s\r\n" % (len(reply), reply)
+        return b"*%d\r\n" % len(reply) + b"".join(self._encode(item) for item in reply)
+
+    async def serve(self, host: str, port: int) -> None:
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"RESP 替身服务已启动: {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 Redis 协议替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    asyncio.run(RespStandInServer().serve(args.host, args.port))
+
+if __name__ == "__main__":
+    main()
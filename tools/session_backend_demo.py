@@ -0,0 +1,99 @@
+"""共享会话后端并发演示
+
+启动多个 worker 进程，对同一批会话并发执行“读取-修改-写回”，冲突时重新加载
+后重试。结束后检查每个会话的计数与版本号是否等于成功写入次数，验证
+compare-and-swap 没有丢失任何更新。分别覆盖 SQLite 和 Redis 协议两种后端
+（后者使用 tools.resp_server 替身服务）。
+
+用法：
+    python -m tools.session_backend_demo --workers 4 --turns 50
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.managers.session_backend import create_session_backend
+from src.managers.session_manager import SessionStore
+
+def run_worker(url: str, spill_dir: str, session_ids: list, turns: int, results) -> None:
+    """单个 worker：每轮把会话中的计数加一并写回，冲突时重试"""
+    store = SessionStore(spill_dir=spill_dir, backend=create_session_backend(url))
+    commits = conflicts = 0
+    for turn in range(turns):
+        session_id = session_ids[turn % len(session_ids)]
+        session = store.get(session_id)
+        try:
+            while True:
+                years = session.config_manager.core_investment.years or 0
+                session.config_manager.update_core_investment(years=years + 1)
+                if store.commit(session_id):
+                    commits += 1
+                    break
+                conflicts += 1
+                session = store.reload(session_id)
+        finally:
+            store.release(session_id)
+    results.put((commits, conflicts))
+
+def run_demo(url: str, workers: int, turns: int, sessions: int) -> bool:
+    session_ids = [f"demo-{i}" for i in range(sessions)]
+    spill_dir = tempfile.mkdtemp(prefix="glad-sessions-")
+    results = multiprocessing.Queue()
+    start = time.perf_counter()
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(url, spill_dir, session_ids, turns, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    total_commits = sum(commits for commits, _ in outcomes)
+    total_conflicts = sum(conflicts for _, conflicts in outcomes)
+    backend = create_session_backend(url)
+    store = SessionStore(spill_dir=spill_dir, backend=backend)
+    counted = sum(store.reload(session_id).config_manager.core_investment.years or 0 for session_id in session_ids)
+    versions = sum(backend.get_version(session_id) for session_id in session_ids)
+
+    ok = counted == total_commits == workers * turns and versions == total_commits
+    print(f"\n后端: {url}")
+    print(f"  worker 数: {workers}，每个 worker 轮数: {turns}，会话数: {sessions}")
+    print(f"  成功写入: {total_commits}，冲突重试: {total_conflicts}，耗时: {elapsed:.2f}秒")
+    print(f"  会话计数合计: {counted}，版本号合计: {versions}")
+    print(f"  结果: {'✅ 无更新丢失' if ok else '❌ 检测到更新丢失'}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="共享会话后端并发演示")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=2)
+    parser.add_argument("--redis-port", type=int, default=6390)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="glad-backend-demo-")
+    ok = run_demo(f"sqlite:///{workdir}/sessions.db", args.workers, args.turns, args.sessions)
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "tools.resp_server", "--port", str(args.redis_port)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    try:
+        time.sleep(0.5)
+        ok = run_demo(f"redis://127.0.0.1:{args.redis_port}/0", args.workers, args.turns, args.sessions) and ok
+    finally:
+        server.terminate()
+        server.wait()
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()